@@ -24,7 +24,7 @@ if config.config_file_name is not None:
 # add your model's MetaData object here
 # for 'autogenerate' support
 from app.database import Base
-from app.models import User, Device, Command, UserSettings, AudioData
+from app.models import User, Device, Command, UserSettings, AudioData, CommandRollup, RollupWatermark
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -0,0 +1,24 @@
+"""Add device version for optimistic concurrency
+
+Revision ID: 3f6c2a9d41b7
+Revises: 8d915de18182
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6c2a9d41b7'
+down_revision = '8d915de18182'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('devices', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('devices', 'version')
@@ -0,0 +1,40 @@
+"""Add command analytics rollups
+
+Revision ID: 5b2f8e61c9a4
+Revises: c4e9b17a2d53
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2f8e61c9a4'
+down_revision = 'c4e9b17a2d53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('command_rollups',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('hour', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('action', sa.String(length=255), nullable=False),
+    sa.Column('device_type', sa.String(length=100), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'hour', 'action', 'device_type', 'status')
+    )
+    op.create_table('rollup_watermarks',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('last_id', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rollup_watermarks')
+    op.drop_table('command_rollups')
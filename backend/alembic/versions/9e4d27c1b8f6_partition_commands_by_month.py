@@ -0,0 +1,121 @@
+"""Partition commands by month of created_at
+
+Revision ID: 9e4d27c1b8f6
+Revises: 5b2f8e61c9a4
+Create Date: 2026-10-18 16:00:00.000000
+
+Таблица пересоздается с секционированием RANGE (created_at) и
+копированием всех строк, поэтому миграция выполняется при остановленной
+записи в commands. Секции создаются с месяца самой старой команды по
+COMMAND_PARTITIONS_AHEAD месяцев вперед; дальнейшие секции создает
+app/services/command_partitions.py
+
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4d27c1b8f6'
+down_revision = '5b2f8e61c9a4'
+branch_labels = None
+depends_on = None
+
+PARTITIONS_AHEAD = int(os.getenv("COMMAND_PARTITIONS_AHEAD", "3"))
+
+COLUMNS = "id, user_id, device_id, command_text, recognized_text, action, status, language, created_at"
+
+
+def _create_indexes() -> None:
+    op.create_index(op.f('ix_commands_id'), 'commands', ['id'], unique=False)
+    op.create_index(
+        'ix_commands_user_created_id',
+        'commands',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False
+    )
+    op.create_index('ix_commands_status_id', 'commands', ['status', 'id'], unique=False)
+    op.create_index('ix_commands_device_id', 'commands', ['device_id'], unique=False)
+
+
+def upgrade() -> None:
+    op.rename_table('commands', 'commands_unpartitioned')
+    op.execute("ALTER TABLE commands_unpartitioned RENAME CONSTRAINT commands_pkey TO commands_unpartitioned_pkey")
+
+    # Ключ секционирования входит в первичный ключ; id по-прежнему
+    # выдается последовательностью commands_id_seq
+    op.execute("""
+        CREATE TABLE commands (
+            id integer NOT NULL DEFAULT nextval('commands_id_seq'),
+            user_id integer NOT NULL REFERENCES users (id),
+            device_id integer REFERENCES devices (id),
+            command_text text NOT NULL,
+            recognized_text text,
+            action varchar(255),
+            status varchar(50),
+            language varchar(10),
+            created_at timestamp with time zone NOT NULL DEFAULT now(),
+            CONSTRAINT commands_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE commands_id_seq OWNED BY commands.id")
+    # Страховочная секция: вставка не падает, если задача обслуживания не
+    # успела создать секцию месяца; строки из нее переносятся при создании
+    op.execute("CREATE TABLE commands_default PARTITION OF commands DEFAULT")
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month timestamp;
+            last_month timestamp := date_trunc('month', now() AT TIME ZONE 'UTC')
+                + interval '{PARTITIONS_AHEAD} months';
+        BEGIN
+            SELECT date_trunc('month', coalesce(min(created_at), now()) AT TIME ZONE 'UTC')
+            INTO month FROM commands_unpartitioned;
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF commands FOR VALUES FROM (%L) TO (%L)',
+                    'commands_p' || to_char(month, 'YYYYMM'),
+                    month::text || '+00',
+                    (month + interval '1 month')::text || '+00'
+                );
+                month := month + interval '1 month';
+            END LOOP;
+        END $$
+    """)
+    op.execute(f"""
+        INSERT INTO commands ({COLUMNS})
+        SELECT id, user_id, device_id, command_text, recognized_text, action, status, language,
+               coalesce(created_at, now())
+        FROM commands_unpartitioned
+    """)
+    op.drop_table('commands_unpartitioned')
+    # Индексы строятся после копирования: так быстрее, чем обновлять их построчно
+    _create_indexes()
+
+
+def downgrade() -> None:
+    # Строки уже архивированных секций не восстанавливаются
+    op.rename_table('commands', 'commands_partitioned')
+    op.execute("ALTER TABLE commands_partitioned RENAME CONSTRAINT commands_pkey TO commands_partitioned_pkey")
+    for index in ('ix_commands_id', 'ix_commands_user_created_id', 'ix_commands_status_id', 'ix_commands_device_id'):
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_partitioned")
+    op.create_table('commands',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('commands_id_seq')"), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('device_id', sa.Integer(), nullable=True),
+    sa.Column('command_text', sa.Text(), nullable=False),
+    sa.Column('recognized_text', sa.Text(), nullable=True),
+    sa.Column('action', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('language', sa.String(length=10), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(f"INSERT INTO commands ({COLUMNS}) SELECT {COLUMNS} FROM commands_partitioned")
+    op.execute("ALTER SEQUENCE commands_id_seq OWNED BY commands.id")
+    op.execute("DROP TABLE commands_partitioned")
+    _create_indexes()
@@ -0,0 +1,33 @@
+"""Add commands history index for keyset pagination
+
+Revision ID: a81d5e3c7f20
+Revises: 3f6c2a9d41b7
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a81d5e3c7f20'
+down_revision = '3f6c2a9d41b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY не блокирует запись в commands на время построения индекса
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_commands_user_created_id',
+            'commands',
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_commands_user_created_id', table_name='commands', postgresql_concurrently=True)
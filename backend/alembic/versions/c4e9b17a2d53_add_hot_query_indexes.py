@@ -0,0 +1,67 @@
+"""Add indexes for device resolution and status scans
+
+Revision ID: c4e9b17a2d53
+Revises: a81d5e3c7f20
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e9b17a2d53'
+down_revision = 'a81d5e3c7f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY не блокирует запись в таблицы на время построения индексов
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_devices_owner_active_type_location',
+            'devices',
+            ['owner_id', 'is_active', 'device_type', 'location'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_devices_owner_on',
+            'devices',
+            ['owner_id'],
+            unique=False,
+            postgresql_where=sa.text('is_on = true'),
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_commands_status_id',
+            'commands',
+            ['status', 'id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_commands_device_id',
+            'commands',
+            ['device_id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_audio_data_unprocessed',
+            'audio_data',
+            ['id'],
+            unique=False,
+            postgresql_where=sa.text('processed = false AND file_path IS NOT NULL'),
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_audio_data_unprocessed', table_name='audio_data', postgresql_concurrently=True)
+        op.drop_index('ix_commands_device_id', table_name='commands', postgresql_concurrently=True)
+        op.drop_index('ix_commands_status_id', table_name='commands', postgresql_concurrently=True)
+        op.drop_index('ix_devices_owner_on', table_name='devices', postgresql_concurrently=True)
+        op.drop_index('ix_devices_owner_active_type_location', table_name='devices', postgresql_concurrently=True)
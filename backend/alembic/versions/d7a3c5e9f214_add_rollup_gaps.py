@@ -0,0 +1,29 @@
+"""Add rollup gaps for late committed commands
+
+Revision ID: d7a3c5e9f214
+Revises: 9e4d27c1b8f6
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3c5e9f214'
+down_revision = '9e4d27c1b8f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('rollup_gaps',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('command_id', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('name', 'command_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rollup_gaps')
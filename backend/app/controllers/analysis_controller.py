@@ -1,8 +1,26 @@
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterator, List
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.models import Command
 from app.repositories.request_repository import RequestRepository
-from app.strategies.analysis_strategy import IAnalysisStrategy, StatisticalAnalysisStrategy
+from app.strategies.analysis_strategy import IAnalysisStrategy, StatisticalAnalysisStrategy, AnalysisResult
+
+
+def _analyze(strategy: IAnalysisStrategy, request: Command) -> AnalysisResult:
+    return strategy.analyze_data([request.command_text], request.language or "ru-RU")
+
+
+def _analyze_batch(strategy: IAnalysisStrategy, requests: List[Command]) -> List[AnalysisResult]:
+    # Пакет анализируется одним вызовом стратегии на каждый язык
+    results: List[AnalysisResult] = [None] * len(requests)
+    groups: Dict[str, List[int]] = {}
+    for index, req in enumerate(requests):
+        groups.setdefault(req.language or "ru-RU", []).append(index)
+    for language, indexes in groups.items():
+        analyzed = strategy.analyze_batch([requests[i].command_text for i in indexes], language)
+        for index, result in zip(indexes, analyzed):
+            results[index] = result
+    return results
 
 
 class AnalysisController:
@@ -11,20 +29,34 @@ class AnalysisController:
         self.strategy = strategy or StatisticalAnalysisStrategy()
         self.db = db
     
-    def conduct_analysis(self, request: Command) -> Dict[str, Any]:
-        data = [request.command_text]
-        result = self.strategy.analyze_data(data)
-        return result
+    def conduct_analysis(self, request: Command) -> AnalysisResult:
+        return _analyze(self.strategy, request)
+    
+    def conduct_batch_analysis(self, requests: List[Command]) -> List[AnalysisResult]:
+        return _analyze_batch(self.strategy, requests)
     
-    def get_analytics(self) -> List[Dict[str, Any]]:
-        requests = self.repository_request.get_all()
-        analytics = []
-        for req in requests:
-            analytics.append({
+    def get_analytics(self) -> Iterator[Dict[str, Any]]:
+        # Записи читаются порциями: память не растет вместе с историей команд
+        for req in self.repository_request.iter_all():
+            yield {
                 "id": req.id,
                 "command_text": req.command_text,
                 "status": req.status,
                 "created_at": req.created_at.isoformat() if req.created_at else None
-            })
-        return analytics
+            }
 
+
+class AsyncAnalysisController:
+    """
+    Анализ для асинхронных обработчиков: стратегия нагружает процессор
+    и к базе не обращается, поэтому выполняется в пуле потоков,
+    а цикл событий остается свободным
+    """
+    def __init__(self, strategy: IAnalysisStrategy = None):
+        self.strategy = strategy or StatisticalAnalysisStrategy()
+    
+    async def conduct_analysis(self, request: Command) -> AnalysisResult:
+        return await run_in_threadpool(_analyze, self.strategy, request)
+    
+    async def conduct_batch_analysis(self, requests: List[Command]) -> List[AnalysisResult]:
+        return await run_in_threadpool(_analyze_batch, self.strategy, requests)
@@ -1,73 +1,253 @@
-from typing import Optional, Dict, Any
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, update
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.orm.util import identity_key
 from app.models import Command, Device
-from app.repositories.request_repository import RequestRepository
-from app.repositories.decision_repository import DecisionRepository
+from app.repositories.request_repository import AsyncRequestRepository, RequestRepository
+from app.repositories.decision_repository import AsyncDecisionRepository, DecisionRepository
+from app.services.device_registry import DeviceEntry, DeviceRegistry, device_registry
+from app.strategies.analysis_strategy import AnalysisResult
+
+EMERGENCY_ACTIONS = ("stop", "pause")
+
+
+def emergency_stop_statement(user_id: int):
+    """Выключение всех включенных устройств пользователя одним запросом"""
+    return update(Device).where(
+        Device.owner_id == user_id,
+        Device.is_on == True
+    ).values(is_on=False, version=Device.version + 1).returning(Device.id).execution_options(
+        synchronize_session=False
+    )
+
+
+def emergency_command(user_id: int, command_text: str, language: str = "ru-RU") -> Command:
+    return Command(
+        user_id=user_id,
+        device_id=None,
+        command_text=command_text,
+        recognized_text=command_text,
+        action="emergency_stop",
+        status="executed",
+        language=language
+    )
+
+
+def _decision(analysis: AnalysisResult, user_id: int, entry: Optional[DeviceEntry]) -> Command:
+    return Command(
+        user_id=user_id,
+        device_id=entry.id if entry else None,
+        command_text=analysis.recognized_text,
+        recognized_text=analysis.recognized_text,
+        action=analysis.action,
+        status="executed" if entry else "failed",
+        language="ru-RU"
+    )
+
+
+def _apply_action(device: Device, action: str) -> bool:
+    """Меняет состояние устройства в сессии; False - действие не меняет состояние"""
+    if action not in ["turn_on", "turn_off"]:
+        return False
+    device.is_on = action == "turn_on"
+    device.version = Device.version + 1
+    return True
+
+
+def _states_statement():
+    # Табличный (не ORM) UPDATE: executemany с выражением version + 1
+    devices = Device.__table__
+    return update(devices).where(devices.c.id == bindparam("device_id")).values(
+        is_on=bindparam("new_is_on"),
+        version=devices.c.version + 1
+    )
+
+
+def _states_params(states: Dict[int, bool]) -> List[Dict[str, object]]:
+    return [{"device_id": device_id, "new_is_on": is_on} for device_id, is_on in states.items()]
+
+
+def _check_states_updated(result: Result, states: Dict[int, bool], db: Session) -> None:
+    # Устройство из реестра удалено другим процессом: та же ошибка,
+    # что и при flush одиночного решения
+    if result.rowcount != len(states) and db.get_bind().dialect.supports_sane_multi_rowcount:
+        raise StaleDataError(
+            f"UPDATE of devices expected to match {len(states)} row(s); {result.rowcount} were matched"
+        )
+
+
+def _mark_stopped(db: Session, device_ids: List[int]) -> None:
+    # Загруженные в сессию устройства не должны перезаписать новое состояние
+    for device_id in device_ids:
+        device = db.identity_map.get(identity_key(Device, device_id))
+        if device is not None:
+            set_committed_value(device, "is_on", False)
+            db.expire(device, ["version"])
 
 
 class DecisionController:
-    def __init__(self, db: Session):
-        self.repository_request = RequestRepository(db)
-        self.repository_decision = DecisionRepository(db)
+    def __init__(self, db: Session, unit_of_work: bool = False, registry: DeviceRegistry = device_registry):
+        self.repository_request = RequestRepository(db, autocommit=not unit_of_work)
+        self.repository_decision = DecisionRepository(db, autocommit=not unit_of_work)
+        self.unit_of_work = unit_of_work
+        self.registry = registry
         self.db = db
     
-    def form_decision(self, analysis: Dict[str, Any], user_id: int) -> Command:
-        action = analysis.get("action")
-        device_type = analysis.get("device_type")
-        location = analysis.get("location")
+    def form_decision(self, analysis: AnalysisResult, user_id: int) -> Command:
+        action = analysis.action
+        device_type = analysis.device_type
+        location = analysis.location
         
-        if action in ["stop", "pause"]:
-            devices = self.db.query(Device).filter(
-                Device.owner_id == user_id,
-                Device.is_on == True
-            ).all()
-            for dev in devices:
-                dev.is_on = False
+        if action in EMERGENCY_ACTIONS:
+            self.emergency_stop(user_id)
+            if not self.unit_of_work:
+                self.db.commit()
+            return self.repository_decision.create(emergency_command(user_id, analysis.recognized_text))
+        
+        entry = self.registry.resolve(self.db, user_id, device_type or None, location or None)
+        device = self.registry.attach(self.db, entry) if entry else None
+        
+        decision = _decision(analysis, user_id, entry)
+        
+        if device and _apply_action(device, action) and not self.unit_of_work:
             self.db.commit()
+        
+        decision.device = device
+        return self.repository_decision.create(decision)
+    
+    def form_decisions(
+        self,
+        analyses: List[AnalysisResult],
+        user_id: int
+    ) -> List[Tuple[Command, Optional[DeviceEntry]]]:
+        """
+        Пакетное формирование решений
+
+        Итоговые состояния устройств вычисляются в памяти в порядке команд
+        и записываются одним пакетным UPDATE, команды - одной пакетной вставкой
+        """
+        decisions: List[Tuple[Command, Optional[DeviceEntry]]] = []
+        states: Dict[int, bool] = {}
+        emergency_stop = False
+        
+        for analysis in analyses:
+            if analysis.action in EMERGENCY_ACTIONS:
+                emergency_stop = True
+                states.clear()
+                decisions.append((emergency_command(user_id, analysis.recognized_text), None))
+                continue
             
-            decision = Command(
-                user_id=user_id,
-                device_id=None,
-                command_text=analysis.get("recognized_text", ""),
-                recognized_text=analysis.get("recognized_text", ""),
-                action="emergency_stop",
-                status="executed",
-                language="ru-RU"
+            entry = self.registry.resolve(
+                self.db, user_id, analysis.device_type or None, analysis.location or None
             )
-            return self.repository_decision.create(decision)
+            if entry and analysis.action in ["turn_on", "turn_off"]:
+                states[entry.id] = analysis.action == "turn_on"
+            decisions.append((_decision(analysis, user_id, entry), entry))
         
-        device_query = self.db.query(Device).filter(
-            Device.owner_id == user_id,
-            Device.is_active == True
-        )
+        if emergency_stop:
+            self.emergency_stop(user_id)
+        if states:
+            result = self.db.execute(_states_statement(), _states_params(states))
+            _check_states_updated(result, states, self.db)
         
-        if device_type:
-            device_query = device_query.filter(Device.device_type == device_type)
-        if location:
-            device_query = device_query.filter(Device.location == location)
+        self.db.add_all([decision for decision, _ in decisions])
+        if self.unit_of_work:
+            self.db.flush()
+        else:
+            self.db.commit()
+        return decisions
+    
+    def emergency_stop(self, user_id: int) -> List[int]:
+        """Возвращает id выключенных устройств"""
+        device_ids = list(self.db.execute(emergency_stop_statement(user_id)).scalars())
+        _mark_stopped(self.db, device_ids)
+        return device_ids
+    
+    def get_decision(self) -> Optional[Command]:
+        return self.repository_decision.get_latest_decision()
+
+
+class AsyncDecisionController:
+    """DecisionController для асинхронной сессии: те же запросы, без потока на ожидание базы"""
+    def __init__(
+        self,
+        db: AsyncSession,
+        unit_of_work: bool = False,
+        registry: DeviceRegistry = device_registry
+    ):
+        self.repository_request = AsyncRequestRepository(db, autocommit=not unit_of_work)
+        self.repository_decision = AsyncDecisionRepository(db, autocommit=not unit_of_work)
+        self.unit_of_work = unit_of_work
+        self.registry = registry
+        self.db = db
+    
+    async def form_decision(self, analysis: AnalysisResult, user_id: int) -> Command:
+        action = analysis.action
         
-        device = device_query.first()
+        if action in EMERGENCY_ACTIONS:
+            await self.emergency_stop(user_id)
+            if not self.unit_of_work:
+                await self.db.commit()
+            return await self.repository_decision.create(emergency_command(user_id, analysis.recognized_text))
         
-        decision = Command(
-            user_id=user_id,
-            device_id=device.id if device else None,
-            command_text=analysis.get("recognized_text", ""),
-            recognized_text=analysis.get("recognized_text", ""),
-            action=action,
-            status="executed" if device else "failed",
-            language="ru-RU"
+        entry = await self.registry.resolve_async(
+            self.db, user_id, analysis.device_type or None, analysis.location or None
         )
+        device = self.registry.attach(self.db.sync_session, entry) if entry else None
+        decision = _decision(analysis, user_id, entry)
         
-        if device and action in ["turn_on", "turn_off"]:
-            if action == "turn_on":
-                device.is_on = True
-            elif action == "turn_off":
-                device.is_on = False
-            self.db.commit()
+        if device and _apply_action(device, action) and not self.unit_of_work:
+            await self.db.commit()
         
-        return self.repository_decision.create(decision)
+        decision.device = device
+        return await self.repository_decision.create(decision)
     
-    def get_decision(self) -> Optional[Command]:
-        decisions = self.repository_decision.get_decision()
-        return decisions[-1] if decisions else None
-
+    async def form_decisions(
+        self,
+        analyses: List[AnalysisResult],
+        user_id: int
+    ) -> List[Tuple[Command, Optional[DeviceEntry]]]:
+        """Пакетное формирование решений, как DecisionController.form_decisions"""
+        decisions: List[Tuple[Command, Optional[DeviceEntry]]] = []
+        states: Dict[int, bool] = {}
+        emergency_stop = False
+        
+        for analysis in analyses:
+            if analysis.action in EMERGENCY_ACTIONS:
+                emergency_stop = True
+                states.clear()
+                decisions.append((emergency_command(user_id, analysis.recognized_text), None))
+                continue
+            
+            entry = await self.registry.resolve_async(
+                self.db, user_id, analysis.device_type or None, analysis.location or None
+            )
+            if entry and analysis.action in ["turn_on", "turn_off"]:
+                states[entry.id] = analysis.action == "turn_on"
+            decisions.append((_decision(analysis, user_id, entry), entry))
+        
+        if emergency_stop:
+            await self.emergency_stop(user_id)
+        if states:
+            result = await self.db.execute(_states_statement(), _states_params(states))
+            _check_states_updated(result, states, self.db.sync_session)
+        
+        self.db.add_all([decision for decision, _ in decisions])
+        if self.unit_of_work:
+            await self.db.flush()
+        else:
+            await self.db.commit()
+        return decisions
+    
+    async def emergency_stop(self, user_id: int) -> List[int]:
+        """Возвращает id выключенных устройств"""
+        device_ids = list((await self.db.execute(emergency_stop_statement(user_id))).scalars())
+        _mark_stopped(self.db.sync_session, device_ids)
+        return device_ids
+    
+    async def get_decision(self) -> Optional[Command]:
+        return await self.repository_decision.get_latest_decision()
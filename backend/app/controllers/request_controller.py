@@ -1,27 +1,64 @@
 from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models import Command, AudioData
-from app.repositories.request_repository import RequestRepository
-from app.repositories.sound_repository import SoundRepository
+from app.repositories.request_repository import AsyncRequestRepository, RequestRepository
+from app.repositories.sound_repository import AsyncSoundRepository, SoundRepository
+
+
+def _request(command_text: str, user_id: int, language: str) -> Command:
+    return Command(
+        user_id=user_id,
+        command_text=command_text,
+        recognized_text=command_text,
+        status="pending",
+        language=language
+    )
 
 
 class RequestController:
-    def __init__(self, db: Session):
-        self.repository_sound = SoundRepository(db)
-        self.repository_request = RequestRepository(db)
+    def __init__(self, db: Session, unit_of_work: bool = False):
+        self.repository_sound = SoundRepository(db, autocommit=not unit_of_work)
+        self.repository_request = RequestRepository(db, autocommit=not unit_of_work)
+        self.unit_of_work = unit_of_work
         self.db = db
     
-    def form_request(self, command_text: str, user_id: int, audio_data: Optional[AudioData] = None) -> Command:
-        request = Command(
-            user_id=user_id,
-            command_text=command_text,
-            recognized_text=command_text,
-            status="pending",
-            language="ru-RU"
-        )
+    def form_request(
+        self,
+        command_text: str,
+        user_id: int,
+        audio_data: Optional[AudioData] = None,
+        language: str = "ru-RU"
+    ) -> Command:
+        request = _request(command_text, user_id, language)
+        # В режиме единицы работы запрос не сохраняется отдельной строкой:
+        # в истории остается только команда, сформированная решением
+        if self.unit_of_work:
+            return request
         return self.repository_request.create(request)
     
     def get_request(self) -> Optional[Command]:
-        requests = self.repository_request.get_all()
-        return requests[-1] if requests else None
+        return self.repository_request.get_latest()
+
 
+class AsyncRequestController:
+    def __init__(self, db: AsyncSession, unit_of_work: bool = False):
+        self.repository_sound = AsyncSoundRepository(db, autocommit=not unit_of_work)
+        self.repository_request = AsyncRequestRepository(db, autocommit=not unit_of_work)
+        self.unit_of_work = unit_of_work
+        self.db = db
+    
+    async def form_request(
+        self,
+        command_text: str,
+        user_id: int,
+        audio_data: Optional[AudioData] = None,
+        language: str = "ru-RU"
+    ) -> Command:
+        request = _request(command_text, user_id, language)
+        if self.unit_of_work:
+            return request
+        return await self.repository_request.create(request)
+    
+    async def get_request(self) -> Optional[Command]:
+        return await self.repository_request.get_latest()
@@ -1,29 +1,57 @@
-from typing import Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
 from app.models import Command
 from app.repositories.request_repository import RequestRepository
 from app.repositories.response_repository import ResponseRepository
+from app.controllers.sequence_controller import SequenceResult
+from app.services.device_registry import DeviceEntry
 from app import schemas
 
 
-class ResponseController:
-    def __init__(self, db: Session):
-        self.repository_request = RequestRepository(db)
-        self.repository_response = ResponseRepository(db)
-        self.db = db
+class ResponseFormatter:
+    """Ответы на голосовые команды; к базе не обращается"""
     
     def form_response(self, decision: Command) -> schemas.VoiceCommandResponse:
         device = decision.device if decision.device_id else None
-        
+        return self._build_response(decision, device.name if device else None)
+    
+    def form_responses(
+        self,
+        decisions: List[Tuple[Command, Optional[DeviceEntry]]]
+    ) -> List[schemas.VoiceCommandResponse]:
+        return [
+            self._build_response(decision, entry.name if entry else None)
+            for decision, entry in decisions
+        ]
+    
+    def form_sequence_response(self, result: SequenceResult, command_text: str) -> schemas.VoiceCommandResponse:
+        executed = [command for command in result.commands if command["status"] == "executed"]
+        if executed:
+            message = f"Выполняю сценарий «{result.sequence.name}»: устройств - {len(result.devices)}"
+        else:
+            message = f"Сценарий «{result.sequence.name}»: устройства не найдены"
+        return schemas.VoiceCommandResponse(
+            recognized_text=command_text.lower(),
+            action="command_sequence",
+            device_id=None,
+            status="executed" if executed else "failed",
+            message=message
+        )
+    
+    def _build_response(
+        self,
+        decision: Command,
+        device_name: Optional[str]
+    ) -> schemas.VoiceCommandResponse:
         if decision.action == "emergency_stop":
             message = "Выполняю экстренную остановку всех устройств!"
-        elif decision.status == "executed" and device:
+        elif decision.status == "executed" and device_name:
             if decision.action == "turn_on":
-                message = f"Включаю {device.name}"
+                message = f"Включаю {device_name}"
             elif decision.action == "turn_off":
-                message = f"Выключаю {device.name}"
+                message = f"Выключаю {device_name}"
             else:
-                message = f"Выполняю команду для {device.name}"
+                message = f"Выполняю команду для {device_name}"
         else:
             message = "Устройство не найдено"
         
@@ -36,11 +64,18 @@ class ResponseController:
         )
         
         return response
+
+
+response_formatter = ResponseFormatter()
+
+
+class ResponseController(ResponseFormatter):
+    def __init__(self, db: Session):
+        self.repository_request = RequestRepository(db)
+        self.repository_response = ResponseRepository(db)
+        self.db = db
     
     def get_response(self) -> Optional[schemas.VoiceCommandResponse]:
-        responses = self.repository_response.get_response()
-        if responses:
-            last_response = responses[-1]
-            return self.form_response(last_response)
-        return None
+        last_response = self.repository_response.get_latest_response()
+        return self.form_response(last_response) if last_response else None
 
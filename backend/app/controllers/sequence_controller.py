@@ -0,0 +1,130 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+from sqlalchemy import and_, case, func, insert, or_, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models import Command, Device
+from app.services.command_sequences import CommandSequence, SequenceStep, STATE_ACTIONS
+
+
+@dataclass(frozen=True, slots=True)
+class SequenceResult:
+    sequence: CommandSequence
+    # Строки вставленных команд (без id: вставка выполняется без RETURNING)
+    commands: List[Dict[str, Any]]
+    # (id, name, device_type, location, is_on) затронутых устройств
+    devices: List[Tuple[int, str, str, str, bool]]
+
+
+def _condition(step: SequenceStep):
+    conditions = []
+    if step.device_id is not None:
+        conditions.append(Device.id == step.device_id)
+    if step.device_type is not None:
+        conditions.append(Device.device_type == step.device_type)
+    if step.location is not None:
+        conditions.append(Device.location == step.location)
+    return and_(*conditions) if conditions else true()
+
+
+def sequence_statement(sequence: CommandSequence, user_id: int):
+    """
+    Выполнение сценария за один запрос к устройствам
+
+    Итоговое состояние каждого устройства задается выражением CASE, где
+    более поздние шаги проверяются раньше и перекрывают предыдущие.
+    Устройства шагов без изменения состояния попадают в тот же UPDATE
+    только ради RETURNING: их is_on, updated_at и version остаются прежними
+    """
+    conditions = [_condition(step) for step in sequence.steps]
+    state_branches = [
+        (condition, STATE_ACTIONS[step.action])
+        for step, condition in reversed(list(zip(sequence.steps, conditions)))
+        if step.action in STATE_ACTIONS
+    ]
+    changes = or_(*(condition for condition, _ in state_branches)) if state_branches else None
+
+    return update(Device).where(
+        Device.owner_id == user_id,
+        Device.is_active == True,
+        or_(*conditions)
+    ).values(
+        is_on=case(*state_branches, else_=Device.is_on) if state_branches else Device.is_on,
+        updated_at=case((changes, func.now()), else_=Device.updated_at)
+        if changes is not None else Device.updated_at,
+        version=case((changes, Device.version + 1), else_=Device.version)
+        if changes is not None else Device.version
+    ).returning(
+        Device.id, Device.name, Device.device_type, Device.location, Device.is_on
+    ).execution_options(synchronize_session=False)
+
+
+def sequence_commands(
+    sequence: CommandSequence,
+    devices: List[Tuple[int, str, str, str, bool]],
+    user_id: int,
+    command_text: str,
+    language: str
+) -> List[Dict[str, Any]]:
+    """Строки команд для каждого шага и каждого затронутого им устройства"""
+    commands: List[Dict[str, Any]] = []
+    for step in sequence.steps:
+        targets = [device[0] for device in devices if step.matches(device[0], device[2], device[3])]
+        for device_id in targets or [None]:
+            commands.append({
+                "user_id": user_id,
+                "device_id": device_id,
+                "command_text": command_text,
+                "recognized_text": command_text,
+                "action": step.action,
+                "status": "executed" if device_id else "failed",
+                "language": language,
+            })
+    return commands
+
+
+class SequenceController:
+    def __init__(self, db: Session, unit_of_work: bool = False):
+        self.unit_of_work = unit_of_work
+        self.db = db
+
+    def execute_sequence(
+        self,
+        sequence: CommandSequence,
+        user_id: int,
+        command_text: str,
+        language: str = "ru-RU"
+    ) -> SequenceResult:
+        devices = [tuple(row) for row in self.db.execute(sequence_statement(sequence, user_id))]
+        commands = sequence_commands(sequence, devices, user_id, command_text, language)
+
+        # Команды всех шагов вставляются одним пакетным INSERT
+        self.db.execute(insert(Command), commands)
+        if self.unit_of_work:
+            self.db.flush()
+        else:
+            self.db.commit()
+        return SequenceResult(sequence=sequence, commands=commands, devices=devices)
+
+
+class AsyncSequenceController:
+    def __init__(self, db: AsyncSession, unit_of_work: bool = False):
+        self.unit_of_work = unit_of_work
+        self.db = db
+
+    async def execute_sequence(
+        self,
+        sequence: CommandSequence,
+        user_id: int,
+        command_text: str,
+        language: str = "ru-RU"
+    ) -> SequenceResult:
+        devices = [tuple(row) for row in await self.db.execute(sequence_statement(sequence, user_id))]
+        commands = sequence_commands(sequence, devices, user_id, command_text, language)
+
+        await self.db.execute(insert(Command), commands)
+        if self.unit_of_work:
+            await self.db.flush()
+        else:
+            await self.db.commit()
+        return SequenceResult(sequence=sequence, commands=commands, devices=devices)
@@ -1,12 +1,47 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import devices, commands, settings, users, voice
+from app.database import SessionLocal, engine
+from app.routers import devices, commands, settings, users, voice, metrics, analytics
+from app.services import audio_worker, analytics_rollup, command_partitions
+from app.services.emergency_lane import emergency_lane
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Встроенный воркер обработки аудио (иначе запускается отдельно:
+    # python -m app.services.audio_worker)
+    if os.getenv("AUDIO_WORKER_EMBEDDED", "false").lower() == "true":
+        audio_worker.audio_worker = audio_worker.AudioWorker(SessionLocal)
+        audio_worker.audio_worker.start()
+    # Встроенная агрегация аналитики (иначе: python -m app.services.analytics_rollup)
+    if os.getenv("ANALYTICS_ROLLUP_EMBEDDED", "false").lower() == "true":
+        analytics_rollup.rollup_compactor = analytics_rollup.RollupCompactor(SessionLocal)
+        analytics_rollup.rollup_compactor.start()
+    # Встроенное обслуживание секций commands (иначе: python -m app.services.command_partitions)
+    if os.getenv("COMMAND_PARTITIONS_EMBEDDED", "false").lower() == "true":
+        command_partitions.partition_maintainer = command_partitions.PartitionMaintainer(engine)
+        command_partitions.partition_maintainer.start()
+    await emergency_lane.warm_up()
+    yield
+    if audio_worker.audio_worker is not None:
+        audio_worker.audio_worker.stop()
+        audio_worker.audio_worker = None
+    if analytics_rollup.rollup_compactor is not None:
+        analytics_rollup.rollup_compactor.stop()
+        analytics_rollup.rollup_compactor = None
+    if command_partitions.partition_maintainer is not None:
+        command_partitions.partition_maintainer.stop()
+        command_partitions.partition_maintainer = None
+
 
 app = FastAPI(
     title="Voice Assistant API",
     description="API для интеллектуальной системы распознавания речи",
     version="1.0.0",
-    redirect_slashes=False
+    redirect_slashes=False,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -15,6 +50,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 app.include_router(users.router, prefix="/api/users", tags=["users"])
@@ -22,6 +58,8 @@ app.include_router(devices.router, prefix="/api/devices", tags=["devices"])
 app.include_router(commands.router, prefix="/api/commands", tags=["commands"])
 app.include_router(settings.router, prefix="/api/settings", tags=["settings"])
 app.include_router(voice.router, prefix="/api/voice", tags=["voice"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
 
 
 @app.get("/")
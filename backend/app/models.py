@@ -4,7 +4,7 @@
 Содержит SQLAlchemy модели, соответствующие объектной модели системы
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, Float, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -46,6 +46,10 @@ class Device(Base):
     location = Column(String(255), nullable=True)  # Гостиная, Спальня, etc.
     is_active = Column(Boolean, default=True)
     is_on = Column(Boolean, default=False)
+    # Версия для оптимистической блокировки (ETag / If-Match); увеличивается
+    # каждым изменяющим запросом явно, а не через version_id_col маппера,
+    # так как голосовой конвейер обновляет устройства без их загрузки
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -54,6 +58,13 @@ class Device(Base):
     owner = relationship("User", back_populates="devices")
     commands = relationship("Command", back_populates="device")
 
+    __table_args__ = (
+        # Загрузка активных устройств пользователя (реестр устройств, голосовой поиск)
+        Index("ix_devices_owner_active_type_location", "owner_id", "is_active", "device_type", "location"),
+        # Экстренная остановка: только включенные устройства
+        Index("ix_devices_owner_on", "owner_id", postgresql_where=is_on == True),
+    )
+
 
 class Command(Base):
     """
@@ -63,7 +74,7 @@ class Command(Base):
     """
     __tablename__ = "commands"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     device_id = Column(Integer, ForeignKey("devices.id"), nullable=True)
     command_text = Column(Text, nullable=False)  # Текст распознанной команды
@@ -71,12 +82,25 @@ class Command(Base):
     action = Column(String(255), nullable=True)  # Выполненное действие
     status = Column(String(50), default="pending")  # pending, executed, failed
     language = Column(String(10), default="ru-RU")  # Язык команды
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Ключ помесячного секционирования (app/services/command_partitions.py)
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
 
     # Связи
     user = relationship("User", back_populates="commands")
     device = relationship("Device", back_populates="commands")
 
+    __table_args__ = (
+        # История команд пользователя: постраничный вывод по (created_at, id)
+        Index("ix_commands_user_created_id", "user_id", created_at.desc(), id.desc()),
+        # Последние выполненные команды (get_decision / get_response)
+        Index("ix_commands_status_id", "status", "id"),
+        Index("ix_commands_device_id", "device_id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    # Первичный ключ таблицы - (id, created_at), но id уникален сам по себе:
+    # поиск по id (Session.get) работает без даты
+    __mapper_args__ = {"primary_key": [id]}
+
 
 class UserSettings(Base):
     """
@@ -130,3 +154,53 @@ class AudioData(Base):
     processed = Column(Boolean, default=False)  # Обработано ли аудио
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Очередь фонового анализа: индекс содержит только необработанные записи
+        Index(
+            "ix_audio_data_unprocessed",
+            "id",
+            postgresql_where=(processed == False) & file_path.isnot(None)
+        ),
+    )
+
+
+class CommandRollup(Base):
+    """
+    Агрегаты истории команд
+
+    Число команд по пользователю, часу, действию, типу устройства и статусу.
+    Пополняется инкрементально задачей app/services/analytics_rollup.py;
+    отсутствующие действие и тип устройства хранятся пустой строкой
+    """
+    __tablename__ = "command_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    action = Column(String(255), primary_key=True, default="")
+    device_type = Column(String(100), primary_key=True, default="")
+    status = Column(String(50), primary_key=True, default="")
+    count = Column(BigInteger, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    """Последняя учтенная в агрегатах команда для каждой задачи агрегации"""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    last_id = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class RollupGap(Base):
+    """
+    Пропуски в id команд ниже отметки агрегации
+
+    id выдается до фиксации транзакции, поэтому строка может появиться
+    уже после того, как отметка ушла дальше; такие id проверяются
+    повторно на следующих проходах
+    """
+    __tablename__ = "rollup_gaps"
+
+    name = Column(String(50), primary_key=True)
+    command_id = Column(BigInteger, primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,8 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, TypeVar, Generic
+from typing import AsyncIterator, Iterator, List, Optional, TypeVar, Generic
 
 T = TypeVar('T')
 
+# Размер порции при потоковом чтении (yield_per / серверный курсор)
+DEFAULT_BATCH_SIZE = 1000
+
 
 class IRepository(ABC, Generic[T]):
     @abstractmethod
@@ -13,6 +16,10 @@ class IRepository(ABC, Generic[T]):
     def get_all(self) -> List[T]:
         pass
     
+    @abstractmethod
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[T]:
+        pass
+    
     @abstractmethod
     def create(self, entity: T) -> T:
         pass
@@ -25,3 +32,28 @@ class IRepository(ABC, Generic[T]):
     def delete(self, id: int) -> bool:
         pass
 
+
+class IAsyncRepository(ABC, Generic[T]):
+    @abstractmethod
+    async def get_by_id(self, id: int) -> Optional[T]:
+        pass
+    
+    @abstractmethod
+    async def get_all(self) -> List[T]:
+        pass
+    
+    @abstractmethod
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[T]:
+        pass
+    
+    @abstractmethod
+    async def create(self, entity: T) -> T:
+        pass
+    
+    @abstractmethod
+    async def update(self, entity: T) -> T:
+        pass
+    
+    @abstractmethod
+    async def delete(self, id: int) -> bool:
+        pass
@@ -1,12 +1,15 @@
-from typing import List, Optional
+from typing import AsyncIterator, Iterator, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models import Command
-from app.repositories.base import IRepository
+from app.repositories.base import DEFAULT_BATCH_SIZE, IRepository, IAsyncRepository
 
 
 class DecisionRepository(IRepository[Command]):
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, autocommit: bool = True):
         self.db = db
+        self.autocommit = autocommit
     
     def get_by_id(self, id: int) -> Optional[Command]:
         return self.db.query(Command).filter(Command.id == id).first()
@@ -14,6 +17,19 @@ class DecisionRepository(IRepository[Command]):
     def get_all(self) -> List[Command]:
         return self.db.query(Command).all()
     
+    def get_latest_decision(self) -> Optional[Command]:
+        return self.db.query(Command).filter(
+            Command.status == "executed"
+        ).order_by(Command.id.desc()).first()
+    
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Command]:
+        return iter(self.db.query(Command).order_by(Command.id).yield_per(batch_size))
+    
+    def iter_decisions(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Command]:
+        return iter(self.db.query(Command).filter(
+            Command.status == "executed"
+        ).order_by(Command.id).yield_per(batch_size))
+    
     def get_decision(self) -> List[Command]:
         return self.db.query(Command).filter(Command.status == "executed").all()
     
@@ -22,20 +38,96 @@ class DecisionRepository(IRepository[Command]):
     
     def create(self, entity: Command) -> Command:
         self.db.add(entity)
-        self.db.commit()
-        self.db.refresh(entity)
+        if self.autocommit:
+            self.db.commit()
+            self.db.refresh(entity)
+        else:
+            self.db.flush()
         return entity
     
     def update(self, entity: Command) -> Command:
-        self.db.commit()
-        self.db.refresh(entity)
+        if self.autocommit:
+            self.db.commit()
+            self.db.refresh(entity)
+        else:
+            self.db.flush()
         return entity
     
     def delete(self, id: int) -> bool:
         entity = self.get_by_id(id)
         if entity:
             self.db.delete(entity)
-            self.db.commit()
+            if self.autocommit:
+                self.db.commit()
+            else:
+                self.db.flush()
             return True
         return False
 
+
+class AsyncDecisionRepository(IAsyncRepository[Command]):
+    def __init__(self, db: AsyncSession, autocommit: bool = True):
+        self.db = db
+        self.autocommit = autocommit
+    
+    async def get_by_id(self, id: int) -> Optional[Command]:
+        return await self.db.get(Command, id)
+    
+    async def get_all(self) -> List[Command]:
+        result = await self.db.execute(select(Command))
+        return list(result.scalars().all())
+    
+    async def get_latest_decision(self) -> Optional[Command]:
+        return await self.db.scalar(
+            select(Command).where(Command.status == "executed").order_by(Command.id.desc()).limit(1)
+        )
+    
+    async def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[Command]:
+        result = await self.db.stream_scalars(
+            select(Command).order_by(Command.id).execution_options(yield_per=batch_size)
+        )
+        async for entity in result:
+            yield entity
+    
+    async def iter_decisions(self, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[Command]:
+        result = await self.db.stream_scalars(
+            select(Command).where(Command.status == "executed").order_by(Command.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for entity in result:
+            yield entity
+    
+    async def get_decision(self) -> List[Command]:
+        result = await self.db.execute(select(Command).where(Command.status == "executed"))
+        return list(result.scalars().all())
+    
+    async def save_decision(self, entity: Command) -> Command:
+        return await self.create(entity)
+    
+    async def create(self, entity: Command) -> Command:
+        self.db.add(entity)
+        if self.autocommit:
+            await self.db.commit()
+            await self.db.refresh(entity)
+        else:
+            await self.db.flush()
+        return entity
+    
+    async def update(self, entity: Command) -> Command:
+        if self.autocommit:
+            await self.db.commit()
+            await self.db.refresh(entity)
+        else:
+            await self.db.flush()
+        return entity
+    
+    async def delete(self, id: int) -> bool:
+        entity = await self.get_by_id(id)
+        if entity:
+            await self.db.delete(entity)
+            if self.autocommit:
+                await self.db.commit()
+            else:
+                await self.db.flush()
+            return True
+        return False
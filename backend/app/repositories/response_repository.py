@@ -1,12 +1,13 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from sqlalchemy.orm import Session
 from app.models import Command
-from app.repositories.base import IRepository
+from app.repositories.base import DEFAULT_BATCH_SIZE, IRepository
 
 
 class ResponseRepository(IRepository[Command]):
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, autocommit: bool = True):
         self.db = db
+        self.autocommit = autocommit
     
     def get_by_id(self, id: int) -> Optional[Command]:
         return self.db.query(Command).filter(Command.id == id).first()
@@ -14,6 +15,19 @@ class ResponseRepository(IRepository[Command]):
     def get_all(self) -> List[Command]:
         return self.db.query(Command).all()
     
+    def get_latest_response(self) -> Optional[Command]:
+        return self.db.query(Command).filter(
+            Command.status == "executed"
+        ).order_by(Command.id.desc()).first()
+    
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Command]:
+        return iter(self.db.query(Command).order_by(Command.id).yield_per(batch_size))
+    
+    def iter_responses(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Command]:
+        return iter(self.db.query(Command).filter(
+            Command.status == "executed"
+        ).order_by(Command.id).yield_per(batch_size))
+    
     def get_response(self) -> List[Command]:
         return self.db.query(Command).filter(Command.status == "executed").all()
     
@@ -22,20 +36,29 @@ class ResponseRepository(IRepository[Command]):
     
     def create(self, entity: Command) -> Command:
         self.db.add(entity)
-        self.db.commit()
-        self.db.refresh(entity)
+        if self.autocommit:
+            self.db.commit()
+            self.db.refresh(entity)
+        else:
+            self.db.flush()
         return entity
     
     def update(self, entity: Command) -> Command:
-        self.db.commit()
-        self.db.refresh(entity)
+        if self.autocommit:
+            self.db.commit()
+            self.db.refresh(entity)
+        else:
+            self.db.flush()
         return entity
     
     def delete(self, id: int) -> bool:
         entity = self.get_by_id(id)
         if entity:
             self.db.delete(entity)
-            self.db.commit()
+            if self.autocommit:
+                self.db.commit()
+            else:
+                self.db.flush()
             return True
         return False
 
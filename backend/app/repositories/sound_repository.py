@@ -1,12 +1,15 @@
-from typing import List, Optional
+from typing import AsyncIterator, Iterator, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models import AudioData
-from app.repositories.base import IRepository
+from app.repositories.base import DEFAULT_BATCH_SIZE, IRepository, IAsyncRepository
 
 
 class SoundRepository(IRepository[AudioData]):
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, autocommit: bool = True):
         self.db = db
+        self.autocommit = autocommit
     
     def get_by_id(self, id: int) -> Optional[AudioData]:
         return self.db.query(AudioData).filter(AudioData.id == id).first()
@@ -14,6 +17,15 @@ class SoundRepository(IRepository[AudioData]):
     def get_all(self) -> List[AudioData]:
         return self.db.query(AudioData).all()
     
+    def get_latest_sound(self) -> Optional[AudioData]:
+        return self.db.query(AudioData).order_by(AudioData.id.desc()).first()
+    
+    def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[AudioData]:
+        return iter(self.db.query(AudioData).order_by(AudioData.id).yield_per(batch_size))
+    
+    def iter_sounds(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[AudioData]:
+        return iter(self.db.query(AudioData).order_by(AudioData.id).yield_per(batch_size))
+    
     def get_sound(self) -> List[AudioData]:
         return self.db.query(AudioData).all()
     
@@ -22,20 +34,93 @@ class SoundRepository(IRepository[AudioData]):
     
     def create(self, entity: AudioData) -> AudioData:
         self.db.add(entity)
-        self.db.commit()
-        self.db.refresh(entity)
+        if self.autocommit:
+            self.db.commit()
+            self.db.refresh(entity)
+        else:
+            self.db.flush()
         return entity
     
     def update(self, entity: AudioData) -> AudioData:
-        self.db.commit()
-        self.db.refresh(entity)
+        if self.autocommit:
+            self.db.commit()
+            self.db.refresh(entity)
+        else:
+            self.db.flush()
         return entity
     
     def delete(self, id: int) -> bool:
         entity = self.get_by_id(id)
         if entity:
             self.db.delete(entity)
-            self.db.commit()
+            if self.autocommit:
+                self.db.commit()
+            else:
+                self.db.flush()
             return True
         return False
 
+
+class AsyncSoundRepository(IAsyncRepository[AudioData]):
+    def __init__(self, db: AsyncSession, autocommit: bool = True):
+        self.db = db
+        self.autocommit = autocommit
+    
+    async def get_by_id(self, id: int) -> Optional[AudioData]:
+        return await self.db.get(AudioData, id)
+    
+    async def get_all(self) -> List[AudioData]:
+        result = await self.db.execute(select(AudioData))
+        return list(result.scalars().all())
+    
+    async def get_latest_sound(self) -> Optional[AudioData]:
+        return await self.db.scalar(select(AudioData).order_by(AudioData.id.desc()).limit(1))
+    
+    async def iter_all(self, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[AudioData]:
+        result = await self.db.stream_scalars(
+            select(AudioData).order_by(AudioData.id).execution_options(yield_per=batch_size)
+        )
+        async for entity in result:
+            yield entity
+    
+    async def iter_sounds(self, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[AudioData]:
+        result = await self.db.stream_scalars(
+            select(AudioData).order_by(AudioData.id).execution_options(yield_per=batch_size)
+        )
+        async for entity in result:
+            yield entity
+    
+    async def get_sound(self) -> List[AudioData]:
+        result = await self.db.execute(select(AudioData))
+        return list(result.scalars().all())
+    
+    async def save_sound(self, entity: AudioData) -> AudioData:
+        return await self.create(entity)
+    
+    async def create(self, entity: AudioData) -> AudioData:
+        self.db.add(entity)
+        if self.autocommit:
+            await self.db.commit()
+            await self.db.refresh(entity)
+        else:
+            await self.db.flush()
+        return entity
+    
+    async def update(self, entity: AudioData) -> AudioData:
+        if self.autocommit:
+            await self.db.commit()
+            await self.db.refresh(entity)
+        else:
+            await self.db.flush()
+        return entity
+    
+    async def delete(self, id: int) -> bool:
+        entity = await self.get_by_id(id)
+        if entity:
+            await self.db.delete(entity)
+            if self.autocommit:
+                await self.db.commit()
+            else:
+                await self.db.flush()
+            return True
+        return False
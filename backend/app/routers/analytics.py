@@ -0,0 +1,110 @@
+"""
+Роутер аналитики команд
+
+Отвечает на запросы панели мониторинга по агрегатам command_rollups:
+объем чтения определяется окном в часах, а не размером истории команд.
+Данные отстают от истории на интервал агрегации
+(app/services/analytics_rollup.py)
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app import models
+from app.services.analytics_rollup import WATERMARK_NAME
+
+router = APIRouter()
+
+MAX_WINDOW_HOURS = 24 * 366
+
+
+def _window_start(hours: int) -> datetime:
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return now - timedelta(hours=hours - 1)
+
+
+def _rollups(db: Session, user_id: int, hours: int):
+    return db.query(models.CommandRollup).filter(
+        models.CommandRollup.user_id == user_id,
+        models.CommandRollup.hour >= _window_start(hours)
+    )
+
+
+@router.get("/summary")
+def get_summary(
+    user_id: int = 1,
+    hours: int = Query(24, ge=1, le=MAX_WINDOW_HOURS),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Общее число команд и доля успешных за окно"""
+    total, executed, failed = _rollups(db, user_id, hours).with_entities(
+        func.coalesce(func.sum(models.CommandRollup.count), 0),
+        func.coalesce(func.sum(case(
+            (models.CommandRollup.status == "executed", models.CommandRollup.count), else_=0
+        )), 0),
+        func.coalesce(func.sum(case(
+            (models.CommandRollup.status == "failed", models.CommandRollup.count), else_=0
+        )), 0)
+    ).one()
+    compacted_at = db.query(models.RollupWatermark.updated_at).filter(
+        models.RollupWatermark.name == WATERMARK_NAME
+    ).scalar()
+    return {
+        "since": _window_start(hours).isoformat(),
+        "total": int(total),
+        "executed": int(executed),
+        "failed": int(failed),
+        "success_rate": executed / total if total else None,
+        "compacted_at": compacted_at.isoformat() if compacted_at else None,
+    }
+
+
+@router.get("/top-actions")
+def get_top_actions(
+    user_id: int = 1,
+    hours: int = Query(24, ge=1, le=MAX_WINDOW_HOURS),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+) -> List[Dict[str, Any]]:
+    """Самые частые действия за окно"""
+    count = func.sum(models.CommandRollup.count).label("count")
+    rows = _rollups(db, user_id, hours).with_entities(
+        models.CommandRollup.action, count
+    ).group_by(models.CommandRollup.action).order_by(count.desc()).limit(limit).all()
+    return [{"action": action or None, "count": int(total)} for action, total in rows]
+
+
+@router.get("/device-failures")
+def get_device_failures(
+    user_id: int = 1,
+    hours: int = Query(24, ge=1, le=MAX_WINDOW_HOURS),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+) -> List[Dict[str, Any]]:
+    """
+    Неудачные команды по типам устройств за окно
+
+    device_type = null - команды, для которых устройство не найдено
+    """
+    failed = func.sum(case(
+        (models.CommandRollup.status == "failed", models.CommandRollup.count), else_=0
+    )).label("failed")
+    total = func.sum(models.CommandRollup.count).label("total")
+    rows = _rollups(db, user_id, hours).with_entities(
+        models.CommandRollup.device_type, failed, total
+    ).group_by(models.CommandRollup.device_type).having(failed > 0).order_by(
+        failed.desc()
+    ).limit(limit).all()
+    return [
+        {
+            "device_type": device_type or None,
+            "failed": int(failed_count),
+            "total": int(total_count),
+            "failure_rate": failed_count / total_count,
+        }
+        for device_type, failed_count, total_count in rows
+    ]
@@ -4,10 +4,17 @@
 Обрабатывает историю команд и их выполнение
 """
 
+from datetime import datetime
+from typing import Literal, Optional
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app import models, schemas
+from app.services.command_export import EXPORT_FORMATS, export_commands
+from app.services.fast_json import list_response, row_columns
+from app.services.pagination import InvalidCursor, decode_cursor, encode_cursor
 
 router = APIRouter()
 
@@ -60,6 +67,7 @@ def get_commands(
     user_id: int = 1,  # Временное решение
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
@@ -67,17 +75,82 @@ def get_commands(
     
     Args:
         user_id: ID пользователя
-        skip: Количество записей для пропуска
+        skip: Количество записей для пропуска (без курсора)
         limit: Максимальное количество записей
+        cursor: Курсор следующей страницы из заголовка X-Next-Cursor
         db: Сессия базы данных
     
     Returns:
-        Список команд
+        Список команд; курсор следующей страницы - в заголовке X-Next-Cursor
     """
-    commands = db.query(models.Command).filter(
+    # Порядок совпадает с индексом ix_commands_user_created_id
+    query = db.query(*row_columns(models.Command, schemas.CommandResponse)).filter(
         models.Command.user_id == user_id
-    ).order_by(models.Command.created_at.desc()).offset(skip).limit(limit).all()
-    return commands
+    ).order_by(models.Command.created_at.desc(), models.Command.id.desc())
+    if cursor:
+        try:
+            created_at, command_id = decode_cursor(cursor)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # Отдельное условие на created_at отсекает более новые секции commands
+        query = query.filter(
+            models.Command.created_at <= created_at,
+            tuple_(models.Command.created_at, models.Command.id) < tuple_(created_at, command_id)
+        )
+    elif skip:
+        query = query.offset(skip)
+
+    commands = query.limit(limit).all()
+
+    result = list_response(schemas.CommandListAdapter, (command._mapping for command in commands))
+    if len(commands) == limit and commands:
+        last = commands[-1]
+        result.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+    return result
+
+
+@router.get("/export")
+def export_command_history(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    gzip: bool = False
+):
+    """
+    Потоковая выгрузка истории команд для аудита
+    
+    Args:
+        format: ndjson или csv
+        user_id: ID пользователя (без него - все пользователи)
+        status: Фильтр по статусу команды
+        date_from: Начало периода (включительно)
+        date_to: Конец периода (не включительно)
+        gzip: Сжатие ответа
+    
+    Returns:
+        Команды в порядке id, отправляемые по частям
+    """
+    if date_from and date_to and date_from >= date_to:
+        raise HTTPException(status_code=400, detail="date_from must be earlier than date_to")
+
+    headers = {"Content-Disposition": f'attachment; filename="commands.{format}{".gz" if gzip else ""}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_commands(
+            SessionLocal,
+            export_format=format,
+            user_id=user_id,
+            status=status,
+            date_from=date_from,
+            date_to=date_to,
+            compress=gzip
+        ),
+        media_type=EXPORT_FORMATS[format],
+        headers=headers
+    )
 
 
 @router.get("/{command_id}", response_model=schemas.CommandResponse)
@@ -1,18 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+import os
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy import case, func, insert, not_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app import models, schemas
+from app.services.device_registry import device_registry
+from app.services.fast_json import list_response, row_columns, stream_list_response
 
 router = APIRouter(redirect_slashes=False)
 
+# Ограничение размера пакета и число устройств в одном запросе UPDATE
+DEVICE_BULK_MAX_ITEMS = int(os.getenv("DEVICE_BULK_MAX_ITEMS", "10000"))
+DEVICE_BULK_CHUNK_SIZE = 500
+# Ответ на пакет больше этого числа устройств отправляется потоком
+DEVICE_BULK_STREAM_THRESHOLD = int(os.getenv("DEVICE_BULK_STREAM_THRESHOLD", "2000"))
+
+
+def _etag(device: models.Device) -> str:
+    return f'"{device.version}"'
+
+
+def _expected_version(if_match: Optional[str]) -> Optional[int]:
+    """Версия из заголовка If-Match; None - условие не задано"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=412, detail="Precondition failed")
+
+
+async def _conditional_update(
+    db: AsyncSession,
+    device_id: int,
+    if_match: Optional[str],
+    **values
+) -> models.Device:
+    """
+    Изменение устройства одним запросом UPDATE ... RETURNING
+
+    Версия проверяется в том же WHERE, поэтому параллельные изменения
+    не теряются. Существование устройства проверяется отдельным запросом
+    только при неудаче, чтобы отличить 404 от 412
+    """
+    expected = _expected_version(if_match)
+    statement = update(models.Device).where(models.Device.id == device_id)
+    if expected is not None:
+        statement = statement.where(models.Device.version == expected)
+    statement = statement.values(
+        **values, version=models.Device.version + 1, updated_at=func.now()
+    ).returning(models.Device).execution_options(populate_existing=True)
+
+    device = await db.scalar(statement)
+    if device is None:
+        exists = await db.scalar(select(models.Device.id).where(models.Device.id == device_id))
+        await db.rollback()
+        if exists is None:
+            raise HTTPException(status_code=404, detail="Device not found")
+        raise HTTPException(status_code=412, detail="Device was modified by another request")
+    await db.commit()
+    device_registry.upsert(device)
+    return device
+
 
 @router.post("/", response_model=schemas.DeviceResponse)
-def create_device(
+async def create_device(
     device: schemas.DeviceCreate,
+    response: Response,
     user_id: int = 1,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -26,69 +88,209 @@ def create_device(
         is_on=False
     )
     db.add(db_device)
-    db.commit()
-    db.refresh(db_device)
+    await db.commit()
+    await db.refresh(db_device)
+    device_registry.upsert(db_device)
+    response.headers["ETag"] = _etag(db_device)
     return db_device
 
 
+def _bulk_response(rows: List[Any]) -> Response:
+    """
+    Ответ пакетных операций: строки RETURNING (столбцы DeviceResponse)
+    сериализуются orjson, без ORM-объектов и моделей Pydantic.
+    Строки уже зафиксированы, поэтому большой пакет можно отдавать потоком:
+    тело собирается порциями по DEVICE_BULK_CHUNK_SIZE устройств
+    """
+    mappings = [row._mapping for row in rows]
+    if len(mappings) > DEVICE_BULK_STREAM_THRESHOLD:
+        return stream_list_response(schemas.DeviceListAdapter, mappings, DEVICE_BULK_CHUNK_SIZE)
+    return list_response(schemas.DeviceListAdapter, mappings)
+
+
+def _check_bulk_size(items: list) -> None:
+    if len(items) > DEVICE_BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {DEVICE_BULK_MAX_ITEMS} devices per request")
+
+
+@router.post("/bulk", response_model=list[schemas.DeviceResponse])
+async def create_devices_bulk(
+    devices: List[schemas.DeviceBulkCreate],
+    user_id: int = 1,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Пакетное создание устройств
+
+    Владельцы проверяются одним запросом, устройства вставляются одним
+    пакетным INSERT ... RETURNING в одной транзакции. Устройства в ответе
+    идут в порядке запроса; ответ на пакет больше
+    DEVICE_BULK_STREAM_THRESHOLD устройств отправляется потоком
+    """
+    _check_bulk_size(devices)
+    if not devices:
+        return []
+
+    rows = [
+        {
+            "name": device.name,
+            "device_type": device.device_type,
+            "location": device.location,
+            "owner_id": device.owner_id or user_id,
+            "is_active": True,
+            "is_on": False,
+        }
+        for device in devices
+    ]
+    owner_ids = {row["owner_id"] for row in rows}
+    found = set((await db.scalars(select(models.User.id).where(models.User.id.in_(owner_ids)))).all())
+    missing = sorted(owner_ids - found)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Users not found: {missing}")
+
+    # sort_by_parameter_order: строки RETURNING в порядке запроса. В PostgreSQL
+    # вставка остается пакетной (порядок задает сентинел по SERIAL id),
+    # SQLite без сентинела вставляет построчно
+    columns = row_columns(models.Device, schemas.DeviceResponse)
+    created = list(await db.execute(
+        insert(models.Device).returning(*columns, sort_by_parameter_order=True), rows
+    ))
+    await db.commit()
+    device_registry.upsert_many(created)
+    return _bulk_response(created)
+
+
+@router.patch("/bulk", response_model=list[schemas.DeviceResponse])
+async def update_devices_bulk(
+    updates: List[schemas.DeviceBulkUpdate],
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Пакетное обновление устройств
+
+    Значения полей подставляются выражениями CASE по id, поэтому каждая
+    порция из DEVICE_BULK_CHUNK_SIZE устройств обновляется одним
+    UPDATE ... RETURNING. Если хотя бы одно устройство не найдено или его
+    версия не совпала с ожидаемой, транзакция откатывается целиком.
+    Устройства в ответе идут в порядке запроса; ответ на пакет больше
+    DEVICE_BULK_STREAM_THRESHOLD устройств отправляется потоком
+    """
+    _check_bulk_size(updates)
+    merged: Dict[int, schemas.DeviceBulkUpdate] = {}
+    for item in updates:
+        if item.id in merged:
+            raise HTTPException(status_code=422, detail=f"Device {item.id} is listed more than once")
+        merged[item.id] = item
+    if not merged:
+        return []
+
+    updated: List[Any] = []
+    columns = row_columns(models.Device, schemas.DeviceResponse)
+    items = list(merged.values())
+    for start in range(0, len(items), DEVICE_BULK_CHUNK_SIZE):
+        chunk = items[start:start + DEVICE_BULK_CHUNK_SIZE]
+        values = {}
+        for field in schemas.DeviceUpdate.model_fields:
+            whens = {
+                item.id: getattr(item, field)
+                for item in chunk if field in item.model_fields_set
+            }
+            if whens:
+                column = getattr(models.Device, field)
+                values[field] = case(whens, value=models.Device.id, else_=column)
+        expected = {item.id: item.version for item in chunk if item.version is not None}
+
+        statement = update(models.Device).where(models.Device.id.in_([item.id for item in chunk]))
+        if expected:
+            statement = statement.where(
+                models.Device.version == case(expected, value=models.Device.id, else_=models.Device.version)
+            )
+        statement = statement.values(
+            **values, version=models.Device.version + 1, updated_at=func.now()
+        ).returning(*columns).execution_options(synchronize_session=False)
+        updated.extend(await db.execute(statement))
+
+    if len(updated) != len(items):
+        returned = {device.id for device in updated}
+        absent = [item.id for item in items if item.id not in returned]
+        existing = set((await db.scalars(select(models.Device.id).where(models.Device.id.in_(absent)))).all())
+        await db.rollback()
+        missing = [device_id for device_id in absent if device_id not in existing]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Devices not found: {missing}")
+        raise HTTPException(
+            status_code=412,
+            detail=f"Devices were modified by another request: {sorted(existing)}"
+        )
+
+    await db.commit()
+    device_registry.upsert_many(updated)
+    order = {item.id: index for index, item in enumerate(items)}
+    updated.sort(key=lambda device: order[device.id])
+    return _bulk_response(updated)
+
+
 @router.get("/", response_model=list[schemas.DeviceResponse])
-def get_devices(
+async def get_devices(
     user_id: int = 1,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    devices = db.query(models.Device).filter(
-        models.Device.owner_id == user_id
-    ).offset(skip).limit(limit).all()
-    return devices
+    result = await db.execute(
+        select(*row_columns(models.Device, schemas.DeviceResponse)).where(
+            models.Device.owner_id == user_id
+        ).offset(skip).limit(limit)
+    )
+    return list_response(schemas.DeviceListAdapter, result.mappings())
 
 
 @router.get("/{device_id}", response_model=schemas.DeviceResponse)
-def get_device(device_id: int, db: Session = Depends(get_db)):
-    device = db.query(models.Device).filter(models.Device.id == device_id).first()
+async def get_device(device_id: int, response: Response, db: AsyncSession = Depends(get_async_db)):
+    device = await db.get(models.Device, device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
+    response.headers["ETag"] = _etag(device)
     return device
 
 
 @router.put("/{device_id}/", response_model=schemas.DeviceResponse)
-def update_device(
+async def update_device(
     device_id: int,
     device_update: schemas.DeviceUpdate,
-    db: Session = Depends(get_db)
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    device = db.query(models.Device).filter(models.Device.id == device_id).first()
-    if not device:
-        raise HTTPException(status_code=404, detail="Device not found")
-    
     update_data = device_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(device, field, value)
-    
-    db.commit()
-    db.refresh(device)
+    device = await _conditional_update(db, device_id, if_match, **update_data)
+    response.headers["ETag"] = _etag(device)
     return device
 
 
 @router.delete("/{device_id}/")
-def delete_device(device_id: int, db: Session = Depends(get_db)):
-    device = db.query(models.Device).filter(models.Device.id == device_id).first()
+async def delete_device(device_id: int, db: AsyncSession = Depends(get_async_db)):
+    device = await db.get(models.Device, device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
-    db.delete(device)
-    db.commit()
+    owner_id = device.owner_id
+    await db.delete(device)
+    await db.commit()
+    device_registry.discard(owner_id, device_id)
     return {"message": "Device deleted successfully"}
 
 
 @router.post("/{device_id}/toggle/", response_model=schemas.DeviceResponse)
-def toggle_device(device_id: int, db: Session = Depends(get_db)):
-    device = db.query(models.Device).filter(models.Device.id == device_id).first()
-    if not device:
-        raise HTTPException(status_code=404, detail="Device not found")
-    
-    device.is_on = not device.is_on
-    db.commit()
-    db.refresh(device)
+async def toggle_device(
+    device_id: int,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Инверсия выполняется в базе: параллельные переключения не теряются
+    device = await _conditional_update(
+        db, device_id, if_match, is_on=not_(func.coalesce(models.Device.is_on, False))
+    )
+    response.headers["ETag"] = _etag(device)
     return device
@@ -0,0 +1,61 @@
+"""
+Роутер метрик
+
+Отдает внутренние показатели фоновых подсистем
+"""
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app import database
+from app.database import get_db
+from app.services import audio_worker as audio_worker_module
+from app.services.audio_worker import queue_depth
+from app.services.emergency_lane import emergency_lane
+
+router = APIRouter()
+
+
+@router.get("/audio")
+def get_audio_metrics(db: Session = Depends(get_db)):
+    """
+    Метрики обработки аудио
+    
+    Глубина очереди считается по базе и видна из любого процесса;
+    пропускная способность и задержки - только для встроенного воркера
+    """
+    worker = audio_worker_module.audio_worker
+    return {
+        "queue_depth": queue_depth(db),
+        "embedded_worker": worker.running if worker else False,
+        "worker": worker.metrics.snapshot() if worker else None,
+    }
+
+
+@router.get("/emergency")
+def get_emergency_metrics():
+    """Задержки быстрого пути экстренной остановки в этом процессе"""
+    return emergency_lane.stats()
+
+
+@router.get("/db")
+def get_db_metrics():
+    """
+    Состояние пулов соединений этого процесса
+
+    checkedout - выданные сейчас соединения, overflow_connects - открытые
+    сверх pool_size, timeouts - отказы по DB_POOL_TIMEOUT,
+    wait_seconds.histogram - накопительная гистограмма ожидания соединения
+    """
+    return {
+        "config": {
+            "pool_size": database.DB_POOL_SIZE,
+            "max_overflow": database.DB_MAX_OVERFLOW,
+            "pool_timeout": database.DB_POOL_TIMEOUT,
+            "pool_recycle": database.DB_POOL_RECYCLE,
+            "statement_timeout_ms": database.DB_STATEMENT_TIMEOUT_MS,
+            "pgbouncer": database.DB_PGBOUNCER,
+            "emergency_pool_size": database.EMERGENCY_POOL_SIZE,
+            "emergency_pool_timeout": database.EMERGENCY_POOL_TIMEOUT,
+        },
+        "pools": {name: metrics.snapshot() for name, metrics in database.pool_metrics.items()},
+    }
@@ -1,24 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models, schemas
+from app.services.settings_cache import (
+    CachedSettings, default_settings, ensure_default_settings, etag_matches, settings_cache
+)
+from app.services.user_matchers import user_matchers
+from app.strategies.lexicon import invalid_custom_keywords
 
 router = APIRouter(redirect_slashes=False)
 
 
-@router.get("/{user_id}/", response_model=schemas.SettingsResponse)
-def get_settings(user_id: int, db: Session = Depends(get_db)):
-    settings = db.query(models.UserSettings).filter(
+def _settings_response(entry: CachedSettings, if_none_match: Optional[str] = None) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def _load_settings(db: Session, user_id: int) -> Optional[models.UserSettings]:
+    return db.query(models.UserSettings).filter(
         models.UserSettings.user_id == user_id
     ).first()
-    
-    if not settings:
-        settings = models.UserSettings(user_id=user_id)
-        db.add(settings)
-        db.commit()
-        db.refresh(settings)
-    
-    return settings
+
+
+@router.get("/{user_id}/", response_model=schemas.SettingsResponse)
+def get_settings(
+    user_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    entry = settings_cache.get(user_id)
+    if entry is None:
+        generation = settings_cache.generation()
+        settings = _load_settings(db, user_id)
+        if not settings:
+            # Строка настроек создается только при сохранении (update_settings)
+            user_exists = db.query(models.User.id).filter(models.User.id == user_id).first()
+            if not user_exists:
+                raise HTTPException(status_code=404, detail="User not found")
+            settings = default_settings(user_id)
+        entry = settings_cache.put(settings, generation)
+    return _settings_response(entry, if_none_match)
 
 
 @router.put("/{user_id}/", response_model=schemas.SettingsResponse)
@@ -27,18 +51,24 @@ def update_settings(
     settings_update: schemas.SettingsUpdate,
     db: Session = Depends(get_db)
 ):
-    settings = db.query(models.UserSettings).filter(
-        models.UserSettings.user_id == user_id
-    ).first()
-    
+    invalid = invalid_custom_keywords(settings_update.custom_keywords or [])
+    if invalid:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown custom keyword targets: {', '.join(invalid)}"
+        )
+
+    settings = _load_settings(db, user_id)
+
     if not settings:
-        settings = models.UserSettings(user_id=user_id)
-        db.add(settings)
-    
+        ensure_default_settings(db, user_id)
+        settings = _load_settings(db, user_id)
+
     update_data = settings_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(settings, field, value)
-    
+
     db.commit()
     db.refresh(settings)
-    return settings
+    user_matchers.refresh(settings)
+    return _settings_response(settings_cache.put(settings))
@@ -5,9 +5,11 @@
 """
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models, schemas
+from app.services.fast_json import list_response, row_columns
 
 router = APIRouter()
 
@@ -82,6 +84,8 @@ def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     Returns:
         Список пользователей
     """
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+    rows = db.execute(
+        select(*row_columns(models.User, schemas.UserResponse)).offset(skip).limit(limit)
+    ).mappings()
+    return list_response(schemas.UserListAdapter, rows)
 
@@ -1,35 +1,234 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app import schemas
-from app.controllers.request_controller import RequestController
-from app.controllers.analysis_controller import AnalysisController
-from app.controllers.decision_controller import DecisionController
-from app.controllers.response_controller import ResponseController
-from app.strategies.analysis_strategy import StatisticalAnalysisStrategy
+import os
+from typing import Awaitable, Callable, List, Tuple, TypeVar
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+from app.database import get_async_db
+from app import models, schemas
+from app.controllers.request_controller import AsyncRequestController
+from app.controllers.analysis_controller import AsyncAnalysisController
+from app.controllers.decision_controller import AsyncDecisionController, emergency_command
+from app.controllers.response_controller import response_formatter
+from app.controllers.sequence_controller import AsyncSequenceController
+from app.repositories.sound_repository import AsyncSoundRepository
+from app.services.audio_stream import PcmStreamWriter, AudioStreamTooLarge
+from app.services.command_sequences import find_sequence
+from app.services.device_registry import device_registry
+from app.services.emergency_lane import emergency_lane
+from app.services.user_matchers import user_matchers
+from app.strategies.analysis_strategy import StatisticalAnalysisStrategy, MachineLearningStrategy
+from app.strategies.analysis_cache import CachedAnalysisStrategy
 
 router = APIRouter(redirect_slashes=False)
 
+analysis_strategy = CachedAnalysisStrategy(
+    MachineLearningStrategy() if os.getenv("ANALYSIS_STRATEGY") == "ml" else StatisticalAnalysisStrategy()
+)
+
+_T = TypeVar("_T")
+
+
+async def _with_fresh_registry(
+    pipeline: Callable[..., Awaitable[_T]],
+    db: AsyncSession,
+    payload,
+    user_id: int
+) -> _T:
+    """
+    Реестр устройств мог устареть: устройство удалено другим процессом.
+    Транзакция откатывается, устройства пользователя перечитываются из базы
+    и конвейер выполняется еще раз
+    """
+    try:
+        return await pipeline(db, payload, user_id)
+    except StaleDataError:
+        await db.rollback()
+        device_registry.invalidate(user_id)
+        return await pipeline(db, payload, user_id)
+
+
+# Конвейер работает с асинхронной сессией: ожидание базы не занимает поток.
+# В пул потоков передается только анализ текста (AsyncAnalysisController)
+# и компиляция словаря пользователя (user_matchers.get_profile_async)
+async def _run_pipeline(
+    db: AsyncSession,
+    request: schemas.VoiceCommandRequest,
+    user_id: int
+) -> schemas.VoiceCommandResponse:
+    command_text = request.text or "распознанный текст из аудио"
+    language = request.language or "ru-RU"
+    profile = await user_matchers.get_profile_async(db, user_id)
+
+    # Весь конвейер выполняется одной транзакцией: изменения устройства
+    # и команда сбрасываются одним flush и фиксируются одним commit
+    sequence = find_sequence(profile.sequences, command_text)
+    if sequence:
+        result = await AsyncSequenceController(db, unit_of_work=True).execute_sequence(
+            sequence, user_id, command_text, language
+        )
+        response = response_formatter.form_sequence_response(result, command_text)
+        await db.commit()
+        return response
+
+    request_controller = AsyncRequestController(db, unit_of_work=True)
+    analysis_controller = AsyncAnalysisController(analysis_strategy.with_matcher(profile.matcher))
+    decision_controller = AsyncDecisionController(db, unit_of_work=True)
+
+    request_obj = await request_controller.form_request(command_text, user_id, language=language)
+    analysis_result = await analysis_controller.conduct_analysis(request_obj)
+    decision = await decision_controller.form_decision(analysis_result, user_id)
+    response = response_formatter.form_response(decision)
+    await db.commit()
+
+    return response
+
+
+async def _run_batch_pipeline(
+    db: AsyncSession,
+    requests: List[schemas.VoiceCommandRequest],
+    user_id: int
+) -> List[schemas.VoiceCommandResponse]:
+    # Пустые элементы не прерывают пакет, а получают собственный статус
+    responses = [
+        schemas.VoiceCommandResponse(
+            recognized_text="",
+            action="unknown",
+            status="failed",
+            message="No command text or audio provided"
+        )
+        for _ in requests
+    ]
+    indexed = [
+        (index, request.text or "распознанный текст из аудио", request.language or "ru-RU")
+        for index, request in enumerate(requests)
+        if request.text or request.audio_data
+    ]
+    if not indexed:
+        return responses
+
+    profile = await user_matchers.get_profile_async(db, user_id)
+    request_controller = AsyncRequestController(db, unit_of_work=True)
+    analysis_controller = AsyncAnalysisController(analysis_strategy.with_matcher(profile.matcher))
+    decision_controller = AsyncDecisionController(db, unit_of_work=True)
+    sequence_controller = AsyncSequenceController(db, unit_of_work=True)
+
+    # Сценарии делят пакет на участки; участки выполняются по порядку,
+    # команды между сценариями обрабатываются пакетно
+    run: List[Tuple[int, str, str]] = []
+
+    async def flush_run() -> None:
+        if not run:
+            return
+        request_objs = [
+            await request_controller.form_request(command_text, user_id, language=language)
+            for _, command_text, language in run
+        ]
+        analysis_results = await analysis_controller.conduct_batch_analysis(request_objs)
+        decisions = await decision_controller.form_decisions(analysis_results, user_id)
+        for (index, _, _), response in zip(run, response_formatter.form_responses(decisions)):
+            responses[index] = response
+        run.clear()
+
+    for index, command_text, language in indexed:
+        sequence = find_sequence(profile.sequences, command_text)
+        if sequence is None:
+            run.append((index, command_text, language))
+            continue
+        await flush_run()
+        result = await sequence_controller.execute_sequence(sequence, user_id, command_text, language)
+        responses[index] = response_formatter.form_sequence_response(result, command_text)
+    await flush_run()
+    await db.commit()
+    return responses
+
 
 @router.post("/process/", response_model=schemas.VoiceCommandResponse)
-def process_voice_command(
+async def process_voice_command(
     request: schemas.VoiceCommandRequest,
     user_id: int = 1,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not request.text and not request.audio_data:
         raise HTTPException(status_code=400, detail="No command text or audio provided")
-    
-    command_text = request.text or "распознанный текст из аудио"
-    
-    request_controller = RequestController(db)
-    analysis_controller = AnalysisController(db, StatisticalAnalysisStrategy())
-    decision_controller = DecisionController(db)
-    response_controller = ResponseController(db)
-    
-    request_obj = request_controller.form_request(command_text, user_id)
-    analysis_result = analysis_controller.conduct_analysis(request_obj)
-    decision = decision_controller.form_decision(analysis_result, user_id)
-    response = response_controller.form_response(decision)
-    
-    return response
+
+    # Экстренная остановка не ждет кэша, пакетов и основного пула соединений
+    if request.text and emergency_lane.detect(user_id, request.text):
+        language = request.language or "ru-RU"
+        if await emergency_lane.stop(user_id, request.text, language) is not None:
+            decision = emergency_command(user_id, request.text.lower(), language)
+            return response_formatter.form_response(decision)
+
+    return await _with_fresh_registry(_run_pipeline, db, request, user_id)
+
+
+@router.post("/process-batch/", response_model=list[schemas.VoiceCommandResponse])
+async def process_voice_commands_batch(
+    requests: List[schemas.VoiceCommandRequest],
+    user_id: int = 1,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await _with_fresh_registry(_run_batch_pipeline, db, requests, user_id)
+
+
+@router.websocket("/stream")
+async def stream_audio(
+    websocket: WebSocket,
+    user_id: int = 1,
+    sample_rate: int = 16000,
+    channels: int = 1,
+    sample_width: int = 2,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Потоковый прием аудио
+
+    Клиент передает бинарные PCM-фреймы и завершает поток текстовым
+    сообщением "end" (или закрытием соединения). Фреймы сразу пишутся на диск,
+    по завершении создается запись AudioData с длительностью и частотой
+    """
+    if not (8000 <= sample_rate <= 48000) or channels not in (1, 2) or sample_width not in (1, 2, 4):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    writer = PcmStreamWriter(user_id, sample_rate, channels, sample_width)
+    connected = True
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                connected = False
+                break
+            if message.get("bytes"):
+                await writer.write(message["bytes"])
+            elif message.get("text") == "end":
+                break
+    except AudioStreamTooLarge:
+        await writer.discard()
+        await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG)
+        return
+    except WebSocketDisconnect:
+        connected = False
+
+    if not writer.bytes_written:
+        await writer.discard()
+        if connected:
+            await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+        return
+
+    await writer.close()
+    audio = await AsyncSoundRepository(db).save_sound(models.AudioData(
+        user_id=user_id,
+        file_path=writer.file_path,
+        duration=writer.duration,
+        sample_rate=sample_rate,
+        processed=False
+    ))
+
+    if connected:
+        await websocket.send_json({
+            "audio_id": audio.id,
+            "duration": audio.duration,
+            "sample_rate": audio.sample_rate
+        })
+        await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
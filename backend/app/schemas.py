@@ -4,8 +4,9 @@ Pydantic схемы для валидации данных API
 Используются для сериализации/десериализации данных в запросах и ответах
 """
 
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, EmailStr, TypeAdapter
+from typing import Optional, List, Dict, Any, Type
+from typing_extensions import TypedDict
 from datetime import datetime
 
 
@@ -53,11 +54,23 @@ class DeviceUpdate(BaseModel):
     is_on: Optional[bool] = None
 
 
+class DeviceBulkCreate(DeviceCreate):
+    """Элемент пакетного создания; без owner_id владельцем становится user_id запроса"""
+    owner_id: Optional[int] = None
+
+
+class DeviceBulkUpdate(DeviceUpdate):
+    """Элемент пакетного обновления; version - ожидаемая версия (аналог If-Match)"""
+    id: int
+    version: Optional[int] = None
+
+
 class DeviceResponse(DeviceBase):
     """Схема ответа с данными устройства"""
     id: int
     is_active: bool
     is_on: bool
+    version: int
     owner_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
@@ -114,10 +127,10 @@ class SettingsUpdate(SettingsBase):
 
 
 class SettingsResponse(SettingsBase):
-    """Схема ответа с настройками"""
-    id: int
+    """Схема ответа с настройками (id и created_at пусты, пока настройки не сохранены)"""
+    id: Optional[int] = None
     user_id: int
-    created_at: datetime
+    created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
     class Config:
@@ -140,3 +153,22 @@ class VoiceCommandResponse(BaseModel):
     status: str
     message: str
 
+
+# Списки в ответах: строки выборки (словари столбцов) проверяются по полям
+# схемы ответа без создания экземпляров моделей
+def _row_type(schema: Type[BaseModel]) -> type:
+    fields = {
+        # Адреса проверены при создании пользователя; повторная проверка при выдаче не нужна
+        name: str if field.annotation is EmailStr else field.annotation
+        for name, field in schema.model_fields.items()
+    }
+    return TypedDict(schema.__name__.replace("Response", "Row"), fields)
+
+
+UserRow = _row_type(UserResponse)
+DeviceRow = _row_type(DeviceResponse)
+CommandRow = _row_type(CommandResponse)
+
+UserListAdapter = TypeAdapter(List[UserRow])
+DeviceListAdapter = TypeAdapter(List[DeviceRow])
+CommandListAdapter = TypeAdapter(List[CommandRow])
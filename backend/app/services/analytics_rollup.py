@@ -0,0 +1,192 @@
+"""
+Инкрементальная агрегация истории команд
+
+Задача сворачивает новые строки commands (после сохраненной отметки
+last_id) в command_rollups одним INSERT ... SELECT ... GROUP BY
+с ON CONFLICT DO UPDATE. Команды моложе ANALYTICS_ROLLUP_LAG секунд
+не учитываются. id выдается раньше фиксации транзакции, поэтому
+незанятые id ниже отметки записываются в rollup_gaps и проверяются на
+следующих проходах: команда длинной транзакции учитывается, когда
+становится видна, и ровно один раз. Пропуск, который так и не заполнился
+за ANALYTICS_ROLLUP_GAP_TTL секунд (откат транзакции), удаляется.
+Запускается отдельно (python -m app.services.analytics_rollup)
+или встраивается в lifespan приложения
+"""
+
+import argparse
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import and_, func, literal, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models import Command, CommandRollup, Device, RollupGap, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_ROLLUP_INTERVAL = float(os.getenv("ANALYTICS_ROLLUP_INTERVAL", "60"))
+ANALYTICS_ROLLUP_LAG = float(os.getenv("ANALYTICS_ROLLUP_LAG", "30"))
+# Верхняя граница числа команд за один проход, чтобы транзакция оставалась короткой
+ANALYTICS_ROLLUP_BATCH_SIZE = int(os.getenv("ANALYTICS_ROLLUP_BATCH_SIZE", "100000"))
+# Сколько ждать команду незафиксированной транзакции, прежде чем считать id пропавшим
+ANALYTICS_ROLLUP_GAP_TTL = float(os.getenv("ANALYTICS_ROLLUP_GAP_TTL", "3600"))
+
+WATERMARK_NAME = "command_rollups"
+
+
+def compact(
+    db: Session,
+    lag_seconds: float = ANALYTICS_ROLLUP_LAG,
+    batch_size: int = ANALYTICS_ROLLUP_BATCH_SIZE,
+    gap_ttl: float = ANALYTICS_ROLLUP_GAP_TTL
+) -> int:
+    """Один проход агрегации; возвращает число учтенных команд"""
+    db.execute(
+        insert(RollupWatermark).values(name=WATERMARK_NAME, last_id=0)
+        .on_conflict_do_nothing(index_elements=[RollupWatermark.name])
+    )
+    # Блокировка отметки: параллельные проходы выполняются по очереди
+    last_id = db.execute(
+        select(RollupWatermark.last_id).where(RollupWatermark.name == WATERMARK_NAME).with_for_update()
+    ).scalar_one()
+
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=lag_seconds)
+    gaps = select(RollupGap.command_id).where(RollupGap.name == WATERMARK_NAME)
+
+    # Команды, зафиксированные после того, как отметка прошла их id
+    recovered = db.execute(
+        select(Command.id).where(Command.id.in_(gaps), Command.created_at < cutoff)
+    ).scalars().all()
+    if recovered:
+        db.query(RollupGap).filter(
+            RollupGap.name == WATERMARK_NAME, RollupGap.command_id.in_(recovered)
+        ).delete(synchronize_session=False)
+    db.query(RollupGap).filter(
+        RollupGap.name == WATERMARK_NAME,
+        RollupGap.created_at < now - timedelta(seconds=gap_ttl)
+    ).delete(synchronize_session=False)
+
+    pending = select(Command.id).where(
+        Command.id > last_id,
+        Command.created_at < cutoff
+    ).order_by(Command.id).limit(batch_size).subquery()
+    upper_id = db.execute(select(func.max(pending.c.id))).scalar()
+    if upper_id is None and not recovered:
+        db.commit()
+        return 0
+
+    counted = [Command.id.in_(recovered)]
+    if upper_id is not None:
+        # Пропуски записываются до агрегации: строка, зафиксированная между
+        # запросами, попадает в rollup_gaps и не учитывается дважды
+        candidate = func.generate_series(last_id + 1, upper_id).column_valued("command_id")
+        visible = select(Command.id).where(Command.id == candidate, Command.created_at < cutoff)
+        db.execute(
+            insert(RollupGap).from_select(
+                ["name", "command_id"],
+                select(literal(WATERMARK_NAME), candidate).where(~visible.exists())
+            ).on_conflict_do_nothing(index_elements=[RollupGap.name, RollupGap.command_id])
+        )
+        counted.append(and_(
+            Command.id > last_id,
+            Command.id <= upper_id,
+            Command.created_at < cutoff,
+            Command.id.not_in(gaps)
+        ))
+    condition = or_(*counted)
+
+    compacted = db.execute(select(func.count()).select_from(Command).where(condition)).scalar_one()
+    hour = func.date_trunc("hour", Command.created_at)
+    action = func.coalesce(Command.action, "")
+    device_type = func.coalesce(Device.device_type, "")
+    status = func.coalesce(Command.status, "")
+    aggregated = select(
+        Command.user_id, hour, action, device_type, status, func.count()
+    ).outerjoin(Device, Command.device_id == Device.id).where(
+        condition
+    ).group_by(Command.user_id, hour, action, device_type, status)
+
+    statement = insert(CommandRollup).from_select(
+        ["user_id", "hour", "action", "device_type", "status", "count"], aggregated
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[
+            CommandRollup.user_id, CommandRollup.hour, CommandRollup.action,
+            CommandRollup.device_type, CommandRollup.status
+        ],
+        set_={"count": CommandRollup.count + statement.excluded.count}
+    )
+    db.execute(statement)
+
+    if upper_id is not None:
+        db.query(RollupWatermark).filter(RollupWatermark.name == WATERMARK_NAME).update(
+            {RollupWatermark.last_id: upper_id}, synchronize_session=False
+        )
+    db.commit()
+    return compacted
+
+
+class RollupCompactor:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        interval: float = ANALYTICS_ROLLUP_INTERVAL
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> int:
+        with self.session_factory() as db:
+            return compact(db)
+
+    def run_forever(self) -> None:
+        while not self._stop.is_set():
+            try:
+                compacted = self.run_once()
+            except Exception:
+                logger.exception("Analytics rollup failed")
+                compacted = 0
+            # Полная пачка - вероятно, есть отставание: следующий проход сразу
+            if compacted < ANALYTICS_ROLLUP_BATCH_SIZE:
+                self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        """Запуск в фоновом потоке (режим встраивания в приложение)"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="analytics-rollup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+rollup_compactor: Optional[RollupCompactor] = None
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Агрегация истории команд")
+    parser.add_argument("--interval", type=float, default=ANALYTICS_ROLLUP_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="Один проход и выход")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    compactor = RollupCompactor(SessionLocal, args.interval)
+    if args.once:
+        print(f"Compacted {compactor.run_once()} commands")
+    else:
+        try:
+            compactor.run_forever()
+        except KeyboardInterrupt:
+            pass
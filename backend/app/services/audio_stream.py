@@ -0,0 +1,95 @@
+"""
+Потоковая запись аудио на диск
+
+Принимает PCM-фреймы по частям и записывает их в WAV-файл через буфер
+фиксированного размера, не удерживая запись целиком в памяти
+"""
+
+import asyncio
+import os
+import uuid
+import wave
+from typing import Optional
+
+AUDIO_STORAGE_DIR = os.getenv("AUDIO_STORAGE_DIR", "data/audio")
+AUDIO_STREAM_BUFFER_SIZE = int(os.getenv("AUDIO_STREAM_BUFFER_SIZE", str(64 * 1024)))
+AUDIO_STREAM_MAX_BYTES = int(os.getenv("AUDIO_STREAM_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+class AudioStreamTooLarge(Exception):
+    pass
+
+
+class PcmStreamWriter:
+    """
+    Запись PCM-потока в WAV-файл
+
+    Фреймы накапливаются в буфере фиксированного размера; заполненный буфер
+    сбрасывается на диск в отдельном потоке, чтобы не блокировать цикл событий
+    """
+
+    def __init__(
+        self,
+        user_id: int,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        sample_width: int = 2,
+        buffer_size: int = AUDIO_STREAM_BUFFER_SIZE,
+        max_bytes: int = AUDIO_STREAM_MAX_BYTES,
+        storage_dir: str = AUDIO_STORAGE_DIR
+    ):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.max_bytes = max_bytes
+        self.bytes_written = 0
+
+        directory = os.path.join(storage_dir, str(user_id))
+        os.makedirs(directory, exist_ok=True)
+        self.file_path = os.path.join(directory, f"{uuid.uuid4().hex}.wav")
+
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._filled = 0
+        self._wav: Optional[wave.Wave_write] = wave.open(self.file_path, "wb")
+        self._wav.setnchannels(channels)
+        self._wav.setsampwidth(sample_width)
+        self._wav.setframerate(sample_rate)
+
+    @property
+    def duration(self) -> float:
+        frame_size = self.channels * self.sample_width
+        return (self.bytes_written // frame_size) / self.sample_rate
+
+    async def write(self, chunk: bytes) -> None:
+        if self.bytes_written + len(chunk) > self.max_bytes:
+            raise AudioStreamTooLarge(f"Audio stream exceeds {self.max_bytes} bytes")
+        self.bytes_written += len(chunk)
+
+        data = memoryview(chunk)
+        capacity = len(self._buffer)
+        while data:
+            take = min(capacity - self._filled, len(data))
+            self._view[self._filled:self._filled + take] = data[:take]
+            self._filled += take
+            data = data[take:]
+            if self._filled == capacity:
+                await self._flush()
+
+    async def _flush(self) -> None:
+        if self._filled:
+            await asyncio.to_thread(self._wav.writeframesraw, self._view[:self._filled])
+            self._filled = 0
+
+    async def close(self) -> None:
+        """Сбрасывает остаток буфера и дописывает размеры в заголовок WAV"""
+        if self._wav is None:
+            return
+        await self._flush()
+        wav, self._wav = self._wav, None
+        await asyncio.to_thread(wav.close)
+
+    async def discard(self) -> None:
+        await self.close()
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
@@ -0,0 +1,208 @@
+"""
+Фоновая обработка аудиозаписей
+
+Воркер забирает пачки необработанных записей AudioData через
+SELECT ... FOR UPDATE SKIP LOCKED и распределяет анализ по пулу процессов.
+Блокировки строк удерживаются до записи результатов, поэтому несколько
+воркеров (в разных процессах или на разных машинах) никогда не обрабатывают
+одну запись дважды. Запускается отдельно (python -m app.services.audio_worker)
+или встраивается в lifespan приложения
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app.models import AudioData
+from app.services.audio_analysis import AudioStats, analyze_wav
+
+logger = logging.getLogger(__name__)
+
+AUDIO_WORKER_PROCESSES = int(os.getenv("AUDIO_WORKER_PROCESSES", str(os.cpu_count() or 1)))
+AUDIO_WORKER_BATCH_SIZE = int(os.getenv("AUDIO_WORKER_BATCH_SIZE", "32"))
+AUDIO_WORKER_POLL_INTERVAL = float(os.getenv("AUDIO_WORKER_POLL_INTERVAL", "1.0"))
+
+
+def _analyze_job(job: Tuple[int, str]) -> Tuple[int, Optional[AudioStats], float]:
+    """Выполняется в дочернем процессе; ошибки файла не роняют пачку"""
+    audio_id, file_path = job
+    started = time.perf_counter()
+    try:
+        stats = analyze_wav(file_path)
+    except Exception:
+        # Любая ошибка разбора касается только этой записи: исключение,
+        # вышедшее из pool.map, откатило бы всю пачку и она выбиралась бы снова
+        stats = None
+    return audio_id, stats, time.perf_counter() - started
+
+
+class WorkerMetrics:
+    """Пропускная способность за скользящее окно и задержка обработки задач"""
+
+    def __init__(self, window_seconds: float = 60.0):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._completed: Deque[float] = deque()
+        self.jobs_total = 0
+        self.jobs_failed = 0
+        self.batches_total = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.last_latency = 0.0
+
+    def record(self, latency: float, failed: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._completed.append(now)
+            self.jobs_total += 1
+            self.jobs_failed += int(failed)
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            self.last_latency = latency
+
+    def record_batch(self) -> None:
+        with self._lock:
+            self.batches_total += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        now = time.monotonic()
+        with self._lock:
+            while self._completed and now - self._completed[0] > self.window_seconds:
+                self._completed.popleft()
+            return {
+                "jobs_total": self.jobs_total,
+                "jobs_failed": self.jobs_failed,
+                "batches_total": self.batches_total,
+                "throughput_per_second": len(self._completed) / self.window_seconds,
+                "latency_avg_seconds": self.latency_total / self.jobs_total if self.jobs_total else 0.0,
+                "latency_max_seconds": self.latency_max,
+                "latency_last_seconds": self.last_latency,
+            }
+
+
+def queue_depth(db: Session) -> int:
+    return db.query(func.count(AudioData.id)).filter(
+        AudioData.processed == False,
+        AudioData.file_path.isnot(None)
+    ).scalar()
+
+
+class AudioWorker:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        processes: int = AUDIO_WORKER_PROCESSES,
+        batch_size: int = AUDIO_WORKER_BATCH_SIZE,
+        poll_interval: float = AUDIO_WORKER_POLL_INTERVAL
+    ):
+        self.session_factory = session_factory
+        self.processes = processes
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.metrics = WorkerMetrics()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> int:
+        """Обрабатывает одну пачку; возвращает число обработанных записей"""
+        self.start_pool()
+        with self.session_factory() as db:
+            jobs = db.query(AudioData.id, AudioData.file_path).filter(
+                AudioData.processed == False,
+                AudioData.file_path.isnot(None)
+            ).order_by(AudioData.id).limit(self.batch_size).with_for_update(skip_locked=True).all()
+            if not jobs:
+                db.rollback()
+                return 0
+
+            rows = []
+            for audio_id, stats, latency in self._pool.map(_analyze_job, [tuple(job) for job in jobs]):
+                self.metrics.record(latency, failed=stats is None)
+                if stats is None:
+                    # Битый или отсутствующий файл помечается обработанным без
+                    # статистик, чтобы не выбираться повторно
+                    logger.warning("Audio %s could not be analyzed", audio_id)
+                    rows.append({"id": audio_id, "processed": True})
+                else:
+                    rows.append({
+                        "id": audio_id,
+                        "duration": stats.duration,
+                        "sample_rate": stats.sample_rate,
+                        "noise_level": stats.noise_level,
+                        "processed": True,
+                    })
+
+            # Однородные наборы колонок записываются пакетными UPDATE по ключу
+            for columns in {tuple(row) for row in rows}:
+                db.execute(update(AudioData), [row for row in rows if tuple(row) == columns])
+            db.commit()
+            self.metrics.record_batch()
+            return len(rows)
+
+    def run_forever(self) -> None:
+        self.start_pool()
+        try:
+            while not self._stop.is_set():
+                try:
+                    processed = self.run_once()
+                except Exception:
+                    logger.exception("Audio worker batch failed")
+                    processed = 0
+                if processed < self.batch_size:
+                    self._stop.wait(self.poll_interval)
+        finally:
+            self.shutdown_pool()
+
+    def start_pool(self) -> None:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+
+    def shutdown_pool(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def start(self) -> None:
+        """Запуск в фоновом потоке (режим встраивания в приложение)"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="audio-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+audio_worker: Optional[AudioWorker] = None
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Фоновая обработка аудиозаписей")
+    parser.add_argument("--processes", type=int, default=AUDIO_WORKER_PROCESSES)
+    parser.add_argument("--batch-size", type=int, default=AUDIO_WORKER_BATCH_SIZE)
+    parser.add_argument("--poll-interval", type=float, default=AUDIO_WORKER_POLL_INTERVAL)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    worker = AudioWorker(SessionLocal, args.processes, args.batch_size, args.poll_interval)
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        pass
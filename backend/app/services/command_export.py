@@ -0,0 +1,122 @@
+"""
+Потоковая выгрузка истории команд (NDJSON / CSV)
+
+Строки читаются курсором на стороне сервера (yield_per) пачками
+фиксированного размера и сериализуются по мере отправки, поэтому память
+не зависит от объема выгрузки. Выбираются только столбцы, без ORM-объектов:
+карта идентичности сессии не растет. Выгрузка открывает собственную сессию
+и закрывает ее, когда итератор исчерпан или закрыт: сессия запроса
+(Depends(get_db)) может быть закрыта до начала отправки ответа
+"""
+
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Command
+
+EXPORT_CHUNK_SIZE = int(os.getenv("COMMAND_EXPORT_CHUNK_SIZE", "5000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+EXPORT_COLUMNS = (
+    Command.id,
+    Command.user_id,
+    Command.device_id,
+    Command.command_text,
+    Command.recognized_text,
+    Command.action,
+    Command.status,
+    Command.language,
+    Command.created_at,
+)
+_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _ndjson(rows: Sequence[Sequence[Any]]) -> str:
+    return "".join(
+        json.dumps(dict(zip(_FIELDS, map(_json_value, row))), ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def _csv(rows: Sequence[Sequence[Any]]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue()
+
+
+def _csv_header() -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(_FIELDS)
+    return buffer.getvalue()
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    # wbits=31: формат gzip; сжатые данные отдаются пачками, без буферизации всего ответа
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_commands(
+    session_factory: Callable[[], Session],
+    export_format: str = "ndjson",
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    compress: bool = False,
+    chunk_size: int = EXPORT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Итератор частей выгрузки; одна часть - одна пачка строк курсора
+
+    date_from включается, date_to - нет
+    """
+    statement = select(*EXPORT_COLUMNS).order_by(Command.id)
+    if user_id is not None:
+        statement = statement.where(Command.user_id == user_id)
+    if status is not None:
+        statement = statement.where(Command.status == status)
+    if date_from is not None:
+        statement = statement.where(Command.created_at >= date_from)
+    if date_to is not None:
+        statement = statement.where(Command.created_at < date_to)
+
+    serialize = _csv if export_format == "csv" else _ndjson
+
+    def chunks() -> Iterator[bytes]:
+        if export_format == "csv":
+            yield _csv_header().encode()
+        with session_factory() as db:
+            result = db.execute(statement.execution_options(yield_per=chunk_size))
+            try:
+                for rows in result.partitions():
+                    yield serialize(rows).encode()
+            finally:
+                result.close()
+
+    return _gzip(chunks()) if compress else chunks()
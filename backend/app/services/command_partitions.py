@@ -0,0 +1,239 @@
+"""
+Обслуживание помесячных секций commands
+
+Задача заранее создает секции на COMMAND_PARTITIONS_AHEAD месяцев вперед,
+отсоединяет секции старше COMMAND_RETENTION_MONTHS месяцев, выгружает их
+в сжатые CSV-файлы (COMMAND_ARCHIVE_DIR/commands_pYYYYMM.csv.gz) и удаляет.
+Шаги идемпотентны: отсоединенная, но не выгруженная секция будет выгружена
+при следующем проходе. Запускается отдельно
+(python -m app.services.command_partitions) или встраивается в lifespan
+приложения. Требует PostgreSQL и драйвер psycopg2 (COPY TO STDOUT)
+"""
+
+import argparse
+import gzip
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+COMMAND_PARTITIONS_AHEAD = int(os.getenv("COMMAND_PARTITIONS_AHEAD", "3"))
+# 0 - хранить историю бессрочно
+COMMAND_RETENTION_MONTHS = int(os.getenv("COMMAND_RETENTION_MONTHS", "12"))
+COMMAND_ARCHIVE_DIR = os.getenv("COMMAND_ARCHIVE_DIR", "archive/commands")
+COMMAND_PARTITION_INTERVAL = float(os.getenv("COMMAND_PARTITION_INTERVAL", "3600"))
+# Ожидание блокировки commands при ATTACH/DETACH: лучше пропустить проход,
+# чем задерживать вставку команд за долгой транзакцией
+COMMAND_PARTITION_LOCK_TIMEOUT = os.getenv("COMMAND_PARTITION_LOCK_TIMEOUT", "5s")
+
+DEFAULT_PARTITION = "commands_default"
+_PARTITION_NAME = re.compile(r"^commands_p(\d{4})(\d{2})$")
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"commands_p{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[datetime]:
+    match = _PARTITION_NAME.match(name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+
+
+def attached_partitions(conn: Connection) -> Dict[str, datetime]:
+    """Помесячные секции commands (без секции по умолчанию)"""
+    names = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = 'commands'::regclass"
+    )).scalars()
+    return {name: month for name in names if (month := partition_month(name)) is not None}
+
+
+def detached_partitions(conn: Connection) -> List[str]:
+    """Отсоединенные, но еще не выгруженные секции"""
+    names = conn.execute(text(
+        "SELECT relname FROM pg_class "
+        "WHERE relkind = 'r' AND NOT relispartition "
+        "AND relnamespace = current_schema()::regnamespace "
+        "AND relname ~ '^commands_p[0-9]{6}$'"
+    )).scalars()
+    return sorted(names)
+
+
+def _create_partition(conn: Connection, month: datetime) -> None:
+    """
+    Секция создается отдельной таблицей и присоединяется к commands.
+    Строки месяца, попавшие в секцию по умолчанию, переносятся в нее:
+    иначе ATTACH PARTITION завершится ошибкой
+    """
+    name = partition_name(month)
+    bounds = {"lower": month, "upper": add_months(month, 1)}
+    conn.execute(text(f"SET LOCAL lock_timeout = '{COMMAND_PARTITION_LOCK_TIMEOUT}'"))
+    conn.execute(text(f"CREATE TABLE {name} (LIKE commands INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE created_at >= :lower AND created_at < :upper RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    # Границы секции в DDL задаются литералами, не параметрами
+    conn.execute(text(
+        f"ALTER TABLE commands ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['lower'].isoformat()}') TO ('{bounds['upper'].isoformat()}')"
+    ))
+
+
+def ensure_partitions(
+    engine: Engine,
+    now: Optional[datetime] = None,
+    ahead: int = COMMAND_PARTITIONS_AHEAD
+) -> List[str]:
+    """Создает недостающие секции с текущего месяца; возвращает их имена"""
+    current = month_start(now or datetime.now(timezone.utc))
+    with engine.connect() as conn:
+        existing = set(attached_partitions(conn))
+    created = []
+    for offset in range(ahead + 1):
+        month = add_months(current, offset)
+        if partition_name(month) in existing:
+            continue
+        with engine.begin() as conn:
+            _create_partition(conn, month)
+        created.append(partition_name(month))
+        logger.info("Created partition %s", partition_name(month))
+    return created
+
+
+def detach_expired(
+    engine: Engine,
+    now: Optional[datetime] = None,
+    retention_months: int = COMMAND_RETENTION_MONTHS
+) -> List[str]:
+    """Отсоединяет секции, целиком вышедшие за срок хранения"""
+    if retention_months <= 0:
+        return []
+    oldest_kept = add_months(month_start(now or datetime.now(timezone.utc)), -retention_months)
+    with engine.connect() as conn:
+        expired = sorted(name for name, month in attached_partitions(conn).items() if month < oldest_kept)
+    for name in expired:
+        with engine.begin() as conn:
+            conn.execute(text(f"SET LOCAL lock_timeout = '{COMMAND_PARTITION_LOCK_TIMEOUT}'"))
+            conn.execute(text(f"ALTER TABLE commands DETACH PARTITION {name}"))
+        logger.info("Detached partition %s", name)
+    return expired
+
+
+def archive_detached(engine: Engine, archive_dir: str = COMMAND_ARCHIVE_DIR) -> List[str]:
+    """
+    Выгружает отсоединенные секции в archive_dir и удаляет их из базы.
+    Файл пишется под временным именем и переименовывается после fsync:
+    таблица удаляется, только когда архив полностью записан
+    """
+    with engine.connect() as conn:
+        names = detached_partitions(conn)
+    if not names:
+        return []
+
+    os.makedirs(archive_dir, exist_ok=True)
+    archived = []
+    for name in names:
+        path = os.path.join(archive_dir, f"{name}.csv.gz")
+        partial = f"{path}.partial"
+        raw = engine.raw_connection()
+        try:
+            with open(partial, "wb") as file, gzip.GzipFile(fileobj=file, mode="wb") as archive:
+                with raw.cursor() as cursor:
+                    cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", archive)
+            with open(partial, "rb+") as file:
+                os.fsync(file.fileno())
+            os.replace(partial, path)
+            with raw.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {name}")
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+        archived.append(path)
+        logger.info("Archived partition %s to %s", name, path)
+    return archived
+
+
+def run_maintenance(engine: Engine, now: Optional[datetime] = None) -> Dict[str, List[str]]:
+    return {
+        "created": ensure_partitions(engine, now),
+        "detached": detach_expired(engine, now),
+        "archived": archive_detached(engine),
+    }
+
+
+class PartitionMaintainer:
+    def __init__(self, engine: Engine, interval: float = COMMAND_PARTITION_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Dict[str, List[str]]:
+        return run_maintenance(self.engine)
+
+    def run_forever(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Command partition maintenance failed")
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        """Запуск в фоновом потоке (режим встраивания в приложение)"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="command-partitions", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+partition_maintainer: Optional[PartitionMaintainer] = None
+
+
+if __name__ == "__main__":
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description="Обслуживание секций commands")
+    parser.add_argument("--interval", type=float, default=COMMAND_PARTITION_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="Один проход и выход")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    maintainer = PartitionMaintainer(engine, args.interval)
+    if args.once:
+        print(maintainer.run_once())
+    else:
+        try:
+            maintainer.run_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,94 @@
+"""
+Последовательности команд (сценарии) из UserSettings.command_sequences
+
+Формат элемента:
+    {
+        "name": "Спокойной ночи",
+        "trigger": "спокойной ночи",
+        "steps": [
+            {"action": "turn_off", "device_type": "light"},
+            {"action": "close", "device_type": "smart_lock", "location": "коридор"}
+        ]
+    }
+
+Шаг применяется ко всем активным устройствам, подходящим под его фильтры
+(device_id, device_type, location); шаг без фильтров - ко всем устройствам.
+Если trigger не задан, фразой запуска служит name
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Tuple
+
+# Действия, меняющие состояние устройства
+STATE_ACTIONS = {"turn_on": True, "turn_off": False}
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> str:
+    """Слова текста через пробел, без пунктуации"""
+    return " ".join(_WORD.findall(text.lower()))
+
+
+@dataclass(frozen=True, slots=True)
+class SequenceStep:
+    action: str
+    device_id: Optional[int] = None
+    device_type: Optional[str] = None
+    location: Optional[str] = None
+
+    def matches(self, device_id: int, device_type: str, location: Optional[str]) -> bool:
+        return (
+            (self.device_id is None or self.device_id == device_id)
+            and (self.device_type is None or self.device_type == device_type)
+            and (self.location is None or self.location == location)
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CommandSequence:
+    name: str
+    trigger: str
+    steps: Tuple[SequenceStep, ...]
+
+
+def _parse_step(raw: Any) -> Optional[SequenceStep]:
+    if not isinstance(raw, dict) or not isinstance(raw.get("action"), str):
+        return None
+    device_id = raw.get("device_id")
+    return SequenceStep(
+        action=raw["action"],
+        device_id=device_id if isinstance(device_id, int) else None,
+        device_type=raw.get("device_type") or None,
+        location=raw.get("location") or None
+    )
+
+
+def parse_sequences(raw_sequences: Optional[Iterable[Any]]) -> Tuple[CommandSequence, ...]:
+    """Некорректные элементы пропускаются: настройки редактируются вручную"""
+    sequences = []
+    for raw in raw_sequences or ():
+        if not isinstance(raw, dict):
+            continue
+        name = raw.get("name") or raw.get("trigger")
+        trigger = _words(raw.get("trigger") or name or "")
+        steps = tuple(step for step in map(_parse_step, raw.get("steps") or ()) if step)
+        if trigger and steps:
+            sequences.append(CommandSequence(name=name, trigger=trigger, steps=steps))
+    # Более длинная фраза запуска проверяется раньше: "свет спокойной ночи"
+    # не должен перехватываться сценарием "спокойной ночи"
+    sequences.sort(key=lambda sequence: -len(sequence.trigger))
+    return tuple(sequences)
+
+
+def find_sequence(
+    sequences: Tuple[CommandSequence, ...],
+    text: str
+) -> Optional[CommandSequence]:
+    # Фраза запуска ищется по границам слов
+    padded = f" {_words(text)} "
+    for sequence in sequences:
+        if f" {sequence.trigger} " in padded:
+            return sequence
+    return None
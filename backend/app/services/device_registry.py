@@ -0,0 +1,222 @@
+"""
+Реестр устройств пользователей в памяти процесса
+
+Индексирует активные устройства каждого пользователя по (device_type, location),
+чтобы DecisionController находил целевое устройство без запроса к базе.
+Согласованность внутри процесса поддерживается хуками в обработчиках
+app/routers/devices.py; изменения, сделанные другими процессами, становятся
+видны не позднее чем через DEVICE_REGISTRY_TTL секунд. Если команда пришлась
+на устройство, удаленное другим процессом, запись завершается StaleDataError:
+конвейер сбрасывает реестр пользователя и повторяется (app/routers/voice.py).
+Холодные пользователи вытесняются по LRU
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+from app.models import Device
+
+_IndexKey = Tuple[Optional[str], Optional[str]]
+
+
+@dataclass(frozen=True, slots=True)
+class DeviceEntry:
+    """Снимок неизменяемых для голосового поиска полей устройства"""
+    id: int
+    name: str
+    device_type: str
+    location: Optional[str]
+    owner_id: int
+
+    @classmethod
+    def from_device(cls, device: Device) -> "DeviceEntry":
+        return cls(
+            id=device.id,
+            name=device.name,
+            device_type=device.device_type,
+            location=device.location,
+            owner_id=device.owner_id
+        )
+
+
+class _UserDevices:
+    __slots__ = ("entries", "index", "expires_at")
+
+    def __init__(self, entries: Iterable[DeviceEntry], expires_at: float):
+        self.entries: Dict[int, DeviceEntry] = {entry.id: entry for entry in entries}
+        self.index: Dict[_IndexKey, DeviceEntry] = {}
+        self.expires_at = expires_at
+        self.reindex()
+
+    def reindex(self) -> None:
+        # None в ключе означает "любое значение", как и отсутствие фильтра в запросе
+        index: Dict[_IndexKey, DeviceEntry] = {}
+        for entry in sorted(self.entries.values(), key=lambda e: e.id):
+            for key in (
+                (entry.device_type, entry.location),
+                (entry.device_type, None),
+                (None, entry.location),
+                (None, None),
+            ):
+                index.setdefault(key, entry)
+        self.index = index
+
+
+class DeviceRegistry:
+    def __init__(self, max_users: int = 10000, ttl: float = 30.0):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._users: "OrderedDict[int, _UserDevices]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def resolve(
+        self,
+        db: Session,
+        user_id: int,
+        device_type: Optional[str],
+        location: Optional[str]
+    ) -> Optional[DeviceEntry]:
+        user_devices, generation = self._cached(user_id)
+        if user_devices is None:
+            devices = db.execute(self._devices_query(user_id)).scalars()
+            user_devices = self._store(user_id, generation, devices)
+        return user_devices.index.get((device_type, location))
+
+    async def resolve_async(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        device_type: Optional[str],
+        location: Optional[str]
+    ) -> Optional[DeviceEntry]:
+        """То же, что resolve, для асинхронной сессии"""
+        user_devices, generation = self._cached(user_id)
+        if user_devices is None:
+            devices = (await db.execute(self._devices_query(user_id))).scalars()
+            user_devices = self._store(user_id, generation, devices)
+        return user_devices.index.get((device_type, location))
+
+    @staticmethod
+    def _devices_query(user_id: int):
+        return select(Device).where(Device.owner_id == user_id, Device.is_active == True)
+
+    def _cached(self, user_id: int) -> Tuple[Optional[_UserDevices], int]:
+        with self._lock:
+            user_devices = self._users.get(user_id)
+            if user_devices is not None and user_devices.expires_at > time.monotonic():
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return user_devices, self._generation
+            self._users.pop(user_id, None)
+            self.misses += 1
+            return None, self._generation
+
+    def _store(self, user_id: int, generation: int, devices: Iterable[Device]) -> _UserDevices:
+        user_devices = _UserDevices(
+            (DeviceEntry.from_device(dev) for dev in devices), time.monotonic() + self.ttl
+        )
+        with self._lock:
+            # Если за время загрузки устройства менялись, снимок мог устареть
+            if generation == self._generation:
+                self._users[user_id] = user_devices
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+                    self.evictions += 1
+        return user_devices
+
+    def attach(self, db: Session, entry: DeviceEntry) -> Device:
+        """Возвращает устройство, привязанное к сессии, без SELECT"""
+        device = db.identity_map.get(identity_key(Device, entry.id))
+        if device is None:
+            device = Device(
+                id=entry.id,
+                name=entry.name,
+                device_type=entry.device_type,
+                location=entry.location,
+                owner_id=entry.owner_id,
+                is_active=True
+            )
+            make_transient_to_detached(device)
+            db.add(device)
+        return device
+
+    def upsert(self, device: Device) -> None:
+        """Хук после создания или изменения устройства"""
+        with self._lock:
+            self._generation += 1
+            user_devices = self._users.get(device.owner_id)
+            if user_devices is None:
+                return
+            if device.is_active:
+                user_devices.entries[device.id] = DeviceEntry.from_device(device)
+            else:
+                user_devices.entries.pop(device.id, None)
+            user_devices.reindex()
+
+    def upsert_many(self, devices: Iterable[Any]) -> None:
+        """
+        Хук после пакетного изменения: индекс каждого пользователя
+        перестраивается один раз. Принимает устройства или строки
+        RETURNING с теми же атрибутами
+        """
+        with self._lock:
+            self._generation += 1
+            touched: Dict[int, _UserDevices] = {}
+            for device in devices:
+                user_devices = self._users.get(device.owner_id)
+                if user_devices is None:
+                    continue
+                if device.is_active:
+                    user_devices.entries[device.id] = DeviceEntry.from_device(device)
+                else:
+                    user_devices.entries.pop(device.id, None)
+                touched[device.owner_id] = user_devices
+            for user_devices in touched.values():
+                user_devices.reindex()
+
+    def discard(self, owner_id: int, device_id: int) -> None:
+        """Хук после удаления устройства"""
+        with self._lock:
+            self._generation += 1
+            user_devices = self._users.get(owner_id)
+            if user_devices is not None and user_devices.entries.pop(device_id, None):
+                user_devices.reindex()
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "max_users": self.max_users,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+device_registry = DeviceRegistry(
+    max_users=int(os.getenv("DEVICE_REGISTRY_MAX_USERS", "10000")),
+    ttl=float(os.getenv("DEVICE_REGISTRY_TTL", "30"))
+)
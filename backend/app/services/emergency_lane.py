@@ -0,0 +1,114 @@
+"""
+Быстрый путь экстренной остановки
+
+Команды stop/pause пользователей с включенным emergency_commands_priority
+выполняются в обход кэша анализа, пакетной обработки и основного пула
+соединений: через зарезервированные соединения emergency_engine одной
+транзакцией (UPDATE ... RETURNING id и вставка команды). Если все
+соединения заняты дольше EMERGENCY_POOL_TIMEOUT, stop возвращает None
+и остановка выполняется обычным конвейером
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database import emergency_engine
+from app.controllers.decision_controller import EMERGENCY_ACTIONS, emergency_stop_statement
+from app.models import Command, UserSettings
+from app.services.user_matchers import UserMatcherCache, UserProfile, user_matchers
+from app.strategies.intent_matcher import DEFAULT_MATCHER
+
+logger = logging.getLogger(__name__)
+
+
+class EmergencyLane:
+    def __init__(self, engine: AsyncEngine, profiles: UserMatcherCache = user_matchers):
+        self.engine = engine
+        self.profiles = profiles
+        self.stops_total = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.fallbacks = 0
+
+    def detect(self, user_id: int, text: str) -> bool:
+        """Распознавание без кэша анализа: точное совпадение по словарю пользователя"""
+        profile = self.profiles.peek(user_id)
+        matcher = profile.matcher if profile else DEFAULT_MATCHER
+        return matcher.match(text.lower()).action in EMERGENCY_ACTIONS
+
+    async def warm_up(self) -> None:
+        """Открывает соединения пула заранее, чтобы остановки не ждали подключения"""
+        size = getattr(self.engine.pool, "size", lambda: 1)()
+        try:
+            # Соединения удерживаются одновременно, иначе пул выдаст одно и то же
+            async with AsyncExitStack() as stack:
+                await asyncio.gather(*(stack.enter_async_context(self.engine.connect()) for _ in range(size)))
+        except (OSError, SQLAlchemyError):
+            logger.warning("Emergency lane connection could not be reserved", exc_info=True)
+
+    async def stop(self, user_id: int, command_text: str, language: str = "ru-RU") -> Optional[List[int]]:
+        """
+        Выполняет остановку; None - приоритет у пользователя отключен,
+        команда обрабатывается обычным конвейером
+        """
+        started = time.perf_counter()
+        profile = self.profiles.peek(user_id)
+        try:
+            device_ids = await self._stop(user_id, command_text, language, profile)
+        except PoolTimeoutError:
+            self.fallbacks += 1
+            logger.warning("Emergency lane is busy, user %s falls back to the regular pipeline", user_id)
+            return None
+        if device_ids is None:
+            return None
+
+        latency = time.perf_counter() - started
+        self.stops_total += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        logger.info("Emergency stop for user %s: %d devices in %.1f ms", user_id, len(device_ids), latency * 1000)
+        return device_ids
+
+    async def _stop(
+        self, user_id: int, command_text: str, language: str,
+        profile: Optional[UserProfile]
+    ) -> Optional[List[int]]:
+        async with self.engine.begin() as conn:
+            if profile is not None:
+                priority = profile.emergency_priority
+            else:
+                priority = await conn.scalar(
+                    select(UserSettings.emergency_commands_priority).where(UserSettings.user_id == user_id)
+                )
+            if priority is False:
+                return None
+
+            device_ids = list((await conn.execute(emergency_stop_statement(user_id))).scalars())
+            await conn.execute(insert(Command).values(
+                user_id=user_id,
+                device_id=None,
+                command_text=command_text,
+                recognized_text=command_text.lower(),
+                action="emergency_stop",
+                status="executed",
+                language=language
+            ))
+        return device_ids
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "stops_total": self.stops_total,
+            "latency_avg_seconds": self.latency_total / self.stops_total if self.stops_total else 0.0,
+            "latency_max_seconds": self.latency_max,
+            "fallbacks": self.fallbacks,
+        }
+
+
+emergency_lane = EmergencyLane(emergency_engine)
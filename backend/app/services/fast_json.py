@@ -0,0 +1,53 @@
+"""
+Быстрая выдача списков в JSON
+
+Строки выбираются столбцами (без ORM-объектов), проверяются заранее
+собранным TypeAdapter из app/schemas.py и сериализуются orjson
+"""
+
+from typing import Any, Iterable, Iterator, List, Mapping, Sequence, Type
+
+import orjson
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    Ответ, сериализуемый orjson. Время в UTC выводится с суффиксом Z,
+    как при сериализации моделей Pydantic
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def row_columns(model: type, schema: Type[BaseModel]) -> List[Any]:
+    """Столбцы модели SQLAlchemy, соответствующие полям схемы ответа"""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def list_response(adapter: TypeAdapter, rows: Iterable[Mapping[str, Any]]) -> ORJSONResponse:
+    return ORJSONResponse(adapter.validate_python([dict(row) for row in rows]))
+
+
+def stream_list_response(
+    adapter: TypeAdapter,
+    rows: Sequence[Mapping[str, Any]],
+    chunk_size: int
+) -> StreamingResponse:
+    """
+    Тот же JSON-массив, что и list_response, но проверка и сериализация
+    идут порциями по chunk_size строк по мере отправки тела
+    """
+    def chunks() -> Iterator[bytes]:
+        yield b"["
+        for start in range(0, len(rows), chunk_size):
+            items = adapter.validate_python([dict(row) for row in rows[start:start + chunk_size]])
+            body = orjson.dumps(items, option=ORJSON_OPTIONS)[1:-1]
+            yield b"," + body if start else body
+        yield b"]"
+
+    return StreamingResponse(chunks(), media_type="application/json")
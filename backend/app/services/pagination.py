@@ -0,0 +1,30 @@
+"""
+Курсоры для постраничного вывода по ключу (keyset pagination)
+
+Курсор - непрозрачная строка с ключом сортировки последней выданной записи
+(created_at, id); следующая страница начинается строго после него, поэтому
+стоимость запроса не зависит от глубины страницы
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    payload = json.dumps([created_at.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise InvalidCursor(cursor) from e
@@ -0,0 +1,143 @@
+"""
+Метрики пулов соединений с базой
+
+Счетчики обновляются событиями пула SQLAlchemy (connect, checkout,
+checkin, invalidate) и событием handle_error для неудачных pre-ping.
+Время ожидания соединения измеряется в подклассе пула (pool_class):
+у пула нет события начала выдачи соединения. Показатели локальны
+для процесса
+"""
+
+import bisect
+import threading
+import time
+from typing import Any, Dict, List, Optional, Type
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+# Верхние границы корзин гистограммы ожидания, секунды
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._engine: Optional[Engine] = None
+        self.connects = 0
+        self.overflow_connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.checked_out_peak = 0
+        self.timeouts = 0
+        self.invalidations = 0
+        self.pre_ping_failures = 0
+        self.wait_buckets: List[int] = [0] * (len(WAIT_BUCKETS) + 1)
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def pool_class(self, base: Type[Pool]) -> Type[Pool]:
+        """
+        Подкласс пула, измеряющий ожидание соединения. Пул пересоздается
+        (Engine.dispose) через свой класс, поэтому замер сохраняется
+        """
+        metrics = self
+
+        def _do_get(pool: Pool) -> Any:
+            started = time.perf_counter()
+            try:
+                connection = base._do_get(pool)
+            except exc.TimeoutError:
+                metrics.record_timeout(time.perf_counter() - started)
+                raise
+            metrics.observe_wait(time.perf_counter() - started)
+            return connection
+
+        return type(f"Measured{base.__name__}", (base,), {"_do_get": _do_get})
+
+    def attach(self, engine: Engine) -> None:
+        """Подписка на события пула и движка (для async - engine.sync_engine)"""
+        self._engine = engine
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "handle_error", self._on_error)
+
+    def observe_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_buckets[bisect.bisect_left(WAIT_BUCKETS, seconds)] += 1
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_timeout(self, seconds: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+        self.observe_wait(seconds)
+
+    def _on_connect(self, dbapi_connection: Any, connection_record: Any) -> None:
+        overflow = getattr(self._pool(), "overflow", None)
+        with self._lock:
+            self.connects += 1
+            # QueuePool увеличивает счетчик до открытия соединения:
+            # положительное значение - соединение сверх pool_size
+            if overflow is not None and overflow() > 0:
+                self.overflow_connects += 1
+
+    def _on_checkout(self, dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+        checked_out = getattr(self._pool(), "checkedout", None)
+        with self._lock:
+            self.checkouts += 1
+            if checked_out is not None:
+                self.checked_out_peak = max(self.checked_out_peak, checked_out())
+
+    def _on_checkin(self, dbapi_connection: Any, connection_record: Any) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection: Any, connection_record: Any, exception: Any) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def _on_error(self, context: Any) -> None:
+        if context.is_pre_ping:
+            with self._lock:
+                self.pre_ping_failures += 1
+
+    def _pool(self) -> Optional[Pool]:
+        return self._engine.pool if self._engine is not None else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self._pool()
+        state: Dict[str, Any] = {"pool_class": type(pool).__name__ if pool else None}
+        for name in ("size", "checkedout", "checkedin", "overflow"):
+            method = getattr(pool, name, None)
+            state[name] = method() if method else None
+        with self._lock:
+            # Корзины накопительные: le_X - ожиданий не дольше X секунд
+            histogram, total = {}, 0
+            for bound, count in zip(WAIT_BUCKETS, self.wait_buckets):
+                total += count
+                histogram[f"le_{bound:g}"] = total
+            histogram["le_inf"] = self.wait_count
+            return {
+                **state,
+                "checked_out_peak": self.checked_out_peak,
+                "connects": self.connects,
+                "overflow_connects": self.overflow_connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "timeouts": self.timeouts,
+                "invalidations": self.invalidations,
+                "pre_ping_failures": self.pre_ping_failures,
+                "wait_seconds": {
+                    "count": self.wait_count,
+                    "avg": self.wait_total / self.wait_count if self.wait_count else 0.0,
+                    "max": self.wait_max,
+                    "histogram": histogram,
+                },
+            }
@@ -0,0 +1,134 @@
+"""
+Кэш ответов GET /api/settings/{user_id}/
+
+Хранит уже сериализованное тело ответа и строгий ETag (хэш тела) на
+SETTINGS_CACHE_TTL секунд; update_settings заменяет запись сразу.
+Чтение ничего не пишет в базу: пока пользователь не сохранил настройки,
+отдаются значения по умолчанию.
+Кэш локален для процесса: изменения, сделанные другим процессом,
+становятся видны не позднее чем через TTL
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.models import UserSettings
+
+
+@dataclass(frozen=True, slots=True)
+class CachedSettings:
+    body: bytes
+    etag: str
+    expires_at: float
+
+
+def settings_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверка If-None-Match: список тегов или "*"; слабые теги сравниваются без W/"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def default_settings(user_id: int) -> schemas.SettingsResponse:
+    """Настройки по умолчанию для пользователя, у которого их еще нет в базе"""
+    return schemas.SettingsResponse(user_id=user_id)
+
+
+def ensure_default_settings(db: Session, user_id: int) -> None:
+    """
+    Создает настройки по умолчанию, если их еще нет
+
+    INSERT ... ON CONFLICT DO NOTHING: параллельные вызовы не падают
+    на уникальности user_id. Фиксацию выполняет вызывающий
+    """
+    db.execute(
+        insert(UserSettings).values(user_id=user_id)
+        .on_conflict_do_nothing(index_elements=[UserSettings.user_id])
+    )
+
+
+class SettingsCache:
+    def __init__(self, ttl: float = 30.0, max_users: int = 10000):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._users: "OrderedDict[int, CachedSettings]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[CachedSettings]:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry.expires_at > time.monotonic():
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return entry
+            self._users.pop(user_id, None)
+            self.misses += 1
+            return None
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def put(
+        self,
+        settings: Union[UserSettings, schemas.SettingsResponse],
+        generation: Optional[int] = None
+    ) -> CachedSettings:
+        """
+        Сериализует настройки и кэширует ответ. generation - значение
+        generation() до чтения из базы: если настройки успели измениться,
+        прочитанный снимок возвращается, но не кэшируется
+        """
+        body = schemas.SettingsResponse.model_validate(settings).model_dump_json().encode()
+        entry = CachedSettings(body, settings_etag(body), time.monotonic() + self.ttl)
+        with self._lock:
+            if generation is None:
+                self._generation += 1
+            elif generation != self._generation:
+                return entry
+            self._users[settings.user_id] = entry
+            self._users.move_to_end(settings.user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return entry
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "max_users": self.max_users,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+settings_cache = SettingsCache(
+    ttl=float(os.getenv("SETTINGS_CACHE_TTL", "30")),
+    max_users=int(os.getenv("SETTINGS_CACHE_MAX_USERS", "10000"))
+)
@@ -0,0 +1,232 @@
+"""
+Кэш сопоставителей намерений с пользовательскими ключевыми словами
+
+Для каждого пользователя словарь объединяется с UserSettings.custom_keywords
+и компилируется в IntentMatcher. Запись кэша версионируется по
+UserSettings.updated_at и перестраивается хуком из update_settings
+(app/routers/settings.py) только при изменении ключевых слов. Изменения,
+сделанные другими процессами, обнаруживаются по истечении USER_MATCHER_TTL
+секунд: запись сверяется с updated_at в базе и перечитывается, только если
+настройки менялись. Холодные пользователи вытесняются по LRU. Пользователи без своих слов получают
+общий DEFAULT_MATCHER и не занимают памяти под автомат.
+Вместе с автоматом хранятся разобранные сценарии command_sequences
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import UserSettings
+from app.services.command_sequences import CommandSequence, parse_sequences
+from app.strategies.intent_matcher import IntentMatcher, DEFAULT_MATCHER
+from app.strategies.lexicon import merge_custom_keywords
+
+
+@dataclass(frozen=True, slots=True)
+class UserProfile:
+    """Скомпилированные голосовые настройки пользователя"""
+    updated_at: Optional[datetime]
+    keywords: Tuple[str, ...]
+    matcher: IntentMatcher
+    sequences: Tuple[CommandSequence, ...] = ()
+    emergency_priority: bool = True
+
+
+@dataclass(frozen=True, slots=True)
+class _CachedProfile:
+    profile: UserProfile
+    expires_at: float
+
+
+def _normalize(custom_keywords: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    return tuple(keyword for keyword in custom_keywords or () if isinstance(keyword, str))
+
+
+def compile_matcher(keywords: Tuple[str, ...]) -> IntentMatcher:
+    if not keywords:
+        return DEFAULT_MATCHER
+    matcher = IntentMatcher(merge_custom_keywords(keywords))
+    # Слова, не изменившие словарь, не требуют отдельного автомата
+    return DEFAULT_MATCHER if matcher.version == DEFAULT_MATCHER.version else matcher
+
+
+class UserMatcherCache:
+    def __init__(self, max_users: int = 10000, ttl: float = 30.0):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._users: "OrderedDict[int, _CachedProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def get(self, db: Session, user_id: int) -> IntentMatcher:
+        return self.get_profile(db, user_id).matcher
+
+    def get_profile(self, db: Session, user_id: int) -> UserProfile:
+        cached, generation = self._lookup(user_id)
+        if cached is not None and cached.expires_at > time.monotonic():
+            return cached.profile
+
+        if cached is not None:
+            # Запись истекла: достаточно сверить версию настроек в базе
+            row = db.execute(self._version_query(user_id)).first()
+            if self._revalidate(user_id, generation, cached, row):
+                return cached.profile
+
+        row = db.execute(self._settings_query(user_id)).first()
+        return self._build(user_id, generation, cached, row)
+
+    async def get_profile_async(self, db: AsyncSession, user_id: int) -> UserProfile:
+        """
+        То же, что get_profile, для асинхронной сессии; компиляция
+        словаря выполняется в пуле потоков
+        """
+        cached, generation = self._lookup(user_id)
+        if cached is not None and cached.expires_at > time.monotonic():
+            return cached.profile
+
+        if cached is not None:
+            row = (await db.execute(self._version_query(user_id))).first()
+            if self._revalidate(user_id, generation, cached, row):
+                return cached.profile
+
+        row = (await db.execute(self._settings_query(user_id))).first()
+        return await run_in_threadpool(self._build, user_id, generation, cached, row)
+
+    @staticmethod
+    def _version_query(user_id: int):
+        return select(UserSettings.updated_at).where(UserSettings.user_id == user_id)
+
+    @staticmethod
+    def _settings_query(user_id: int):
+        return select(
+            UserSettings.updated_at,
+            UserSettings.custom_keywords,
+            UserSettings.command_sequences,
+            UserSettings.emergency_commands_priority
+        ).where(UserSettings.user_id == user_id)
+
+    def _lookup(self, user_id: int) -> Tuple[Optional[_CachedProfile], int]:
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is not None:
+                self._users.move_to_end(user_id)
+                if cached.expires_at > time.monotonic():
+                    self.hits += 1
+                    return cached, self._generation
+            self.misses += 1
+            return cached, self._generation
+
+    def _revalidate(self, user_id: int, generation: int, cached: _CachedProfile, row) -> bool:
+        if (row[0] if row else None) != cached.profile.updated_at:
+            return False
+        with self._lock:
+            self.revalidations += 1
+            if generation == self._generation:
+                self._store(user_id, cached.profile)
+        return True
+
+    def _build(self, user_id: int, generation: int, cached: Optional[_CachedProfile], row) -> UserProfile:
+        updated_at, custom_keywords, command_sequences, emergency_priority = row or (None,) * 4
+        keywords = _normalize(custom_keywords)
+        if cached is not None and cached.profile.keywords == keywords:
+            matcher = cached.profile.matcher
+        else:
+            matcher = compile_matcher(keywords)
+        profile = UserProfile(
+            updated_at, keywords, matcher, parse_sequences(command_sequences),
+            emergency_priority is not False
+        )
+
+        with self._lock:
+            # Если за время загрузки настройки менялись, снимок мог устареть
+            if generation == self._generation:
+                self._store(user_id, profile)
+        return profile
+
+    def peek(self, user_id: int) -> Optional[UserProfile]:
+        """Профиль из кэша без обращения к базе; истекший не возвращается"""
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is None or cached.expires_at <= time.monotonic():
+                return None
+            return cached.profile
+
+    def refresh(self, settings: UserSettings) -> None:
+        """Хук после изменения настроек пользователя"""
+        user_id, updated_at = settings.user_id, settings.updated_at
+        keywords = _normalize(settings.custom_keywords)
+        sequences = parse_sequences(settings.command_sequences)
+        emergency_priority = settings.emergency_commands_priority is not False
+        with self._lock:
+            self._generation += 1
+            cached = self._users.get(user_id)
+            if cached is None:
+                return
+            if cached.profile.keywords == keywords:
+                # Ключевые слова не менялись: автомат остается прежним
+                self._store(user_id, UserProfile(
+                    updated_at, keywords, cached.profile.matcher, sequences, emergency_priority
+                ))
+                return
+
+        matcher = compile_matcher(keywords)
+        with self._lock:
+            current = self._users.get(user_id)
+            # Более новая версия могла быть записана параллельным запросом
+            if current is not None and (
+                current.profile.updated_at is None or updated_at is None
+                or current.profile.updated_at <= updated_at
+            ):
+                self.rebuilds += 1
+                self._store(user_id, UserProfile(updated_at, keywords, matcher, sequences, emergency_priority))
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def _store(self, user_id: int, profile: UserProfile) -> None:
+        self._users[user_id] = _CachedProfile(profile, time.monotonic() + self.ttl)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "max_users": self.max_users,
+                "ttl_seconds": self.ttl,
+                "compiled": sum(
+                    1 for cached in self._users.values() if cached.profile.matcher is not DEFAULT_MATCHER
+                ),
+                "hits": self.hits,
+                "misses": self.misses,
+                "rebuilds": self.rebuilds,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+            }
+
+
+user_matchers = UserMatcherCache(
+    max_users=int(os.getenv("USER_MATCHER_MAX_USERS", "10000")),
+    ttl=float(os.getenv("USER_MATCHER_TTL", "30"))
+)
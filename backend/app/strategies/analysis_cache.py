@@ -0,0 +1,157 @@
+"""
+Кэш результатов анализа голосовых команд
+
+Ограниченный LRU/TTL кэш перед IAnalysisStrategy.analyze_data. Ключ включает
+нормализованный текст, язык и версию стратегии; версия стратегии зависит
+от словаря, поэтому смена словаря или стратегии делает старые записи
+недостижимыми, и они вытесняются естественным образом
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+
+from app.strategies.analysis_strategy import AnalysisResult, IAnalysisStrategy
+from app.strategies.intent_matcher import IntentMatcher
+
+_CacheKey = Tuple[str, str, str]
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " \t\n.,!?;:…\"'«»"
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", text.lower()).strip(_EDGE_PUNCTUATION)
+
+
+def _footprint(key: _CacheKey, result: AnalysisResult) -> int:
+    # Оценка без учета разделяемых строк-значений словаря
+    return (
+        sys.getsizeof(key) + sum(sys.getsizeof(part) for part in key)
+        + sys.getsizeof(result) + sys.getsizeof(result.recognized_text)
+    )
+
+
+class AnalysisCache:
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[_CacheKey, Tuple[float, AnalysisResult, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: _CacheKey) -> Optional[AnalysisResult]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, result, size = item
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.memory_bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: _CacheKey, result: AnalysisResult) -> None:
+        size = _footprint(key, result)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.memory_bytes -= previous[2]
+            self._entries[key] = (time.monotonic(), result, size)
+            self.memory_bytes += size
+            while len(self._entries) > self.maxsize:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.memory_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.memory_bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "memory_bytes": self.memory_bytes,
+            }
+
+
+class CachedAnalysisStrategy(IAnalysisStrategy):
+    """
+    Декоратор стратегии анализа с кэшем результатов
+
+    При промахе анализируется нормализованный текст, то есть ровно то,
+    что входит в ключ: все варианты записи одной фразы получают одинаковые
+    намерения независимо от того, какой вариант встретился первым.
+    recognized_text всегда формируется из текущего текста команды
+    """
+
+    def __init__(self, strategy: IAnalysisStrategy, cache: Optional[AnalysisCache] = None):
+        self.strategy = strategy
+        self.cache = cache if cache is not None else analysis_cache
+
+    @property
+    def version(self) -> str:
+        return self.strategy.version
+
+    def with_matcher(self, matcher: IntentMatcher) -> "CachedAnalysisStrategy":
+        strategy = self.strategy.with_matcher(matcher)
+        if strategy is self.strategy:
+            return self
+        return CachedAnalysisStrategy(strategy, self.cache)
+
+    def analyze_data(self, data: List[str], language: str = "ru-RU") -> AnalysisResult:
+        text = " ".join(data)
+        normalized = normalize_text(text)
+        key = (normalized, language, self.strategy.version)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.strategy.analyze_data([normalized], language)
+            self.cache.put(key, result)
+        return replace(result, recognized_text=text.lower())
+
+    def analyze_batch(self, texts: List[str], language: str = "ru-RU") -> List[AnalysisResult]:
+        version = self.strategy.version
+        keys = [(normalize_text(text), language, version) for text in texts]
+        cached: Dict[_CacheKey, Optional[AnalysisResult]] = {}
+        for key in keys:
+            if key not in cached:
+                cached[key] = self.cache.get(key)
+
+        # Повторы одной фразы в пакете анализируются один раз
+        missing = [key for key, result in cached.items() if result is None]
+        if missing:
+            analyzed = self.strategy.analyze_batch([key[0] for key in missing], language)
+            for key, result in zip(missing, analyzed):
+                self.cache.put(key, result)
+                cached[key] = result
+        return [replace(cached[key], recognized_text=text.lower()) for key, text in zip(keys, texts)]
+
+
+analysis_cache = AnalysisCache(
+    maxsize=int(os.getenv("ANALYSIS_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("ANALYSIS_CACHE_TTL", "3600"))
+)
@@ -1,73 +1,138 @@
+import os
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from typing import List, Optional
+from app.strategies.intent_matcher import IntentMatcher, DEFAULT_MATCHER
+from app.strategies.fuzzy_lexicon import FuzzyLexicon, DEFAULT_FUZZY_LEXICON
+from app.strategies.lexicon import ACTION, DEVICE_TYPE, LOCATION
+
+# Каталог с артефактом модели (python -m app.strategies.ml_training)
+ML_MODEL_DIR = os.getenv("ML_MODEL_DIR", "data/model")
+
+
+@dataclass(frozen=True, slots=True)
+class AnalysisResult:
+    action: str
+    device_type: Optional[str]
+    location: Optional[str]
+    recognized_text: str
 
 
 class IAnalysisStrategy(ABC):
+    @property
+    def version(self) -> str:
+        return type(self).__name__
+
     @abstractmethod
-    def analyze_data(self, data: List[str]) -> Dict[str, Any]:
+    def analyze_data(self, data: List[str], language: str = "ru-RU") -> AnalysisResult:
         pass
 
+    def analyze_batch(self, texts: List[str], language: str = "ru-RU") -> List[AnalysisResult]:
+        return [self.analyze_data([text], language) for text in texts]
+
+    def with_matcher(self, matcher: IntentMatcher) -> "IAnalysisStrategy":
+        """Стратегия с другим словарем; не использующие словарь возвращают себя"""
+        return self
+
 
 class StatisticalAnalysisStrategy(IAnalysisStrategy):
-    def analyze_data(self, data: List[str]) -> Dict[str, Any]:
+    def __init__(
+        self,
+        matcher: IntentMatcher = DEFAULT_MATCHER,
+        fuzzy: Optional[FuzzyLexicon] = DEFAULT_FUZZY_LEXICON
+    ):
+        self.matcher = matcher
+        self.fuzzy = fuzzy
+
+    @property
+    def version(self) -> str:
+        fuzzy_version = self.fuzzy.version if self.fuzzy else "exact"
+        return f"{type(self).__name__}:{self.matcher.version}:{fuzzy_version}"
+
+    def with_matcher(self, matcher: IntentMatcher) -> "StatisticalAnalysisStrategy":
+        if matcher is self.matcher:
+            return self
+        return StatisticalAnalysisStrategy(matcher, self.fuzzy)
+
+    def analyze_data(self, data: List[str], language: str = "ru-RU") -> AnalysisResult:
         text = " ".join(data).lower()
-        
-        actions = {
-            "включи": "turn_on",
-            "выключи": "turn_off",
-            "включить": "turn_on",
-            "выключить": "turn_off",
-            "открой": "open",
-            "закрой": "close",
-            "увеличь": "increase",
-            "уменьши": "decrease",
-            "стоп": "stop",
-            "пауза": "pause"
-        }
-        
-        device_types = {
-            "свет": "light",
-            "ламп": "light",
-            "освещение": "light",
-            "кондиционер": "thermostat",
-            "телевизор": "tv",
-            "телевизора": "tv",
-            "телевизору": "tv",
-            "кофемашина": "coffee_maker",
-            "термостат": "thermostat",
-            "камера": "security_camera",
-            "пылесос": "robot_vacuum",
-            "замок": "smart_lock"
-        }
-        
-        action = None
-        for keyword, act in actions.items():
-            if keyword in text:
-                action = act
-                break
-        
-        device_type = None
-        for keyword, dtype in device_types.items():
-            if keyword in text:
-                device_type = dtype
-                break
-        
-        locations = ["гостиная", "спальня", "кухня", "ванная", "коридор"]
-        location = None
-        for loc in locations:
-            if loc in text:
-                location = loc
-                break
-        
-        return {
-            "action": action or "unknown",
-            "device_type": device_type,
-            "location": location,
-            "recognized_text": text
-        }
+        match = self.matcher.match(text)
+        action, device_type, location = match.action, match.device_type, match.location
+
+        # Нечеткий поиск только дополняет категории, не найденные точно
+        if self.fuzzy and not (action and device_type and location):
+            missing = {
+                category for category, value in
+                ((ACTION, action), (DEVICE_TYPE, device_type), (LOCATION, location))
+                if not value
+            }
+            recovered = self.fuzzy.match_missing(text, missing)
+            action = action or recovered.get(ACTION)
+            device_type = device_type or recovered.get(DEVICE_TYPE)
+            location = location or recovered.get(LOCATION)
+
+        return AnalysisResult(
+            action=action or "unknown",
+            device_type=device_type,
+            location=location,
+            recognized_text=text
+        )
 
 
 class MachineLearningStrategy(IAnalysisStrategy):
-    def analyze_data(self, data: List[str]) -> Dict[str, Any]:
-        return StatisticalAnalysisStrategy().analyze_data(data)
+    """
+    Линейная модель над хэшированными символьными n-граммами
+
+    Артефакт загружается (с отображением весов в память) при первом
+    обращении; пока модель не обучена, используется статистическая стратегия
+    """
+
+    def __init__(self, model_dir: str = ML_MODEL_DIR, fallback: Optional[IAnalysisStrategy] = None):
+        self.model_dir = model_dir
+        self.fallback = fallback or StatisticalAnalysisStrategy()
+        self._model = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    from app.strategies.ml_model import META_FILE, LinearIntentModel
+                    if os.path.exists(os.path.join(self.model_dir, META_FILE)):
+                        self._model = LinearIntentModel.load(self.model_dir)
+                    self._loaded = True
+        return self._model
+
+    @property
+    def version(self) -> str:
+        model = self._get_model()
+        if model is None:
+            return self.fallback.version
+        return f"{type(self).__name__}:{model.version}"
+
+    def with_matcher(self, matcher: IntentMatcher) -> IAnalysisStrategy:
+        # Обученная модель словарем не пользуется, в отличие от запасной стратегии
+        if self._get_model() is None:
+            return self.fallback.with_matcher(matcher)
+        return self
+
+    def analyze_data(self, data: List[str], language: str = "ru-RU") -> AnalysisResult:
+        return self.analyze_batch([" ".join(data)], language)[0]
+
+    def analyze_batch(self, texts: List[str], language: str = "ru-RU") -> List[AnalysisResult]:
+        model = self._get_model()
+        if model is None:
+            return self.fallback.analyze_batch(texts, language)
 
+        lowered = [text.lower() for text in texts]
+        return [
+            AnalysisResult(
+                action=prediction["action"] or "unknown",
+                device_type=prediction["device_type"],
+                location=prediction["location"],
+                recognized_text=text
+            )
+            for text, prediction in zip(lowered, model.predict(lowered))
+        ]
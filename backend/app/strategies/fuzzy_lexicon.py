@@ -0,0 +1,138 @@
+"""
+Нечеткий поиск по словарю ключевых слов
+
+Индекс удалений SymSpell: для префикса каждого ключевого слова заранее
+строятся все варианты с удалением до max_distance символов. При поиске
+такие же удаления строятся для слова из текста, кандидаты проверяются
+расстоянием Дамерау-Левенштейна (OSA). Сравниваются префиксы фиксированной
+длины, что заодно сглаживает окончания ("гостиной" ~ "гостиная")
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.strategies.lexicon import DEFAULT_LEXICON
+from app.strategies.intent_matcher import CATEGORIES
+
+PREFIX_LENGTH = 7
+MAX_DISTANCE = 2
+
+_WORD = re.compile(r"\w+")
+
+
+@dataclass(frozen=True, slots=True)
+class FuzzyHit:
+    category: str
+    value: str
+    term: str
+    distance: int
+
+
+def allowed_distance(length: int) -> int:
+    """Допустимое расстояние по длине слова: короткие слова только точно"""
+    if length <= 4:
+        return 0
+    if length <= 6:
+        return 1
+    return 2
+
+
+def osa_distance(a: str, b: str, limit: int) -> int:
+    """Расстояние OSA; при превышении limit возвращает limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+def _deletes(word: str, distance: int) -> Set[str]:
+    result = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        result |= frontier
+    return result
+
+
+class FuzzyLexicon:
+    # (порядок категории, приоритет, категория, значение, ключевое слово, префикс)
+    _Entry = Tuple[int, int, str, str, str, str]
+
+    def __init__(
+        self,
+        lexicon: Dict[str, Dict[str, str]],
+        prefix_length: int = PREFIX_LENGTH,
+        max_distance: int = MAX_DISTANCE
+    ):
+        self.prefix_length = prefix_length
+        self.max_distance = max_distance
+        payload = json.dumps(
+            [prefix_length, max_distance] + [lexicon.get(category, {}) for category in CATEGORIES],
+            ensure_ascii=False
+        )
+        self.version = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+        self._index: Dict[str, List[FuzzyLexicon._Entry]] = {}
+        for order, category in enumerate(CATEGORIES):
+            for priority, (keyword, value) in enumerate(lexicon.get(category, {}).items()):
+                prefix = keyword.lower()[:prefix_length]
+                entry = (order, priority, category, value, keyword, prefix)
+                for deleted in _deletes(prefix, min(max_distance, allowed_distance(len(prefix)))):
+                    self._index.setdefault(deleted, []).append(entry)
+
+    def lookup(self, word: str) -> Optional[FuzzyHit]:
+        prefix = word.lower()[:self.prefix_length]
+        limit = min(self.max_distance, allowed_distance(len(prefix)))
+        best: Optional[Tuple[int, int, int, FuzzyLexicon._Entry]] = None
+        seen: Set[str] = set()
+        for deleted in _deletes(prefix, limit):
+            for entry in self._index.get(deleted, ()):
+                term_prefix = entry[5]
+                if term_prefix in seen:
+                    continue
+                seen.add(term_prefix)
+                bound = min(limit, allowed_distance(len(term_prefix)))
+                distance = osa_distance(prefix, term_prefix, bound)
+                if distance > bound:
+                    continue
+                rank = (distance, entry[0], entry[1], entry)
+                if best is None or rank[:3] < best[:3]:
+                    best = rank
+        if best is None:
+            return None
+        entry = best[3]
+        return FuzzyHit(category=entry[2], value=entry[3], term=entry[4], distance=best[0])
+
+    def match_missing(self, text: str, missing: Set[str]) -> Dict[str, str]:
+        """
+        Заполняет отсутствующие категории по словам текста
+
+        Слово засчитывается только своей лучшей категории, поэтому слово,
+        уже распознанное как действие, не станет местоположением
+        """
+        found: Dict[str, Tuple[int, str]] = {}
+        for word in _WORD.findall(text):
+            hit = self.lookup(word)
+            if hit is None or hit.category not in missing:
+                continue
+            current = found.get(hit.category)
+            if current is None or hit.distance < current[0]:
+                found[hit.category] = (hit.distance, hit.value)
+        return {category: value for category, (_, value) in found.items()}
+
+
+DEFAULT_FUZZY_LEXICON = FuzzyLexicon(DEFAULT_LEXICON)
@@ -0,0 +1,104 @@
+"""
+Компилируемый сопоставитель намерений
+
+Автомат Ахо-Корасик по всем ключевым словам словаря находит действие,
+тип устройства и местоположение за один проход по тексту
+"""
+
+import hashlib
+import json
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.strategies.lexicon import ACTION, DEVICE_TYPE, LOCATION, DEFAULT_LEXICON
+
+CATEGORIES: Tuple[str, ...] = (ACTION, DEVICE_TYPE, LOCATION)
+
+# (индекс категории, приоритет, значение)
+_Output = Tuple[int, int, str]
+
+
+@dataclass(frozen=True, slots=True)
+class IntentMatch:
+    """Результат сопоставления текста со словарем"""
+    action: Optional[str] = None
+    device_type: Optional[str] = None
+    location: Optional[str] = None
+
+
+class IntentMatcher:
+    """
+    Автомат Ахо-Корасик над словарем ключевых слов
+
+    Строится один раз; для каждой категории возвращает совпадение
+    с наименьшим приоритетом (порядком объявления в словаре), что повторяет
+    поведение последовательного поиска `keyword in text`.
+    Версия - хэш словаря: меняется при любом изменении слов или их порядка
+    """
+    __slots__ = ("_goto", "_fail", "_outputs", "version")
+
+    def __init__(self, lexicon: Dict[str, Dict[str, str]]):
+        payload = json.dumps([lexicon.get(category, {}) for category in CATEGORIES], ensure_ascii=False)
+        self.version = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[Tuple[_Output, ...]] = [()]
+
+        own: List[List[_Output]] = [[]]
+        for index, category in enumerate(CATEGORIES):
+            for priority, (keyword, value) in enumerate(lexicon.get(category, {}).items()):
+                node = 0
+                for ch in keyword.lower():
+                    nxt = self._goto[node].get(ch)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto[node][ch] = nxt
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._outputs.append(())
+                        own.append([])
+                    node = nxt
+                own[node].append((index, priority, value))
+
+        # Обход в ширину: суффиксные ссылки и слияние выходов по цепочке ссылок
+        queue = deque(self._goto[0].values())
+        for node in queue:
+            self._outputs[node] = self._best(own[node])
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                self._fail[child] = fail
+                self._outputs[child] = self._best(own[child] + list(self._outputs[fail]))
+                queue.append(child)
+
+    @staticmethod
+    def _best(outputs: List[_Output]) -> Tuple[_Output, ...]:
+        best: Dict[int, _Output] = {}
+        for output in outputs:
+            current = best.get(output[0])
+            if current is None or output[1] < current[1]:
+                best[output[0]] = output
+        return tuple(best.values())
+
+    def match(self, text: str) -> IntentMatch:
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found: List[Optional[Tuple[int, str]]] = [None] * len(CATEGORIES)
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for index, priority, value in outputs[node]:
+                current = found[index]
+                if current is None or priority < current[0]:
+                    found[index] = (priority, value)
+
+        return IntentMatch(*(item[1] if item else None for item in found))
+
+
+DEFAULT_MATCHER = IntentMatcher(DEFAULT_LEXICON)
@@ -0,0 +1,136 @@
+"""
+Словари ключевых слов для анализа голосовых команд
+
+Порядок ключей задает приоритет: при нескольких совпадениях одной категории
+выбирается слово, объявленное раньше
+"""
+
+from typing import Dict, Iterable, List, Set, Tuple
+
+ACTION = "action"
+DEVICE_TYPE = "device_type"
+LOCATION = "location"
+
+ACTION_KEYWORDS: Dict[str, str] = {
+    "включи": "turn_on",
+    "выключи": "turn_off",
+    "включить": "turn_on",
+    "выключить": "turn_off",
+    "открой": "open",
+    "закрой": "close",
+    "увеличь": "increase",
+    "уменьши": "decrease",
+    "стоп": "stop",
+    "пауза": "pause"
+}
+
+DEVICE_TYPE_KEYWORDS: Dict[str, str] = {
+    "свет": "light",
+    "ламп": "light",
+    "освещение": "light",
+    "кондиционер": "thermostat",
+    "телевизор": "tv",
+    "телевизора": "tv",
+    "телевизору": "tv",
+    "кофемашина": "coffee_maker",
+    "термостат": "thermostat",
+    "камера": "security_camera",
+    "пылесос": "robot_vacuum",
+    "замок": "smart_lock"
+}
+
+LOCATION_KEYWORDS: Dict[str, str] = {
+    loc: loc for loc in ["гостиная", "спальня", "кухня", "ванная", "коридор"]
+}
+
+DEFAULT_LEXICON: Dict[str, Dict[str, str]] = {
+    ACTION: ACTION_KEYWORDS,
+    DEVICE_TYPE: DEVICE_TYPE_KEYWORDS,
+    LOCATION: LOCATION_KEYWORDS,
+}
+
+# Разделитель пользовательского ключевого слова и его значения: "люстру=light"
+CUSTOM_KEYWORD_SEPARATOR = "="
+
+
+def _split_custom_keyword(raw: str) -> Tuple[str, str]:
+    phrase, _, value = raw.partition(CUSTOM_KEYWORD_SEPARATOR)
+    return " ".join(phrase.lower().split()), value.strip()
+
+
+def _custom_keyword_targets(
+    custom_keywords: Iterable[str],
+    base: Dict[str, Dict[str, str]]
+) -> Dict[str, Set[str]]:
+    """
+    Допустимые значения записей "фраза=значение" по категориям: действия
+    и типы устройств словаря, стандартные помещения и помещения, объявленные
+    самим пользователем записью без значения
+    """
+    locations = set(base.get(LOCATION, {}).values())
+    for raw in custom_keywords or ():
+        if isinstance(raw, str):
+            phrase, value = _split_custom_keyword(raw)
+            if phrase and not value:
+                locations.add(phrase)
+    return {
+        ACTION: set(base.get(ACTION, {}).values()),
+        DEVICE_TYPE: set(base.get(DEVICE_TYPE, {}).values()),
+        LOCATION: locations,
+    }
+
+
+def invalid_custom_keywords(
+    custom_keywords: Iterable[str],
+    base: Dict[str, Dict[str, str]] = DEFAULT_LEXICON
+) -> List[str]:
+    """Записи "фраза=значение", значение которых не известно словарю"""
+    targets = _custom_keyword_targets(custom_keywords, base)
+    invalid = []
+    for raw in custom_keywords or ():
+        if not isinstance(raw, str):
+            continue
+        phrase, value = _split_custom_keyword(raw)
+        if phrase and value and not any(value in values for values in targets.values()):
+            invalid.append(raw)
+    return invalid
+
+
+def merge_custom_keywords(
+    custom_keywords: Iterable[str],
+    base: Dict[str, Dict[str, str]] = DEFAULT_LEXICON
+) -> Dict[str, Dict[str, str]]:
+    """
+    Объединяет пользовательские ключевые слова со словарем
+
+    Запись "фраза=значение" относится к категории, которой принадлежит
+    значение: действие, тип устройства или помещение. Записи с неизвестным
+    значением пропускаются (update_settings их не принимает, см.
+    invalid_custom_keywords). Запись без значения - название помещения.
+    Пользовательские слова объявляются раньше стандартных и имеют
+    приоритет при совпадении
+    """
+    targets = _custom_keyword_targets(custom_keywords, base)
+    custom: Dict[str, Dict[str, str]] = {ACTION: {}, DEVICE_TYPE: {}, LOCATION: {}}
+    for raw in custom_keywords or ():
+        if not isinstance(raw, str):
+            continue
+        phrase, value = _split_custom_keyword(raw)
+        if not phrase:
+            continue
+        if not value:
+            # Стандартное слово без значения ничего не добавляет
+            if any(phrase in base.get(category, {}) for category in base):
+                continue
+            value = phrase
+        category = next((name for name, values in targets.items() if value in values), None)
+        if category is not None:
+            custom[category].setdefault(phrase, value)
+
+    merged: Dict[str, Dict[str, str]] = {}
+    for category in (ACTION, DEVICE_TYPE, LOCATION):
+        keywords = dict(custom[category])
+        for keyword, value in base.get(category, {}).items():
+            keywords.setdefault(keyword, value)
+        merged[category] = keywords
+    return merged
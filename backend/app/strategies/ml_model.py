@@ -0,0 +1,136 @@
+"""
+Линейная модель распознавания намерений
+
+Хэширование символьных n-грамм и линейные классификаторы для действия,
+типа устройства и местоположения. Веса всех классификаторов хранятся одной
+матрицей в .npy-файле и отображаются в память при первой загрузке, поэтому
+пакет фраз классифицируется одним разреженно-плотным умножением матриц
+"""
+
+import json
+import os
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.strategies.lexicon import ACTION, DEVICE_TYPE, LOCATION
+
+HEADS: Tuple[str, ...] = (ACTION, DEVICE_TYPE, LOCATION)
+NGRAM_RANGE = (2, 4)
+DEFAULT_DIM = 2 ** 18
+# Метка "нет значения" для типа устройства и местоположения
+NONE_LABEL = ""
+
+WEIGHTS_FILE = "weights.npy"
+BIAS_FILE = "bias.npy"
+META_FILE = "meta.json"
+
+_CsrMatrix = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class HashingVectorizer:
+    """Разреженные tf-векторы символьных n-грамм с устойчивым хэшированием crc32"""
+    __slots__ = ("dim", "ngram_range")
+
+    def __init__(self, dim: int = DEFAULT_DIM, ngram_range: Tuple[int, int] = NGRAM_RANGE):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _features(self, text: str) -> Dict[int, float]:
+        padded = f" {text.lower()} "
+        counts: Dict[int, float] = {}
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for start in range(len(padded) - n + 1):
+                index = zlib.crc32(padded[start:start + n].encode("utf-8")) % self.dim
+                counts[index] = counts.get(index, 0.0) + 1.0
+        return counts
+
+    def transform(self, texts: Sequence[str]) -> _CsrMatrix:
+        """Возвращает матрицу в формате CSR: (indptr, indices, values)"""
+        indptr = [0]
+        indices: List[int] = []
+        values: List[float] = []
+        for text in texts:
+            counts = self._features(text)
+            norm = sum(v * v for v in counts.values()) ** 0.5 or 1.0
+            indices.extend(counts.keys())
+            values.extend(v / norm for v in counts.values())
+            indptr.append(len(indices))
+        return (
+            np.asarray(indptr, dtype=np.int64),
+            np.asarray(indices, dtype=np.int64),
+            np.asarray(values, dtype=np.float32),
+        )
+
+
+def sparse_dot(matrix: _CsrMatrix, weights: np.ndarray) -> np.ndarray:
+    """Произведение CSR-матрицы на плотную матрицу весов"""
+    indptr, indices, values = matrix
+    rows = len(indptr) - 1
+    out = np.zeros((rows, weights.shape[1]), dtype=np.float32)
+    nonempty = np.flatnonzero(np.diff(indptr))
+    if len(nonempty):
+        gathered = np.asarray(weights[indices], dtype=np.float32) * values[:, None]
+        out[nonempty] = np.add.reduceat(gathered, indptr[nonempty], axis=0)
+    return out
+
+
+class LinearIntentModel:
+    def __init__(
+        self,
+        weights: np.ndarray,
+        bias: np.ndarray,
+        labels: Dict[str, List[str]],
+        vectorizer: HashingVectorizer,
+        version: str
+    ):
+        self.weights = weights
+        self.bias = bias
+        self.labels = labels
+        self.vectorizer = vectorizer
+        self.version = version
+
+        self.slices: Dict[str, slice] = {}
+        offset = 0
+        for head in HEADS:
+            self.slices[head] = slice(offset, offset + len(labels[head]))
+            offset += len(labels[head])
+
+    @classmethod
+    def load(cls, directory: str) -> "LinearIntentModel":
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            weights=np.load(os.path.join(directory, WEIGHTS_FILE), mmap_mode="r"),
+            bias=np.load(os.path.join(directory, BIAS_FILE)),
+            labels=meta["labels"],
+            vectorizer=HashingVectorizer(meta["dim"], tuple(meta["ngram_range"])),
+            version=meta["version"]
+        )
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, WEIGHTS_FILE), np.asarray(self.weights, dtype=np.float32))
+        np.save(os.path.join(directory, BIAS_FILE), np.asarray(self.bias, dtype=np.float32))
+        with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": self.version,
+                "dim": self.vectorizer.dim,
+                "ngram_range": list(self.vectorizer.ngram_range),
+                "labels": self.labels,
+            }, f, ensure_ascii=False)
+
+    def scores(self, texts: Sequence[str]) -> np.ndarray:
+        return sparse_dot(self.vectorizer.transform(texts), self.weights) + self.bias
+
+    def predict(self, texts: Sequence[str]) -> List[Dict[str, Optional[str]]]:
+        scores = self.scores(texts)
+        predictions: List[Dict[str, Optional[str]]] = [{} for _ in texts]
+        for head in HEADS:
+            best = scores[:, self.slices[head]].argmax(axis=1)
+            labels = self.labels[head]
+            for row, index in enumerate(best):
+                predictions[row][head] = labels[index] or None
+        return predictions
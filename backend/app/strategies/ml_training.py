@@ -0,0 +1,156 @@
+"""
+Обучение линейной модели намерений по истории команд
+
+Метки действия берутся из commands.action, тип устройства и местоположение -
+из связанного устройства. Для команд без устройства эти метки восполняются
+статистической стратегией (слабая разметка).
+
+Запуск: python -m app.strategies.ml_training --output data/model
+"""
+
+import argparse
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models import Command, Device
+from app.strategies.analysis_strategy import StatisticalAnalysisStrategy
+from app.strategies.lexicon import ACTION, DEVICE_TYPE, LOCATION
+from app.strategies.ml_model import (
+    DEFAULT_DIM, HEADS, NONE_LABEL, HashingVectorizer, LinearIntentModel, sparse_dot
+)
+
+_Targets = Dict[str, List[Optional[str]]]
+
+
+def load_training_data(db: Session, limit: Optional[int] = None) -> Tuple[List[str], _Targets]:
+    statistical = StatisticalAnalysisStrategy()
+    query = db.query(
+        Command.command_text, Command.action, Device.device_type, Device.location
+    ).outerjoin(Device, Command.device_id == Device.id).filter(
+        Command.action.isnot(None)
+    ).order_by(Command.id.desc())
+    if limit:
+        query = query.limit(limit)
+
+    texts: List[str] = []
+    targets: _Targets = {head: [] for head in HEADS}
+    for text, action, device_type, location in query.yield_per(1000):
+        weak = statistical.analyze_data([text])
+        if action == "emergency_stop":
+            action = weak.action if weak.action in ("stop", "pause") else "stop"
+        linked = device_type is not None
+        texts.append(text.lower())
+        targets[ACTION].append(action)
+        targets[DEVICE_TYPE].append(device_type if linked else weak.device_type)
+        targets[LOCATION].append(location if linked else weak.location)
+    return texts, targets
+
+
+def _empty_label(head: str) -> str:
+    return "unknown" if head == ACTION else NONE_LABEL
+
+
+def _sparse_gradient(matrix, gradient: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """X^T @ gradient только по затронутым строкам весов"""
+    indptr, indices, values = matrix
+    row_of_entry = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    touched, inverse = np.unique(indices, return_inverse=True)
+    update = np.zeros((len(touched), gradient.shape[1]), dtype=np.float32)
+    np.add.at(update, inverse, gradient[row_of_entry] * values[:, None])
+    return touched, update
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    shifted = np.exp(scores - scores.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+def _stack_rows(rows: Sequence[Tuple[np.ndarray, np.ndarray]]):
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(indices) for indices, _ in rows])
+    return (
+        indptr,
+        np.concatenate([indices for indices, _ in rows]),
+        np.concatenate([values for _, values in rows]),
+    )
+
+
+def train_model(
+    texts: Sequence[str],
+    targets: _Targets,
+    dim: int = DEFAULT_DIM,
+    epochs: int = 20,
+    learning_rate: float = 2.0,
+    batch_size: int = 256,
+    seed: int = 0
+) -> LinearIntentModel:
+    """Мультиномиальная логистическая регрессия для каждой головы, мини-пакетный SGD"""
+    labels = {
+        head: sorted({label or _empty_label(head) for label in targets[head]} | {_empty_label(head)})
+        for head in HEADS
+    }
+    vectorizer = HashingVectorizer(dim)
+    indptr, indices, values = vectorizer.transform(texts)
+    rows = [(indices[indptr[i]:indptr[i + 1]], values[indptr[i]:indptr[i + 1]]) for i in range(len(texts))]
+
+    model = LinearIntentModel(
+        weights=np.zeros((dim, sum(len(labels[head]) for head in HEADS)), dtype=np.float32),
+        bias=np.zeros(sum(len(labels[head]) for head in HEADS), dtype=np.float32),
+        labels=labels,
+        vectorizer=vectorizer,
+        version=f"{time.strftime('%Y%m%d%H%M%S')}-{len(texts)}"
+    )
+
+    targets_matrix = np.zeros((len(texts), model.bias.shape[0]), dtype=np.float32)
+    for head in HEADS:
+        positions = {label: model.slices[head].start + i for i, label in enumerate(labels[head])}
+        for row, label in enumerate(targets[head]):
+            targets_matrix[row, positions[label or _empty_label(head)]] = 1.0
+
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        order = rng.permutation(len(texts))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            matrix = _stack_rows([rows[i] for i in batch])
+            scores = sparse_dot(matrix, model.weights) + model.bias
+            gradient = np.empty_like(scores)
+            for head in HEADS:
+                part = model.slices[head]
+                gradient[:, part] = _softmax(scores[:, part]) - targets_matrix[batch, part]
+            gradient /= len(batch)
+            touched, update = _sparse_gradient(matrix, gradient)
+            model.weights[touched] -= learning_rate * update
+            model.bias -= learning_rate * gradient.sum(axis=0)
+    return model
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+    from app.strategies.analysis_strategy import ML_MODEL_DIR
+
+    parser = argparse.ArgumentParser(description="Обучение модели намерений по истории команд")
+    parser.add_argument("--output", default=ML_MODEL_DIR)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--epochs", type=int, default=20)
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        texts, targets = load_training_data(session, args.limit)
+    if not texts:
+        raise SystemExit("No commands to train on")
+
+    model = train_model(texts, targets, dim=args.dim, epochs=args.epochs)
+    model.save(args.output)
+    predictions = model.predict(texts)
+    for head in HEADS:
+        accuracy = np.mean([
+            (p[head] or _empty_label(head)) == (t or _empty_label(head))
+            for p, t in zip(predictions, targets[head])
+        ])
+        print(f"{head}: train accuracy {accuracy:.3f}")
+    print(f"Saved model {model.version} ({len(texts)} commands) to {args.output}")
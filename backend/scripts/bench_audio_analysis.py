@@ -0,0 +1,60 @@
+"""
+Пропускная способность анализа сигнала (analyze_wav)
+
+Генерирует WAV-файлы (16 кГц, моно, 16 бит: тон с шумом и паузами)
+длительностью --seconds и измеряет процессорное время анализа.
+Результат - секунды аудио на секунду процессорного времени одного ядра
+
+    python -m scripts.bench_audio_analysis --seconds 10 60 600
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from app.services.audio_analysis import analyze_wav
+
+
+def write_wav(path: str, seconds: float, sample_rate: int, rng: np.random.Generator) -> None:
+    frames = int(seconds * sample_rate)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        # Пишется кусками по минуте, чтобы не держать в памяти весь сигнал
+        chunk = sample_rate * 60
+        for start in range(0, frames, chunk):
+            t = np.arange(start, min(start + chunk, frames)) / sample_rate
+            speech = (np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.5 * t) > 0)) * 0.5
+            signal = speech + rng.normal(0, 0.01, t.size)
+            wav.writeframes((np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пропускная способность analyze_wav")
+    parser.add_argument("--seconds", nargs="+", type=float, default=[10, 60, 600])
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    print(f"{'audio s':>9}{'cpu ms':>10}{'audio s / core s':>18}")
+    with tempfile.TemporaryDirectory(prefix="bench-audio-") as directory:
+        for seconds in args.seconds:
+            path = os.path.join(directory, f"{seconds:g}.wav")
+            write_wav(path, seconds, args.sample_rate, rng)
+            analyze_wav(path)  # прогрев: кэш страниц и импорт numpy
+            started = time.process_time()
+            for _ in range(args.repeat):
+                stats = analyze_wav(path)
+            cpu = (time.process_time() - started) / args.repeat
+            assert abs(stats.duration - seconds) < 0.01
+            print(f"{seconds:>9g}{cpu * 1000:>10.1f}{seconds / cpu:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
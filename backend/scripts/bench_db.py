@@ -0,0 +1,85 @@
+"""
+База для бенчмарков
+
+По умолчанию - SQLite-файл во временном каталоге со схемой из моделей
+(commands без секционирования, как в тестах). SQLite допускает одного
+писателя, поэтому пулы к ней состоят из одного соединения: параллельные
+транзакции ждут его, а не блокировку файла. С --database-url бенчмарк
+работает с указанной базой PostgreSQL; схема в ней должна быть создана
+миграциями (alembic upgrade head)
+"""
+
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import MetaData, PrimaryKeyConstraint, create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app import models
+from app.database import Base
+
+DEVICE_TYPES = ("light", "tv", "ac", "speaker", "curtains")
+LOCATIONS = ("гостиная", "спальня", "кухня", "ванная", "прихожая")
+
+
+@dataclass
+class BenchDatabase:
+    engine: Engine
+    async_engine: AsyncEngine
+    url: str
+
+    def session_factory(self) -> sessionmaker:
+        return sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+
+def _sqlite_metadata() -> MetaData:
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    commands = metadata.tables["commands"]
+    commands.c.created_at.primary_key = False
+    commands.primary_key = PrimaryKeyConstraint(commands.c.id)
+    return metadata
+
+
+def open_database(database_url: Optional[str] = None, pool_size: int = 5, max_overflow: int = 10) -> BenchDatabase:
+    pool = {"pool_size": pool_size, "max_overflow": max_overflow}
+    if database_url:
+        async_url = database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+        return BenchDatabase(
+            create_engine(database_url, **pool),
+            create_async_engine(async_url, **pool),
+            database_url
+        )
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.sqlite")
+    pool = {"pool_size": 1, "max_overflow": 0, "pool_timeout": 600}
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}, **pool)
+    _sqlite_metadata().create_all(engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool, **pool)
+    return BenchDatabase(engine, async_engine, f"sqlite:///{path}")
+
+
+def seed_user(db: BenchDatabase, devices: int = 10, username: str = "bench") -> int:
+    """Пользователь с devices устройствами по кругу типов и комнат; возвращает id"""
+    with db.session_factory()() as session:
+        user = models.User(username=username, email=f"{username}@example.com")
+        session.add(user)
+        session.commit()
+        session.add_all([
+            models.Device(
+                name=f"Устройство {index}",
+                device_type=DEVICE_TYPES[index % len(DEVICE_TYPES)],
+                location=LOCATIONS[index // len(DEVICE_TYPES) % len(LOCATIONS)],
+                owner_id=user.id,
+                is_active=True,
+                is_on=False
+            )
+            for index in range(devices)
+        ])
+        session.commit()
+        return user.id
@@ -0,0 +1,82 @@
+"""
+Параллельные переключения одного устройства
+
+  legacy - прежний toggle_device: SELECT, изменение в Python, commit, refresh
+           (версия увеличивается так же, в Python);
+  atomic - текущий путь routers.devices._conditional_update: один
+           UPDATE ... SET is_on = NOT is_on ... RETURNING.
+
+--workers задач выполняют по --toggles переключений. Потерянные
+переключения - разница между числом выполненных переключений и приростом
+version. На SQLite транзакции выполняются по одной (пул из одного
+соединения), поэтому потери видны только на PostgreSQL (--database-url)
+
+    python -m scripts.bench_device_toggle --workers 20 --toggles 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import func, not_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import models
+from app.routers.devices import _conditional_update
+from scripts.bench_db import open_database, seed_user
+
+
+async def legacy_toggle(db: AsyncSession, device_id: int) -> None:
+    device = await db.get(models.Device, device_id)
+    device.is_on = not device.is_on
+    device.version = device.version + 1
+    await db.commit()
+    await db.refresh(device)
+
+
+async def atomic_toggle(db: AsyncSession, device_id: int) -> None:
+    await _conditional_update(db, device_id, None, is_on=not_(func.coalesce(models.Device.is_on, False)))
+
+
+async def run_variant(database, toggle, device_id: int, workers: int, toggles: int):
+    session_factory = async_sessionmaker(database.async_engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as db:
+        before = (await db.get(models.Device, device_id)).version
+
+    async def worker() -> None:
+        for _ in range(toggles):
+            async with session_factory() as db:
+                await toggle(db, device_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    elapsed = time.perf_counter() - started
+
+    async with session_factory() as db:
+        after = (await db.get(models.Device, device_id)).version
+    await database.async_engine.dispose()
+    total = workers * toggles
+    return total / elapsed, total - (after - before)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Параллельные переключения устройства")
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--toggles", type=int, default=50)
+    parser.add_argument("--database-url", help="PostgreSQL вместо временной SQLite")
+    args = parser.parse_args()
+
+    database = open_database(args.database_url, pool_size=args.workers, max_overflow=0)
+    user_id = seed_user(database, devices=1, username=f"bench{int(time.time())}")
+    with database.session_factory()() as db:
+        device_id = db.query(models.Device.id).filter(models.Device.owner_id == user_id).scalar()
+
+    print(f"{args.workers} workers x {args.toggles} toggles, {database.url.split(':')[0]}")
+    print(f"{'variant':<10}{'toggles/s':>12}{'lost':>8}")
+    for name, toggle in (("legacy", legacy_toggle), ("atomic", atomic_toggle)):
+        rate, lost = asyncio.run(run_variant(database, toggle, device_id, args.workers, args.toggles))
+        print(f"{name:<10}{rate:>12.1f}{lost:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Бенчмарк нечеткого распознавания ключевых слов
+
+Корпус - команды "действие устройство в комнате" из словаря по умолчанию,
+в которых слова искажены случайными заменами, перестановками, пропусками
+и вставками букв (плюс типичные ошибки распознавания речи). Сравнивается
+доля полностью распознанных команд без нечеткого поиска и с ним, а также
+время поиска слова в индексе при росте словаря до --sizes слов
+
+    python -m scripts.bench_fuzzy_lexicon --utterances 2000
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.strategies.analysis_strategy import StatisticalAnalysisStrategy
+from app.strategies.fuzzy_lexicon import FuzzyLexicon
+from app.strategies.intent_matcher import CATEGORIES
+from app.strategies.lexicon import ACTION, DEFAULT_LEXICON, DEVICE_TYPE, LOCATION
+
+ALPHABET = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+# Ошибки браузерного распознавания речи из практики
+KNOWN_ERRORS: List[Tuple[str, Tuple[str, Optional[str], Optional[str]]]] = [
+    ("выключь телевизер в спальне", ("turn_off", "tv", "спальня")),
+    ("включи свет в гостинной", ("turn_on", "light", "гостиная")),
+    ("включи кондицонер на кухне", ("turn_on", "thermostat", "кухня")),
+]
+
+_Expected = Tuple[str, Optional[str], Optional[str]]
+
+
+def mangle(word: str, rng: random.Random) -> str:
+    """Одно случайное искажение слова (слова до 4 букв не искажаются)"""
+    if len(word) <= 4:
+        return word
+    index = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(("replace", "swap", "delete", "insert"))
+    if kind == "replace":
+        return word[:index] + rng.choice(ALPHABET) + word[index + 1:]
+    if kind == "swap":
+        return word[:index - 1] + word[index] + word[index - 1] + word[index + 1:]
+    if kind == "delete":
+        return word[:index] + word[index + 1:]
+    return word[:index] + rng.choice(ALPHABET) + word[index:]
+
+
+def noisy_corpus(size: int, rng: random.Random) -> List[Tuple[str, _Expected]]:
+    # Первое слово каждого значения: "телевизора" и "телевизор" дают одно и то же
+    first: Dict[str, Dict[str, str]] = {}
+    for category in CATEGORIES:
+        first[category] = {}
+        for keyword, value in DEFAULT_LEXICON[category].items():
+            first[category].setdefault(value, keyword)
+    corpus = list(KNOWN_ERRORS)
+    while len(corpus) < size:
+        action = rng.choice(list(first[ACTION].items()))
+        device = rng.choice(list(first[DEVICE_TYPE].items()))
+        location = rng.choice(list(first[LOCATION].items()))
+        words = [action[1], device[1], location[1]]
+        for position in rng.sample(range(3), rng.randint(1, 2)):
+            words[position] = mangle(words[position], rng)
+        corpus.append((f"{words[0]} {words[1]} в {words[2]}", (action[0], device[0], location[0])))
+    return corpus
+
+
+def accuracy(strategy: StatisticalAnalysisStrategy, corpus: List[Tuple[str, _Expected]]) -> Tuple[float, float]:
+    """Доля команд, распознанных полностью, и среднее время анализа, мкс"""
+    correct = 0
+    started = time.perf_counter()
+    for text, expected in corpus:
+        result = strategy.analyze_data([text])
+        correct += (result.action, result.device_type, result.location) == expected
+    elapsed = time.perf_counter() - started
+    return correct / len(corpus), elapsed / len(corpus) * 1e6
+
+
+def grow_lexicon(size: int, rng: random.Random) -> Dict[str, Dict[str, str]]:
+    lexicon = {category: dict(DEFAULT_LEXICON[category]) for category in CATEGORIES}
+    for category, words in lexicon.items():
+        while len(words) < size:
+            word = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(5, 12)))
+            words.setdefault(word, f"{category}_{len(words)}")
+    return lexicon
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нечеткий поиск ключевых слов: точность и задержка")
+    parser.add_argument("--utterances", type=int, default=2000)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[0, 1000, 10000])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = noisy_corpus(args.utterances, rng)
+    exact, exact_us = accuracy(StatisticalAnalysisStrategy(fuzzy=None), corpus)
+    fuzzy, fuzzy_us = accuracy(StatisticalAnalysisStrategy(), corpus)
+    print(f"{len(corpus)} noisy utterances")
+    print(f"  exact only:  {exact:6.1%} recognized, {exact_us:6.1f} us per utterance")
+    print(f"  with fuzzy:  {fuzzy:6.1%} recognized, {fuzzy_us:6.1f} us per utterance")
+
+    words = [word for text, _ in corpus for word in text.split()]
+    print(f"{'words/category':>15}{'build ms':>10}{'lookup us':>11}{'p99 us':>9}")
+    for size in args.sizes:
+        lexicon = grow_lexicon(size, rng)
+        started = time.perf_counter()
+        index = FuzzyLexicon(lexicon)
+        build_ms = (time.perf_counter() - started) * 1000
+        timings = []
+        for word in words:
+            started = time.perf_counter()
+            index.lookup(word)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        mean_us = sum(timings) / len(timings) * 1e6
+        p99_us = timings[int(len(timings) * 0.99)] * 1e6
+        size_words = max(len(lexicon[category]) for category in CATEGORIES)
+        print(f"{size_words:>15}{build_ms:>10.1f}{mean_us:>11.1f}{p99_us:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Микробенчмарк сопоставителя намерений
+
+Сравнивает IntentMatcher (автомат Ахо-Корасик) с прежним поиском
+`keyword in text` по каждому слову словаря. Словарь по умолчанию
+дополняется синтетическими словами до --sizes слов на категорию;
+результаты обоих способов сверяются
+
+    python -m scripts.bench_intent_matcher --sizes 0 100 1000 5000
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.strategies.intent_matcher import CATEGORIES, IntentMatcher
+from app.strategies.lexicon import DEFAULT_LEXICON
+
+ALPHABET = "абвгдежзиклмнопрстуфхцчшэюя"
+UTTERANCES = (
+    "включи свет в гостиной",
+    "выключи телевизор в спальне",
+    "пожалуйста сделай потише музыку",
+    "закрой замок в коридоре",
+    "стоп",
+    "какая сегодня погода на улице",
+)
+
+
+def grow_lexicon(size: int, rng: random.Random) -> Dict[str, Dict[str, str]]:
+    """Словарь по умолчанию плюс случайные слова (6-12 букв) до size в категории"""
+    lexicon = {category: dict(DEFAULT_LEXICON.get(category, {})) for category in CATEGORIES}
+    for category, words in lexicon.items():
+        while len(words) < size:
+            word = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(6, 12)))
+            words.setdefault(word, f"{category}_{len(words)}")
+    return lexicon
+
+
+def legacy_match(lexicon: Dict[str, Dict[str, str]], text: str) -> Tuple[Optional[str], ...]:
+    """Прежний алгоритм StatisticalAnalysisStrategy: первое вхождение в порядке словаря"""
+    found = []
+    for category in CATEGORIES:
+        value = None
+        for keyword, candidate in lexicon[category].items():
+            if keyword in text:
+                value = candidate
+                break
+        found.append(value)
+    return tuple(found)
+
+
+def per_call_us(function: Callable[[str], object], texts: List[str], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            function(text)
+    return (time.perf_counter() - started) / (repeat * len(texts)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сопоставитель намерений против поиска подстрок")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[0, 100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'words/category':>15}{'build ms':>10}{'loop us':>10}{'matcher us':>12}{'speedup':>9}")
+    for size in args.sizes:
+        lexicon = grow_lexicon(size, rng)
+        started = time.perf_counter()
+        matcher = IntentMatcher(lexicon)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        texts = list(UTTERANCES)
+        for text in texts:
+            match = matcher.match(text)
+            assert (match.action, match.device_type, match.location) == legacy_match(lexicon, text), text
+
+        loop = per_call_us(lambda text: legacy_match(lexicon, text), texts, args.repeat)
+        compiled = per_call_us(matcher.match, texts, args.repeat)
+        words = max(len(lexicon[category]) for category in CATEGORIES)
+        print(f"{words:>15}{build_ms:>10.1f}{loop:>10.1f}{compiled:>12.1f}{loop / compiled:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
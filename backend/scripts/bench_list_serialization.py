@@ -0,0 +1,113 @@
+"""
+Бенчмарк выдачи списка устройств
+
+  legacy - прежний get_devices: ORM-объекты, проверка response_model
+           и стандартный JSON-кодировщик FastAPI;
+  fast   - текущий путь: выборка столбцов, DeviceListAdapter и orjson.
+
+Запросы выполняются через ASGI-транспорт httpx и включают чтение из базы.
+Отдельно измеряется только сериализация уже загруженных строк
+
+    python -m scripts.bench_list_serialization --rows 1000 10000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+import httpx
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.services.fast_json import list_response, row_columns
+from scripts.bench_db import open_database, seed_user
+
+LegacyAdapter = TypeAdapter(List[schemas.DeviceResponse])
+
+
+def build_app(database) -> FastAPI:
+    session_factory = database.session_factory()
+
+    def bench_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/legacy", response_model=list[schemas.DeviceResponse])
+    def legacy(user_id: int, limit: int, db: Session = Depends(bench_db)):
+        return db.query(models.Device).filter(models.Device.owner_id == user_id).limit(limit).all()
+
+    @app.get("/fast", response_model=list[schemas.DeviceResponse])
+    def fast(user_id: int, limit: int, db: Session = Depends(bench_db)):
+        rows = db.execute(
+            select(*row_columns(models.Device, schemas.DeviceResponse))
+            .where(models.Device.owner_id == user_id).limit(limit)
+        ).mappings()
+        return list_response(schemas.DeviceListAdapter, rows)
+
+    return app
+
+
+async def request_ms(app: FastAPI, path: str, params: dict, repeat: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        (await client.get(path, params=params)).raise_for_status()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            (await client.get(path, params=params)).raise_for_status()
+        return (time.perf_counter() - started) / repeat * 1000
+
+
+def serialization_ms(database, user_id: int, rows: int, repeat: int) -> tuple:
+    with database.session_factory()() as db:
+        devices = db.query(models.Device).filter(models.Device.owner_id == user_id).limit(rows).all()
+        mappings = db.execute(
+            select(*row_columns(models.Device, schemas.DeviceResponse))
+            .where(models.Device.owner_id == user_id).limit(rows)
+        ).mappings().all()
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        # Как serialize_response FastAPI: проверка по response_model и dump в режиме json
+        validated = LegacyAdapter.validate_python(devices, from_attributes=True)
+        JSONResponse(LegacyAdapter.dump_python(validated, mode="json"))
+    legacy = (time.perf_counter() - started) / repeat * 1000
+    started = time.perf_counter()
+    for _ in range(repeat):
+        list_response(schemas.DeviceListAdapter, mappings)
+    fast = (time.perf_counter() - started) / repeat * 1000
+    return legacy, fast
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Выдача списка устройств: ORM и response_model против orjson")
+    parser.add_argument("--rows", nargs="+", type=int, default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", help="PostgreSQL вместо временной SQLite")
+    args = parser.parse_args()
+
+    database = open_database(args.database_url)
+    user_id = seed_user(database, devices=max(args.rows), username=f"bench{int(time.time())}")
+    app = build_app(database)
+
+    print(f"mean of {args.repeat}, {database.url.split(':')[0]}")
+    print(f"{'rows':>7}{'legacy ms':>11}{'fast ms':>9}{'encode legacy':>15}{'encode fast':>13}")
+    for rows in args.rows:
+        params = {"user_id": user_id, "limit": rows}
+        legacy = asyncio.run(request_ms(app, "/legacy", params, args.repeat))
+        fast = asyncio.run(request_ms(app, "/fast", params, args.repeat))
+        encode_legacy, encode_fast = serialization_ms(database, user_id, rows, args.repeat)
+        print(f"{rows:>7}{legacy:>11.1f}{fast:>9.1f}{encode_legacy:>15.1f}{encode_fast:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Нагрузочное сравнение обработки голосовых команд на одном процессе
+
+Варианты POST /api/voice/process/:
+  sync       - прежний обработчик def: синхронный конвейер в пуле потоков;
+  threadpool - async def, тот же синхронный конвейер через run_in_threadpool;
+  async      - текущий обработчик: асинхронная сессия, в пул потоков
+               передается только анализ текста.
+
+Все --connections запросов отправляются одновременно через ASGI-транспорт
+httpx; тексты команд различаются, чтобы анализ не отвечал из кэша.
+Параллельно каждые 10 мс опрашивается GET /health: его задержка показывает,
+насколько занят цикл событий
+
+    python -m scripts.bench_voice_load --connections 500
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+from fastapi import Depends, FastAPI
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.controllers.analysis_controller import AnalysisController
+from app.controllers.decision_controller import DecisionController
+from app.controllers.request_controller import RequestController
+from app.controllers.response_controller import response_formatter
+from app.database import get_async_db
+from app.routers import voice
+from app.services.user_matchers import user_matchers
+from scripts.bench_db import open_database, seed_user
+
+TEXTS = ("включи свет в гостиной", "выключи телевизор в спальне", "включи кондиционер на кухне")
+
+
+def sync_pipeline(db: Session, request: schemas.VoiceCommandRequest, user_id: int) -> schemas.VoiceCommandResponse:
+    """Прежний конвейер на синхронной сессии (без сценариев)"""
+    profile = user_matchers.get_profile(db, user_id)
+    request_obj = RequestController(db, unit_of_work=True).form_request(request.text, user_id)
+    analysis = AnalysisController(db, voice.analysis_strategy.with_matcher(profile.matcher))
+    decision = DecisionController(db, unit_of_work=True).form_decision(
+        analysis.conduct_analysis(request_obj), user_id
+    )
+    response = response_formatter.form_response(decision)
+    db.commit()
+    return response
+
+
+def build_app(database) -> FastAPI:
+    session_factory = database.session_factory()
+    async_session_factory = async_sessionmaker(
+        database.async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+    def bench_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def bench_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(voice.router, prefix="/async")
+    app.dependency_overrides[get_async_db] = bench_async_db
+
+    @app.post("/sync/process/")
+    def process_sync(request: schemas.VoiceCommandRequest, user_id: int = 1, db: Session = Depends(bench_db)):
+        return sync_pipeline(db, request, user_id)
+
+    @app.post("/threadpool/process/")
+    async def process_threadpool(
+        request: schemas.VoiceCommandRequest,
+        user_id: int = 1,
+        db: Session = Depends(bench_db)
+    ):
+        return await run_in_threadpool(sync_pipeline, db, request, user_id)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_variant(app: FastAPI, database, variant: str, user_id: int, connections: int) -> Dict[str, float]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=None) as client:
+        done = asyncio.Event()
+        probes: List[float] = []
+
+        async def probe() -> None:
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/health")
+                probes.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        async def command(index: int) -> float:
+            text = f"{TEXTS[index % len(TEXTS)]} {index}"
+            started = time.perf_counter()
+            response = await client.post(f"/{variant}/process/", params={"user_id": user_id}, json={"text": text})
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+        prober = asyncio.create_task(probe())
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(command(index) for index in range(connections)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await prober
+    # Соединения асинхронного пула привязаны к циклу событий этого прогона
+    await database.async_engine.dispose()
+
+    return {
+        "rps": connections / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "health_p95_ms": percentile(probes, 0.95) * 1000 if probes else 0.0,
+        "health_max_ms": max(probes) * 1000 if probes else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочное сравнение обработчиков голосовых команд")
+    parser.add_argument("--connections", type=int, default=500)
+    parser.add_argument("--variants", nargs="+", default=["sync", "threadpool", "async"])
+    parser.add_argument("--database-url", help="PostgreSQL вместо временной SQLite")
+    parser.add_argument("--pool-size", type=int, default=20)
+    args = parser.parse_args()
+
+    database = open_database(args.database_url, pool_size=args.pool_size, max_overflow=args.pool_size)
+    user_id = seed_user(database, devices=15, username=f"bench{int(time.time())}")
+    app = build_app(database)
+
+    print(f"{args.connections} concurrent requests, {database.url.split(':')[0]}")
+    print(f"{'variant':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'health p95':>12}{'health max':>12}")
+    for variant in args.variants:
+        result = asyncio.run(run_variant(app, database, variant, user_id, args.connections))
+        print(
+            f"{variant:<12}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+            f"{result['health_p95_ms']:>12.1f}{result['health_max_ms']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
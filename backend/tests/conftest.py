@@ -0,0 +1,149 @@
+"""
+Общие фикстуры тестов
+
+Большая часть тестов работает на SQLite-файле во временном каталоге:
+синхронный и асинхронный (aiosqlite) движки открывают один и тот же файл.
+Тесты с маркером postgresql выполняются на отдельной пустой базе из
+TEST_DATABASE_URL (миграции применяются к ней при первом обращении),
+без этой переменной они пропускаются
+"""
+
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import MetaData, PrimaryKeyConstraint, create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base, get_async_db, get_db
+from app.main import app
+from app.services.device_registry import device_registry
+from app.services.emergency_lane import emergency_lane
+from app.services.settings_cache import settings_cache
+from app.services.user_matchers import user_matchers
+from app.strategies.analysis_cache import analysis_cache
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def _sqlite_metadata() -> MetaData:
+    """
+    Копия схемы для SQLite: секционирования там нет, а автоинкремент
+    возможен только в первичном ключе из одного столбца, поэтому
+    commands получает ключ по id
+    """
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    commands = metadata.tables["commands"]
+    commands.c.created_at.primary_key = False
+    commands.primary_key = PrimaryKeyConstraint(commands.c.id)
+    return metadata
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    return tmp_path / "test.sqlite"
+
+
+@pytest.fixture
+def engine(sqlite_path):
+    engine = create_engine(f"sqlite:///{sqlite_path}", connect_args={"check_same_thread": False})
+    _sqlite_metadata().create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def async_engine(engine, sqlite_path):
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{sqlite_path}")
+    yield async_engine
+    # Пул aiosqlite закрывается вместе с процессом: dispose требует цикла событий
+
+
+@pytest.fixture
+def seed(session_factory):
+    """Пользователь 1 с люстрой в гостиной (id 1) и телевизором в спальне (id 2)"""
+    with session_factory() as db:
+        user = models.User(username="user", email="user@example.com")
+        db.add(user)
+        db.commit()
+        db.add_all([
+            models.Device(name="Люстра", device_type="light", location="гостиная",
+                          owner_id=user.id, is_active=True, is_on=False),
+            models.Device(name="ТВ", device_type="tv", location="спальня",
+                          owner_id=user.id, is_active=True, is_on=True),
+        ])
+        db.commit()
+        return user.id
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Кэши процесса не переносят состояние между тестами"""
+    for cache in (device_registry, user_matchers, settings_cache):
+        cache.invalidate()
+    analysis_cache.clear()
+    yield
+
+
+@pytest.fixture
+def client(session_factory, async_engine, seed, monkeypatch):
+    async_session_factory = async_sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+    def override_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_async_db] = override_async_db
+    monkeypatch.setattr(emergency_lane, "engine", async_engine)
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    """Движок тестовой базы PostgreSQL со схемой после всех миграций"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from alembic import command
+    from alembic.config import Config
+
+    engine = create_engine(TEST_DATABASE_URL)
+    try:
+        engine.connect().close()
+    except Exception as error:
+        pytest.skip(f"PostgreSQL is not available: {error}")
+
+    # alembic/env.py берет адрес базы из DATABASE_URL
+    previous = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    try:
+        config = Config(os.path.join(os.path.dirname(__file__), "..", "alembic.ini"))
+        config.set_main_option("script_location", os.path.join(os.path.dirname(__file__), "..", "alembic"))
+        command.upgrade(config, "head")
+    finally:
+        if previous is None:
+            os.environ.pop("DATABASE_URL", None)
+        else:
+            os.environ["DATABASE_URL"] = previous
+    yield engine
+    engine.dispose()
@@ -0,0 +1,34 @@
+from app.strategies.analysis_cache import AnalysisCache, CachedAnalysisStrategy
+from app.strategies.analysis_strategy import StatisticalAnalysisStrategy
+from app.strategies.intent_matcher import IntentMatcher
+from app.strategies.lexicon import merge_custom_keywords
+
+
+def _strategy():
+    matcher = IntentMatcher(merge_custom_keywords(["детская", "в детской=детская"]))
+    return CachedAnalysisStrategy(StatisticalAnalysisStrategy(matcher), AnalysisCache())
+
+
+def test_first_variant_does_not_decide_for_the_others():
+    strategy = _strategy()
+
+    # Двойной пробел разрывает фразу "в детской" в исходном тексте
+    first = strategy.analyze_data(["Включи свет в  детской!"])
+    second = strategy.analyze_data(["включи свет в детской"])
+
+    assert first.location == second.location == "детская"
+    assert first.recognized_text == "включи свет в  детской!"
+    assert second.recognized_text == "включи свет в детской"
+    assert strategy.cache.stats()["hits"] == 1
+
+
+def test_batch_analyzes_each_phrase_once():
+    strategy = _strategy()
+
+    results = strategy.analyze_batch(["Включи свет в  детской!", "включи свет в детской", "стоп"])
+
+    assert [result.location for result in results] == ["детская", "детская", None]
+    assert [result.recognized_text for result in results] == [
+        "включи свет в  детской!", "включи свет в детской", "стоп"
+    ]
+    assert strategy.cache.stats()["size"] == 2
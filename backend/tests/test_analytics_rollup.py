@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import Command, CommandRollup, RollupGap, User
+from app.services.analytics_rollup import WATERMARK_NAME, compact
+from app.services.command_partitions import ensure_partitions
+
+
+def _compact(pg_engine, **options):
+    with Session(pg_engine) as db:
+        return compact(db, lag_seconds=0, **options)
+
+
+def _user(conn, username):
+    return conn.scalar(insert(User).values(username=username, email=f"{username}@example.com").returning(User.id))
+
+
+def _command(conn, user_id, created_at):
+    return conn.scalar(insert(Command).values(
+        user_id=user_id, command_text="включи свет", action="turn_on", status="executed", created_at=created_at
+    ).returning(Command.id))
+
+
+def _rolled_up(pg_engine, user_id):
+    with pg_engine.connect() as conn:
+        return conn.scalar(select(func.coalesce(func.sum(CommandRollup.count), 0)).where(
+            CommandRollup.user_id == user_id
+        ))
+
+
+def _gaps(pg_engine, *command_ids):
+    with pg_engine.connect() as conn:
+        return set(conn.scalars(select(RollupGap.command_id).where(
+            RollupGap.name == WATERMARK_NAME, RollupGap.command_id.in_(command_ids)
+        )))
+
+
+@pytest.fixture
+def rollup_user(pg_engine):
+    now = datetime.now(timezone.utc)
+    ensure_partitions(pg_engine, now, ahead=1)
+    with pg_engine.begin() as conn:
+        user_id = _user(conn, f"rollup{now.timestamp():.0f}")
+    # Отметка догоняет команды других тестов
+    _compact(pg_engine)
+    yield user_id
+    with pg_engine.begin() as conn:
+        conn.execute(CommandRollup.__table__.delete().where(CommandRollup.user_id == user_id))
+        conn.execute(Command.__table__.delete().where(Command.user_id == user_id))
+        conn.execute(User.__table__.delete().where(User.id == user_id))
+
+
+@pytest.mark.postgresql
+def test_command_committed_behind_watermark_is_counted_once(pg_engine, rollup_user):
+    now = datetime.now(timezone.utc)
+    with pg_engine.connect() as long_conn:
+        long_transaction = long_conn.begin()
+        # id выдан раньше, created_at раньше, фиксация позже
+        late_id = _command(long_conn, rollup_user, now - timedelta(minutes=10))
+        with pg_engine.begin() as conn:
+            _command(conn, rollup_user, now - timedelta(seconds=1))
+
+        assert _compact(pg_engine) == 1
+        assert _gaps(pg_engine, late_id) == {late_id}
+        long_transaction.commit()
+
+    assert _compact(pg_engine) == 1
+    assert _compact(pg_engine) == 0
+    assert _rolled_up(pg_engine, rollup_user) == 2
+    assert _gaps(pg_engine, late_id) == set()
+
+
+@pytest.mark.postgresql
+def test_gap_of_rolled_back_command_expires(pg_engine, rollup_user):
+    now = datetime.now(timezone.utc)
+    with pg_engine.connect() as conn:
+        with conn.begin() as transaction:
+            lost_id = _command(conn, rollup_user, now)
+            transaction.rollback()
+    with pg_engine.begin() as conn:
+        _command(conn, rollup_user, now)
+
+    assert _compact(pg_engine) == 1
+    assert _gaps(pg_engine, lost_id) == {lost_id}
+    assert _compact(pg_engine, gap_ttl=0) == 0
+    assert _gaps(pg_engine, lost_id) == set()
+    assert _rolled_up(pg_engine, rollup_user) == 1
@@ -0,0 +1,58 @@
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from app import models
+from app.services.audio_analysis import read_wav_layout
+from app.services.audio_worker import AudioWorker, _analyze_job
+
+
+def _write_wav(path, seconds=0.5, sample_rate=16000):
+    samples = (np.sin(np.arange(int(seconds * sample_rate)) / 10) * 10000).astype("<i2")
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+
+
+@pytest.mark.parametrize("content", [b"", b"RIFF", b"RIFF\x00\x00\x00\x00WAVEfmt \x10\x00\x00\x00\x01"])
+def test_truncated_header_raises_value_error(tmp_path, content):
+    path = tmp_path / "broken.wav"
+    path.write_bytes(content)
+    with pytest.raises(ValueError):
+        read_wav_layout(str(path))
+
+
+def test_analyze_job_reports_failure_instead_of_raising(tmp_path):
+    path = tmp_path / "empty.wav"
+    path.write_bytes(b"")
+    audio_id, stats, _ = _analyze_job((7, str(path)))
+    assert (audio_id, stats) == (7, None)
+
+
+def test_bad_file_does_not_block_the_batch(tmp_path, session_factory, seed):
+    good, empty = tmp_path / "good.wav", tmp_path / "empty.wav"
+    _write_wav(good)
+    empty.write_bytes(b"")
+    with session_factory() as db:
+        db.add_all([
+            models.AudioData(user_id=seed, file_path=str(empty), processed=False),
+            models.AudioData(user_id=seed, file_path=str(good), processed=False),
+        ])
+        db.commit()
+
+    worker = AudioWorker(session_factory, processes=1, batch_size=10)
+    try:
+        assert worker.run_once() == 2
+        assert worker.run_once() == 0
+    finally:
+        worker.shutdown_pool()
+
+    with session_factory() as db:
+        rows = {row.file_path: row for row in db.query(models.AudioData)}
+    assert rows[str(empty)].processed and rows[str(empty)].duration is None
+    assert rows[str(good)].processed and rows[str(good)].duration == pytest.approx(0.5)
+    assert worker.metrics.jobs_failed == 1
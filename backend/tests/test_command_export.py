@@ -0,0 +1,74 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from app import models
+from app.routers import commands
+from app.services.command_export import export_commands
+
+
+@pytest.fixture
+def history(session_factory, seed, monkeypatch):
+    """Команды за январь, февраль и март; выгрузка открывает сессии тестовой базы"""
+    monkeypatch.setattr(commands, "SessionLocal", session_factory)
+    with session_factory() as db:
+        db.add_all([
+            models.Command(user_id=seed, command_text=text, action=action, status=status,
+                           created_at=datetime(2026, month, 10))
+            for month, text, action, status in (
+                (1, "включи свет", "turn_on", "executed"),
+                (2, "выключи, пожалуйста, \"всё\"", "turn_off", "failed"),
+                (3, "выключи телевизор", "turn_off", "executed"),
+            )
+        ])
+        db.commit()
+    return seed
+
+
+def test_ndjson_export_streams_all_commands(client, history):
+    response = client.get("/api/commands/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [1, 2, 3]
+    assert rows[1]["command_text"] == "выключи, пожалуйста, \"всё\""
+    assert rows[0]["created_at"].startswith("2026-01-10T00:00:00")
+
+
+def test_csv_export_applies_status_and_date_filters(client, history):
+    response = client.get("/api/commands/export", params={
+        "format": "csv", "status": "executed", "date_from": "2026-02-01T00:00:00"
+    })
+
+    assert response.status_code == 200
+    assert 'filename="commands.csv"' in response.headers["content-disposition"]
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header[:3] == ["id", "user_id", "device_id"]
+    assert [(row[0], row[6]) for row in rows] == [("3", "executed")]
+
+
+def test_date_to_is_exclusive_and_range_is_validated(client, history):
+    response = client.get("/api/commands/export", params={
+        "date_from": "2026-01-10T00:00:00", "date_to": "2026-03-10T00:00:00"
+    })
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [1, 2]
+
+    invalid = client.get("/api/commands/export", params={
+        "date_from": "2026-03-01T00:00:00", "date_to": "2026-02-01T00:00:00"
+    })
+    assert invalid.status_code == 400
+
+
+def test_gzip_export_matches_plain_export(client, session_factory, history):
+    response = client.get("/api/commands/export", params={"format": "csv", "gzip": True})
+    assert response.headers["content-encoding"] == "gzip"
+
+    compressed = b"".join(export_commands(session_factory, "csv", compress=True, chunk_size=1))
+    plain = b"".join(export_commands(session_factory, "csv", chunk_size=1))
+    assert gzip.decompress(compressed) == plain
+    assert response.content == plain
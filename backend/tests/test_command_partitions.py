@@ -0,0 +1,98 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Set
+
+import pytest
+from sqlalchemy import insert, select, text, tuple_
+from sqlalchemy.dialects import postgresql
+
+from app.models import Command, User
+from app.services.command_partitions import (
+    _create_partition, add_months, archive_detached, attached_partitions, detach_expired,
+    ensure_partitions, month_start, partition_month, partition_name
+)
+
+NOW = datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+
+
+def test_month_helpers():
+    assert month_start(NOW) == datetime(2026, 10, 1, tzinfo=timezone.utc)
+    assert add_months(month_start(NOW), 3) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+    assert add_months(month_start(NOW), -10) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert partition_name(month_start(NOW)) == "commands_p202610"
+    assert partition_month("commands_p202610") == month_start(NOW)
+    assert partition_month("commands_default") is None
+
+
+def _scanned_partitions(conn, statement) -> Set[str]:
+    sql = str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    raw = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    plan = raw if isinstance(raw, list) else json.loads(raw)
+    relations, pending = set(), [plan[0]["Plan"]]
+    while pending:
+        node = pending.pop()
+        if "Relation Name" in node:
+            relations.add(node["Relation Name"])
+        pending.extend(node.get("Plans", []))
+    return relations
+
+
+@pytest.mark.postgresql
+def test_month_filter_prunes_to_one_partition(pg_engine):
+    ensure_partitions(pg_engine, NOW, ahead=2)
+    current = month_start(NOW)
+    statement = select(Command).where(
+        Command.user_id == 1,
+        Command.created_at >= current,
+        Command.created_at < add_months(current, 1)
+    )
+    with pg_engine.connect() as conn:
+        assert _scanned_partitions(conn, statement) == {partition_name(current)}
+
+
+@pytest.mark.postgresql
+def test_history_cursor_skips_newer_partitions(pg_engine):
+    ensure_partitions(pg_engine, NOW, ahead=2)
+    # Запрос следующей страницы истории (routers/commands.get_commands)
+    statement = select(Command).where(
+        Command.user_id == 1,
+        Command.created_at <= NOW,
+        tuple_(Command.created_at, Command.id) < tuple_(NOW, 1000)
+    ).order_by(Command.created_at.desc(), Command.id.desc()).limit(100)
+    with pg_engine.connect() as conn:
+        scanned = _scanned_partitions(conn, statement)
+        attached = attached_partitions(conn)
+
+    newer = {name for name, month in attached.items() if month > month_start(NOW)}
+    assert newer and not scanned & newer
+    assert partition_name(month_start(NOW)) in scanned
+
+
+@pytest.mark.postgresql
+def test_expired_partition_is_detached_and_archived(pg_engine, tmp_path):
+    expired = datetime(2001, 1, 1, tzinfo=timezone.utc)
+    with pg_engine.begin() as conn:
+        _create_partition(conn, expired)
+        user_id = conn.scalar(insert(User).values(
+            username="partition-archive", email="partition-archive@example.com"
+        ).returning(User.id))
+        conn.execute(insert(Command).values(
+            user_id=user_id, command_text="включи свет", status="executed",
+            created_at=expired + timedelta(days=3)
+        ))
+
+    try:
+        assert partition_name(expired) in detach_expired(pg_engine, NOW, retention_months=12)
+        archived = archive_detached(pg_engine, str(tmp_path))
+    finally:
+        with pg_engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {partition_name(expired)}"))
+            conn.execute(User.__table__.delete().where(User.id == user_id))
+
+    assert archived == [str(tmp_path / f"{partition_name(expired)}.csv.gz")]
+    with gzip.open(archived[0], "rt", encoding="utf-8") as archive:
+        lines = archive.read().splitlines()
+    assert len(lines) == 2 and "включи свет" in lines[1]
+    with pg_engine.connect() as conn:
+        assert partition_name(expired) not in attached_partitions(conn)
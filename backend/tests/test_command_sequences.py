@@ -0,0 +1,83 @@
+from sqlalchemy import event
+
+from app import models
+from app.controllers.sequence_controller import SequenceController
+from app.services.command_sequences import parse_sequences
+
+GOOD_NIGHT = {
+    "name": "Спокойной ночи",
+    "steps": [
+        {"action": "turn_on", "device_type": "light"},
+        {"action": "turn_off", "device_type": "tv"},
+        {"action": "close", "device_type": "smart_lock", "location": "коридор"},
+    ],
+}
+
+
+def _setup(session_factory, user_id):
+    """Вторая лампа на кухне (id 3) и включенный замок в коридоре (id 4)"""
+    with session_factory() as db:
+        db.add_all([
+            models.Device(name="Лампа", device_type="light", location="кухня",
+                          owner_id=user_id, is_active=True, is_on=False),
+            models.Device(name="Замок", device_type="smart_lock", location="коридор",
+                          owner_id=user_id, is_active=True, is_on=True),
+            models.UserSettings(user_id=user_id, command_sequences=[GOOD_NIGHT]),
+        ])
+        db.commit()
+
+
+def _statements(engine):
+    """(executemany, SQL) каждого запроса к базе"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append((executemany, statement.split()[0].upper()))
+
+    event.listen(engine, "before_cursor_execute", record)
+    return executed
+
+
+def test_trigger_phrase_runs_one_update_and_one_batch_insert(client, async_engine, session_factory, seed):
+    _setup(session_factory, seed)
+    executed = _statements(async_engine.sync_engine)
+
+    response = client.post("/api/voice/process/", json={"text": "Спокойной ночи!"})
+
+    assert response.status_code == 200
+    assert response.json()["action"] == "command_sequence" and response.json()["status"] == "executed"
+    writes = [item for item in executed if item[1] in ("UPDATE", "INSERT")]
+    assert writes == [(False, "UPDATE"), (True, "INSERT")]
+
+
+def test_state_changes_apply_across_devices(client, session_factory, seed):
+    _setup(session_factory, seed)
+
+    client.post("/api/voice/process/", json={"text": "спокойной ночи"})
+
+    with session_factory() as db:
+        states = {device.id: (device.is_on, device.version) for device in db.query(models.Device)}
+        commands = db.query(models.Command.action, models.Command.device_id, models.Command.status).all()
+    assert states[1] == (True, 2) and states[3] == (True, 2)
+    assert states[2] == (False, 2)
+    assert sorted(commands, key=lambda command: (command.action, command.device_id)) == [
+        ("close", 4, "executed"),
+        ("turn_off", 2, "executed"),
+        ("turn_on", 1, "executed"),
+        ("turn_on", 3, "executed"),
+    ]
+
+
+def test_non_state_step_is_recorded_without_changing_the_device(session_factory, seed):
+    _setup(session_factory, seed)
+    (sequence,) = parse_sequences([{"name": "Закрой дверь", "steps": [GOOD_NIGHT["steps"][2]]}])
+
+    with session_factory() as db:
+        result = SequenceController(db).execute_sequence(sequence, seed, "закрой дверь")
+
+    assert result.devices == [(4, "Замок", "smart_lock", "коридор", True)]
+    assert [(command["action"], command["device_id"]) for command in result.commands] == [("close", 4)]
+    with session_factory() as db:
+        lock = db.get(models.Device, 4)
+        assert lock.is_on is True and lock.version == 1
+        assert db.query(models.Command).filter(models.Command.action == "close").count() == 1
@@ -0,0 +1,61 @@
+import time
+
+from app import models
+from app.services.device_registry import device_registry
+
+TV_COMMAND = {"text": "выключи телевизор в спальне"}
+
+
+def _prime(session_factory, user_id):
+    """Реестр процесса загружает устройства пользователя"""
+    with session_factory() as db:
+        assert device_registry.resolve(db, user_id, "tv", "спальня").id == 2
+
+
+def _other_process(session_factory, **changes):
+    """Изменение в базе в обход хуков реестра, как из другого процесса"""
+    with session_factory() as db:
+        device = db.get(models.Device, 2)
+        if changes:
+            for field, value in changes.items():
+                setattr(device, field, value)
+        else:
+            db.delete(device)
+        db.commit()
+
+
+def test_device_deleted_elsewhere_is_retried_not_500(client, session_factory, seed):
+    _prime(session_factory, seed)
+    _other_process(session_factory)
+
+    response = client.post("/api/voice/process/", json=TV_COMMAND)
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "failed" and response.json()["device_id"] is None
+    with session_factory() as db:
+        assert device_registry.resolve(db, seed, "tv", "спальня") is None
+
+
+def test_batch_with_device_deleted_elsewhere_is_retried(client, session_factory, seed):
+    _prime(session_factory, seed)
+    _other_process(session_factory)
+
+    response = client.post("/api/voice/process-batch/", json=[TV_COMMAND, {"text": "включи свет в гостиной"}])
+
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()] == ["failed", "executed"]
+    with session_factory() as db:
+        assert db.get(models.Device, 1).is_on is True
+
+
+def test_registry_expires_after_ttl(session_factory, seed, monkeypatch):
+    monkeypatch.setattr(device_registry, "ttl", 0.05)
+    _prime(session_factory, seed)
+    _other_process(session_factory, location="кухня")
+
+    with session_factory() as db:
+        # Пока запись свежая, процесс видит прежнее местоположение
+        assert device_registry.resolve(db, seed, "tv", "спальня").id == 2
+        time.sleep(0.06)
+        assert device_registry.resolve(db, seed, "tv", "кухня").id == 2
+        assert device_registry.resolve(db, seed, "tv", "спальня") is None
@@ -0,0 +1,76 @@
+from app import models
+from app.routers import devices
+from app.services.device_registry import device_registry
+
+
+def test_bulk_create_returns_devices_in_order(client, session_factory, seed):
+    payload = [
+        {"name": f"Лампа {index}", "device_type": "light", "location": "кухня"}
+        for index in range(3)
+    ]
+
+    response = client.post("/api/devices/bulk", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    assert [device["name"] for device in body] == ["Лампа 0", "Лампа 1", "Лампа 2"]
+    assert all(device["owner_id"] == seed and device["version"] == 1 for device in body)
+    with session_factory() as db:
+        assert db.query(models.Device).count() == 5
+
+
+def test_bulk_create_rejects_unknown_owner(client):
+    response = client.post("/api/devices/bulk", json=[{"name": "X", "device_type": "tv", "owner_id": 99}])
+
+    assert response.status_code == 404
+
+
+def test_bulk_update_applies_fields_and_refreshes_registry(client, session_factory, seed):
+    with session_factory() as db:
+        assert device_registry.resolve(db, seed, "tv", "спальня").id == 2
+
+    response = client.patch("/api/devices/bulk", json=[
+        {"id": 2, "location": "кухня", "version": 1},
+        {"id": 1, "is_on": True},
+    ])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [device["id"] for device in body] == [2, 1]
+    assert body[0]["location"] == "кухня" and body[0]["version"] == 2
+    assert body[1]["is_on"] is True
+    with session_factory() as db:
+        assert device_registry.resolve(db, seed, "tv", "кухня").id == 2
+
+
+def test_bulk_update_version_conflict_rolls_back(client, session_factory):
+    response = client.patch("/api/devices/bulk", json=[
+        {"id": 1, "name": "Новая", "version": 1},
+        {"id": 2, "name": "Другая", "version": 7},
+    ])
+
+    assert response.status_code == 412
+    with session_factory() as db:
+        assert db.get(models.Device, 1).name == "Люстра"
+
+
+def test_large_batch_is_streamed_in_chunks(client, monkeypatch, seed):
+    monkeypatch.setattr(devices, "DEVICE_BULK_STREAM_THRESHOLD", 3)
+    monkeypatch.setattr(devices, "DEVICE_BULK_CHUNK_SIZE", 2)
+    payload = [
+        {"name": f"Датчик {index}", "device_type": "sensor", "location": "кухня"}
+        for index in range(5)
+    ]
+
+    created = client.post("/api/devices/bulk", json=payload)
+    updated = client.patch("/api/devices/bulk", json=[
+        {"id": device["id"], "is_on": True} for device in reversed(created.json())
+    ])
+
+    for response in (created, updated):
+        assert response.status_code == 200
+        assert "content-length" not in response.headers
+    assert [device["name"] for device in created.json()] == [f"Датчик {index}" for index in range(5)]
+    assert [device["name"] for device in updated.json()] == [f"Датчик {index}" for index in reversed(range(5))]
+    assert all(device["is_on"] and device["version"] == 2 for device in updated.json())
@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app import models
+from app.database import get_db
+from app.main import app
+from app.services.emergency_lane import EmergencyLane
+
+# Граница задержки остановки; таймаут основного пула заметно больше,
+# поэтому остановка, ожидающая основной пул, в нее не уложится
+STOP_BOUND_SECONDS = 1.0
+MAIN_POOL_TIMEOUT = 5
+
+
+def _devices_on(session_factory):
+    with session_factory() as db:
+        return db.query(models.Device).filter(models.Device.is_on == True).count()
+
+
+def test_stop_completes_while_main_pool_is_saturated(client, session_factory, sqlite_path):
+    main_engine = create_engine(
+        f"sqlite:///{sqlite_path}", connect_args={"check_same_thread": False},
+        pool_size=1, max_overflow=0, pool_timeout=MAIN_POOL_TIMEOUT
+    )
+    saturated_factory = sessionmaker(autocommit=False, autoflush=False, bind=main_engine)
+
+    def saturated_db():
+        db = saturated_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = saturated_db
+    held = main_engine.connect()
+    try:
+        started = time.perf_counter()
+        response = client.post("/api/voice/process/", json={"text": "стоп"})
+        elapsed = time.perf_counter() - started
+    finally:
+        held.close()
+        main_engine.dispose()
+
+    assert response.status_code == 200
+    assert response.json()["action"] == "emergency_stop"
+    assert elapsed < STOP_BOUND_SECONDS
+    assert _devices_on(session_factory) == 0
+
+
+def test_concurrent_stops_fit_the_lane(sqlite_path, seed):
+    async def scenario():
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{sqlite_path}",
+            poolclass=AsyncAdaptedQueuePool, pool_size=4, max_overflow=0, pool_timeout=0.5
+        )
+        lane = EmergencyLane(engine)
+        await lane.warm_up()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(lane.stop(seed, "стоп") for _ in range(4)))
+        elapsed = time.perf_counter() - started
+        await engine.dispose()
+        return lane, results, elapsed
+
+    lane, results, elapsed = asyncio.run(scenario())
+
+    assert all(result is not None for result in results)
+    assert elapsed < STOP_BOUND_SECONDS
+    assert lane.stats()["stops_total"] == 4 and lane.stats()["fallbacks"] == 0
+
+
+def test_busy_lane_falls_back_to_pipeline(sqlite_path, seed):
+    async def scenario():
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{sqlite_path}",
+            poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.1
+        )
+        lane = EmergencyLane(engine)
+        async with engine.connect():
+            started = time.perf_counter()
+            result = await lane.stop(seed, "стоп")
+            elapsed = time.perf_counter() - started
+        await engine.dispose()
+        return lane, result, elapsed
+
+    lane, result, elapsed = asyncio.run(scenario())
+
+    assert result is None
+    assert elapsed < STOP_BOUND_SECONDS
+    assert lane.stats()["fallbacks"] == 1 and lane.stats()["stops_total"] == 0
+
+
+@pytest.mark.parametrize("text", ["стоп", "пауза"])
+def test_stop_through_route_turns_everything_off(client, session_factory, text):
+    response = client.post("/api/voice/process/", json={"text": text})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "executed"
+    assert _devices_on(session_factory) == 0
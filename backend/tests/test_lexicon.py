@@ -0,0 +1,18 @@
+from app.strategies.lexicon import ACTION, DEVICE_TYPE, LOCATION, invalid_custom_keywords, merge_custom_keywords
+
+
+def test_targets_are_resolved_to_their_category():
+    merged = merge_custom_keywords(["люстру=light", "вруби=turn_on", "детская", "в детской=детская"])
+
+    assert merged[DEVICE_TYPE]["люстру"] == "light"
+    assert merged[ACTION]["вруби"] == "turn_on"
+    assert merged[LOCATION]["детская"] == "детская"
+    assert merged[LOCATION]["в детской"] == "детская"
+
+
+def test_unknown_target_is_not_a_location():
+    keywords = ["лампу=лампочка", "люстру=light"]
+
+    assert invalid_custom_keywords(keywords) == ["лампу=лампочка"]
+    merged = merge_custom_keywords(keywords)
+    assert "лампу" not in merged[LOCATION] and merged[DEVICE_TYPE]["люстру"] == "light"
@@ -0,0 +1,57 @@
+from app.strategies.analysis_strategy import MachineLearningStrategy, StatisticalAnalysisStrategy
+from app.strategies.lexicon import ACTION, DEVICE_TYPE, LOCATION
+from app.strategies.ml_model import LinearIntentModel
+from app.strategies.ml_training import train_model
+
+TRAINING = [
+    ("включи свет в гостиной", "turn_on", "light", "гостиная"),
+    ("выключи свет в гостиной", "turn_off", "light", "гостиная"),
+    ("включи телевизор в спальне", "turn_on", "tv", "спальня"),
+    ("выключи телевизор в спальне", "turn_off", "tv", "спальня"),
+    ("включи свет на кухне", "turn_on", "light", "кухня"),
+    ("выключи телевизор", "turn_off", "tv", None),
+]
+
+
+def _train(directory):
+    texts = [text for text, *_ in TRAINING]
+    targets = {
+        ACTION: [row[1] for row in TRAINING],
+        DEVICE_TYPE: [row[2] for row in TRAINING],
+        LOCATION: [row[3] for row in TRAINING],
+    }
+    model = train_model(texts, targets, dim=2 ** 12, epochs=50)
+    model.save(str(directory))
+    return model
+
+
+def test_saved_model_predicts_after_load(tmp_path):
+    trained = _train(tmp_path)
+
+    loaded = LinearIntentModel.load(str(tmp_path))
+
+    assert loaded.version == trained.version and loaded.labels == trained.labels
+    assert loaded.predict(["выключи свет в гостиной", "выключи телевизор"]) == [
+        {ACTION: "turn_off", DEVICE_TYPE: "light", LOCATION: "гостиная"},
+        {ACTION: "turn_off", DEVICE_TYPE: "tv", LOCATION: None},
+    ]
+
+
+def test_strategy_uses_trained_model(tmp_path):
+    _train(tmp_path)
+    strategy = MachineLearningStrategy(str(tmp_path))
+
+    result = strategy.analyze_data(["Включи телевизор в спальне"])
+
+    assert strategy.version.startswith("MachineLearningStrategy:")
+    assert (result.action, result.device_type, result.location) == ("turn_on", "tv", "спальня")
+
+
+def test_strategy_falls_back_without_model_file(tmp_path):
+    strategy = MachineLearningStrategy(str(tmp_path / "missing"))
+    statistical = StatisticalAnalysisStrategy()
+
+    result = strategy.analyze_data(["включи свет в гостиной"])
+
+    assert strategy.version == statistical.version
+    assert result == statistical.analyze_data(["включи свет в гостиной"])
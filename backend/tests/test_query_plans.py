@@ -0,0 +1,95 @@
+"""
+Планы горячих запросов на PostgreSQL
+
+Таблицы тестовой базы почти пустые, и на них планировщик предпочел бы
+последовательное чтение, поэтому оно отключается (enable_seqscan = off):
+тест проверяет, что запрос может использовать нужный индекс
+"""
+
+import json
+from typing import Iterator, List, Tuple
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from app.controllers.decision_controller import emergency_stop_statement
+from app.models import AudioData, Command, Device
+
+pytestmark = pytest.mark.postgresql
+
+
+def _plan_nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def _explain(conn, statement) -> List[dict]:
+    sql = str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    raw = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    plan = raw if isinstance(raw, list) else json.loads(raw)
+    return list(_plan_nodes(plan[0]["Plan"]))
+
+
+def _index_names(conn, indexes: Tuple[str, ...]) -> List[str]:
+    """Индексы и их копии в секциях (для секционированной commands)"""
+    children = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "WHERE parent.relname = ANY(:indexes)"
+    ), {"indexes": list(indexes)}).scalars()
+    return [*indexes, *children]
+
+
+HOT_QUERIES = {
+    # Реестр устройств и поиск устройства в голосовом конвейере
+    "device_resolution": (
+        lambda: select(Device).where(Device.owner_id == 1, Device.is_active == True),
+        ("ix_devices_owner_active_type_location",),
+    ),
+    "device_lookup": (
+        lambda: select(Device).where(
+            Device.owner_id == 1, Device.is_active == True,
+            Device.device_type == "light", Device.location == "гостиная"
+        ),
+        ("ix_devices_owner_active_type_location",),
+    ),
+    # Частичный индекс по включенным устройствам; подходит и составной по owner_id
+    "emergency_stop": (
+        lambda: emergency_stop_statement(1),
+        ("ix_devices_owner_on", "ix_devices_owner_active_type_location"),
+    ),
+    # DecisionRepository.get_latest_decision / ResponseRepository.get_latest_response
+    "latest_executed_command": (
+        lambda: select(Command).where(Command.status == "executed").order_by(Command.id.desc()).limit(1),
+        ("ix_commands_status_id",),
+    ),
+    "command_history": (
+        lambda: select(Command).where(Command.user_id == 1).order_by(
+            Command.created_at.desc(), Command.id.desc()
+        ).limit(100),
+        ("ix_commands_user_created_id",),
+    ),
+    # Выборка очереди фоновым анализом аудио
+    "audio_queue_claim": (
+        lambda: select(AudioData.id, AudioData.file_path).where(
+            AudioData.processed == False, AudioData.file_path.isnot(None)
+        ).order_by(AudioData.id).limit(16).with_for_update(skip_locked=True),
+        ("ix_audio_data_unprocessed",),
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(pg_engine, name):
+    build, indexes = HOT_QUERIES[name]
+    with pg_engine.connect() as conn:
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        nodes = _explain(conn, build())
+        expected = set(_index_names(conn, indexes))
+        conn.rollback()
+
+    used = {node["Index Name"] for node in nodes if "Index Name" in node}
+    assert used and used <= expected, f"{name}: {[node['Node Type'] for node in nodes]}, indexes {used}"
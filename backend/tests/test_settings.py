@@ -0,0 +1,52 @@
+from app import models
+
+
+def _settings_rows(session_factory):
+    with session_factory() as db:
+        return db.query(models.UserSettings).count()
+
+
+def test_get_without_row_returns_defaults_and_writes_nothing(client, session_factory, seed):
+    response = client.get(f"/api/settings/{seed}/")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["user_id"] == seed and body["id"] is None and body["volume"] == 80
+    assert _settings_rows(session_factory) == 0
+
+
+def test_get_unknown_user_is_404(client):
+    assert client.get("/api/settings/999/").status_code == 404
+
+
+def test_etag_revalidation_and_update(client, session_factory, seed):
+    first = client.get(f"/api/settings/{seed}/")
+    etag = first.headers["ETag"]
+
+    not_modified = client.get(f"/api/settings/{seed}/", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+
+    updated = client.put(f"/api/settings/{seed}/", json={"volume": 55})
+    assert updated.status_code == 200 and updated.json()["id"] is not None
+    assert _settings_rows(session_factory) == 1
+
+    after = client.get(f"/api/settings/{seed}/", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.json()["volume"] == 55
+    assert after.headers["ETag"] == updated.headers["ETag"] != etag
+
+
+def test_unknown_custom_keyword_target_is_rejected(client, session_factory, seed):
+    response = client.put(f"/api/settings/{seed}/", json={"custom_keywords": ["лампу=лампочка"]})
+
+    assert response.status_code == 422
+    assert "лампу=лампочка" in response.json()["detail"]
+    assert _settings_rows(session_factory) == 0
+
+
+def test_custom_keyword_targets_are_accepted(client, seed):
+    keywords = ["люстру=light", "вруби=turn_on", "детская", "в детской=детская", "кухоньке=кухня"]
+    response = client.put(f"/api/settings/{seed}/", json={"custom_keywords": keywords})
+
+    assert response.status_code == 200
+    assert response.json()["custom_keywords"] == keywords
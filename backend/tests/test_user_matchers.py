@@ -0,0 +1,54 @@
+import time
+
+from app import models
+from app.services.user_matchers import UserMatcherCache
+
+
+def _save_keywords(session_factory, user_id, keywords):
+    """Изменение настроек в обход хука refresh, как из другого процесса"""
+    with session_factory() as db:
+        settings = db.query(models.UserSettings).filter(models.UserSettings.user_id == user_id).first()
+        if settings is None:
+            db.add(models.UserSettings(user_id=user_id, custom_keywords=keywords))
+        else:
+            settings.custom_keywords = keywords
+        db.commit()
+
+
+def test_change_from_another_process_is_seen_after_ttl(session_factory, seed):
+    cache = UserMatcherCache(ttl=0.05)
+    _save_keywords(session_factory, seed, ["люстру=light"])
+    with session_factory() as db:
+        assert cache.get(db, seed).match("включи люстру").device_type == "light"
+
+    _save_keywords(session_factory, seed, ["ящик=tv"])
+    with session_factory() as db:
+        # Пока запись свежая, процесс пользуется прежним словарем
+        assert cache.get(db, seed).match("включи ящик").device_type is None
+        time.sleep(0.06)
+        matcher = cache.get(db, seed)
+
+    assert matcher.match("включи ящик").device_type == "tv"
+    assert matcher.match("включи люстру").device_type is None
+
+
+def test_unchanged_settings_are_revalidated_without_recompiling(session_factory, seed):
+    cache = UserMatcherCache(ttl=0.05)
+    _save_keywords(session_factory, seed, ["люстру=light"])
+    with session_factory() as db:
+        first = cache.get(db, seed)
+        time.sleep(0.06)
+        second = cache.get(db, seed)
+
+    assert second is first
+    assert cache.stats()["revalidations"] == 1
+    assert cache.peek(seed) is not None
+
+
+def test_peek_skips_expired_profile(session_factory, seed):
+    cache = UserMatcherCache(ttl=0.05)
+    with session_factory() as db:
+        cache.get_profile(db, seed)
+    assert cache.peek(seed) is not None
+    time.sleep(0.06)
+    assert cache.peek(seed) is None
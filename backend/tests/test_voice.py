@@ -0,0 +1,38 @@
+from app import models
+from app.database import get_db
+from app.main import app
+
+
+def _no_sync_session():
+    raise AssertionError("voice routes must not use the sync session")
+    yield
+
+
+def test_command_runs_on_async_session(client, session_factory, seed):
+    app.dependency_overrides[get_db] = _no_sync_session
+
+    response = client.post("/api/voice/process/", json={"text": "включи свет в гостиной"})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "executed" and response.json()["device_id"] == 1
+    with session_factory() as db:
+        assert db.get(models.Device, 1).is_on is True
+        assert db.get(models.Device, 1).version == 2
+        assert db.query(models.Command).filter(models.Command.action == "turn_on").count() == 1
+
+
+def test_batch_runs_on_async_session(client, session_factory, seed):
+    app.dependency_overrides[get_db] = _no_sync_session
+
+    response = client.post("/api/voice/process-batch/", json=[
+        {"text": "включи свет в гостиной"},
+        {"text": ""},
+        {"text": "выключи телевизор в спальне"},
+    ])
+
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()] == ["executed", "failed", "executed"]
+    with session_factory() as db:
+        assert db.get(models.Device, 1).is_on is True
+        assert db.get(models.Device, 2).is_on is False
+        assert db.query(models.Command).count() == 2
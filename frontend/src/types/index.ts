@@ -23,7 +23,7 @@ export interface Command {
 }
 
 export interface Settings {
-  id: number;
+  id: number | null;
   user_id: number;
   voice_responses_enabled: boolean;
   auto_confirmation: boolean;
@@ -36,7 +36,7 @@ export interface Settings {
   custom_keywords: string[];
   command_sequences: any[];
   hot_keys: any[];
-  created_at: string;
+  created_at: string | null;
   updated_at: string | null;
 }
 